@@ -0,0 +1,77 @@
+# Micro-benchmark of the plan parser backends over the HTML fixtures (synthetic pages mirroring the live markup).
+# Usage: python bench_parsers.py [--fixtures fixtures] [--repeat 20] [--check]
+import argparse
+import contextlib
+import glob
+import io
+import os
+import time
+
+from data_coll import PLAN_TYPES
+from plan_parsers import PARSER_BACKENDS, extract_plans_data
+from plan_store import PlanStore, answer_plan_question
+
+# The question from the plan store's docs and the cheapest match in fixtures/recharge_online.html
+EXAMPLE_QUESTION = "cheapest plan with >=2GB/day and at least 56 days under ₹500"
+EXAMPLE_ANSWER = "Truly Unlimited Pack 8 (Truly Unlimited): ₹49, 3GB/day, 84 days"
+
+
+def run_backend(backend, pages, repeat):
+    cards = 0
+    results = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence per-tab progress prints
+        for _ in range(repeat):
+            results = []
+            for html_content in pages:
+                for plan_type_name in PLAN_TYPES:
+                    plans = extract_plans_data(html_content, plan_type_name, "fixture", backend=backend)
+                    cards += len(plans)
+                    results.append(plans)
+    return cards / (time.perf_counter() - start), results
+
+
+def check_plan_store(backend, results):
+    # Every parsed fixture plan must normalize to a price and validity, and the example question must find its plan
+    plans_by_type = {}
+    for plans in results:
+        for plan in plans:
+            plans_by_type.setdefault(plan['plan_type'], []).append(plan)
+    df = PlanStore.from_plans_by_type(plans_by_type).df
+    for column in ('price_inr', 'validity_days'):
+        missing = int(df[column].isna().sum())
+        assert not missing, f"{backend}: {missing} of {len(df)} fixture plans have no {column}"
+    assert (df['sms'] != 'N/A').all(), f"{backend}: SMS detail not captured"
+    answer = answer_plan_question(PlanStore(df), EXAMPLE_QUESTION)
+    assert answer and answer.splitlines()[0] == EXAMPLE_ANSWER, f"{backend}: {EXAMPLE_QUESTION!r} -> {answer!r}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plan parser backends in cards/second")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--check", action="store_true",
+                        help="Also assert the parsed plans normalize into the plan store and answer the example question")
+    args = parser.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    print(f"Loaded {len(pages)} fixture page(s)")
+
+    baseline = None
+    for backend in PARSER_BACKENDS:
+        cards_per_second, results = run_backend(backend, pages, args.repeat)
+        if baseline is None:
+            baseline = results
+        same = "identical" if results == baseline else "DIFFERENT"
+        print(f"{backend:>6}: {cards_per_second:>10.0f} cards/s  ({same} plan_info output)")
+        if args.check:
+            check_plan_store(backend, results)
+    if args.check:
+        print("Plan store checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,34 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import functools
+import html
+import os
+import queue
+import re
+import sys
+import threading
 import time
 import json
-import re 
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.metrics import count_items, observe_stage, span, write_prometheus
+from rag_core.registry import REGISTRY
+from plan_parsers import DEFAULT_BACKEND, PARSER_BACKENDS, PLAN_CARD_WRAPPER_CLASS, extract_plans_data
+from plan_history import PLAN_HISTORY_PATH, PlanHistory, push_delta
+from plan_store import PLAN_STORE_PATH, PlanStore
 
 AIRTEL_RECHARGE_URL = "https://www.airtel.in/recharge-online"
 CHROMEDRIVER_PATH = None 
-ACTION_DELAY = 3 
+PAGE_LOAD_TIMEOUT = 30  # Seconds to wait for the recharge page to finish loading
+TAB_TIMEOUT = 15        # Seconds to wait for a tab to become clickable
+CONTENT_TIMEOUT = 20    # Seconds to wait for a tab's plan cards to render
+DEFAULT_POOL_SIZE = 3   # Browser sessions scraping plan types in parallel
+PIPELINE = "airtel"     # Label on the scraper's stage metrics
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # For the optional plan vector index (--index-dir)
 PLAN_TYPES = [
     "Data",
     "International Roaming",
@@ -20,219 +40,247 @@ PLAN_TYPES = [
     "Inflight Roaming packs",
     "Plan vouchers"
 ]
-PLAN_CARD_WRAPPER_CLASS = 'packs-card-content'
-PLAN_DETAIL_CLASS = 'pack-card-detail'
-HEADING_CLASS = 'pack-card-heading'
-SUB_HEADING_CLASS = 'pack-card-sub-heading'
-BENEFITS_HEADING_CLASS = 'pack-card-benefits-heading'
-BENEFITS_CONTENT_ELEMENTS = ['div', 'span', 'p'] # Common tags for content
 
 
 # --- WebDriver Setup ---
-options = webdriver.ChromeOptions()
-options.add_argument("--headless")           # Run in headless mode (no browser window)
-options.add_argument("--disable-gpu")       # Recommended for headless mode
-options.add_argument("--no-sandbox")        # Recommended for headless mode (important in containers/CI)
-options.add_argument("start-maximized")     # Optional: Start browser maximized
-options.add_argument("--disable-infobars")  # Disables "Chrome is being controlled by automated test software" bar
-options.add_argument("--disable-dev-shm-usage") # Fixes issues with /dev/shm in Linux/Docker
-options.add_argument("--disable-browser-side-navigation") # Can help with flaky element errors
-options.add_argument(f"user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36") # Realistic User-Agent
-
-# Initialize WebDriver
-if CHROMEDRIVER_PATH:
-    service = Service(CHROMEDRIVER_PATH)
-    driver = webdriver.Chrome(service=service, options=options)
-else:
-    driver = webdriver.Chrome(options=options)
-
-# --- Global Data Storage ---
-# Stores plans categorized by their type (e.g., {'Data': [plan1, plan2], 'Talktime': [plan3]})
-all_plans_by_type = {}
-
-# --- Function to Extract Plan Data from HTML ---
-def extract_plans_data(html_content, plan_type_name, source_url):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    current_page_plans = []
-
-    # Find all individual plan card containers using the confirmed class
-    plan_cards = soup.find_all('div', class_=PLAN_CARD_WRAPPER_CLASS)
-
-    if not plan_cards:
-        print(f"WARNING: No plan cards found for '{plan_type_name}' with class '{PLAN_CARD_WRAPPER_CLASS}'.")
-        return current_page_plans
-
-    print(f"Found {len(plan_cards)} potential plan cards for '{plan_type_name}'.")
-    for i, card in enumerate(plan_cards):
-        plan_info = {
-            'plan_type': plan_type_name,
-            'source_url': source_url,
-            'name': 'N/A', # Placeholder for plan name
-            'price': 'N/A',
-            'data': 'N/A',
-            'validity': 'N/A',
-            'calls': 'N/A',
-            'sms': 'N/A',
-            'ott_benefits': 'None',
-            'other_details': [] # To catch any other scraped details not explicitly categorized
-        }
-        try:
-            # Plan Name: Based on the screenshot, it's often a prominent heading/text
-            # I'll look for an H2/H3 or strong tag within the card, or a general text area.
-            # You might need to refine this if a specific name is missing or incorrect.
-            # Let's try finding the text in the 'pack-card-left-section' first, as it's a prominent wrapper.
-            left_section = card.find('div', class_='pack-card-left-section')
-            if left_section:
-                # Look for a heading or the first strong text that looks like a name
-                name_el = left_section.find(['h2', 'h3', 'strong', 'span'], class_=re.compile(r'plan-name|pack-title|recharge-name|product-name|heading|text', re.I))
-                if name_el:
-                    plan_info['name'] = name_el.text.strip()
-                else: # Fallback: Sometimes the first prominent text is the name
-                    first_text_el = left_section.find(text=True)
-                    if first_text_el and first_text_el.strip():
-                        plan_info['name'] = first_text_el.strip()
-
-            # Extract details using the 'pack-card-detail' structure
-            detail_sections = card.find_all('div', class_=PLAN_DETAIL_CLASS)
-
-            for detail_section in detail_sections:
-                heading_el = detail_section.find('div', class_=HEADING_CLASS)
-                sub_heading_el = detail_section.find('div', class_=SUB_HEADING_CLASS)
-
-                heading_text = heading_el.text.strip() if heading_el else ''
-                sub_heading_text = sub_heading_el.text.strip().lower() if sub_heading_el else ''
-
-                # Logic to classify details based on keywords
-                if '₹' in heading_text or 'rs.' in heading_text.lower():
-                    plan_info['price'] = heading_text
-                elif 'gb' in heading_text.lower() or 'mb' in heading_text.lower() or 'data' in sub_heading_text:
-                    plan_info['data'] = heading_text
-                elif 'day' in heading_text.lower() or 'days' in heading_text.lower() or 'validity' in sub_heading_text:
-                    plan_info['validity'] = heading_text
-                elif 'calls' in sub_heading_text or 'unlimited' in heading_text.lower() and 'calls' not in plan_info['calls'].lower():
-                    plan_info['calls'] = heading_text
-                elif 'sms' in sub_heading_text:
-                    plan_info['sms'] = heading_text
-                else:
-                    # Catch all other details not specifically categorized
-                    combined_text = f"{heading_text} {sub_heading_text}".strip()
-                    if combined_text:
-                        plan_info['other_details'].append(combined_text)
-
-            # Extract OTT Benefits
-            # The screenshot shows 'Additional Benefit(s)' followed by what might be an icon and "+1 More".
-            # The actual benefits might be in an adjacent element or require clicking "+1 More".
-            # For now, we'll try to extract visible text linked to benefits.
-            benefits_heading_el = card.find('div', class_=BENEFITS_HEADING_CLASS)
-            if benefits_heading_el:
-                # Look for common elements right after the benefits heading
-                benefits_text_els = benefits_heading_el.find_next_siblings(BENEFITS_CONTENT_ELEMENTS)
-                benefits_text = []
-                for el in benefits_text_els:
-                    if el.text.strip() and '+1 More' not in el.text.strip(): # Avoid "more" links themselves
-                        benefits_text.append(el.text.strip())
-                
-                # Check for a specific benefits container if found in deeper inspection
-                benefits_container_el = card.find('div', class_='pack-card-benefits') # As guessed before
-                if benefits_container_el:
-                    benefits_text.append(benefits_container_el.text.strip())
-
-                if benefits_text:
-                    plan_info['ott_benefits'] = ", ".join(list(set(benefits_text))) # Use set to remove duplicates
-                else:
-                    # If nothing specific found, capture the heading text itself or note
-                    plan_info['ott_benefits'] = benefits_heading_el.text.strip() if benefits_heading_el.text.strip() else 'None'
-                    if '+1 More' in benefits_heading_el.text:
-                         plan_info['ott_benefits'] += " (Click 'View Detail' for full benefits)"
-
-
-            current_page_plans.append(plan_info)
+def create_driver():
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")           # Run in headless mode (no browser window)
+    options.add_argument("--disable-gpu")       # Recommended for headless mode
+    options.add_argument("--no-sandbox")        # Recommended for headless mode (important in containers/CI)
+    options.add_argument("start-maximized")     # Optional: Start browser maximized
+    options.add_argument("--disable-infobars")  # Disables "Chrome is being controlled by automated test software" bar
+    options.add_argument("--disable-dev-shm-usage") # Fixes issues with /dev/shm in Linux/Docker
+    options.add_argument("--disable-browser-side-navigation") # Can help with flaky element errors
+    options.add_argument(f"user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36") # Realistic User-Agent
 
-        except Exception as e:
-            print(f"Error processing plan card {i+1} for '{plan_type_name}' on {source_url}: {e}")
-            # print(f"Problematic card HTML snippet:\n{card.prettify()[:1000]}") # Uncomment for debugging
-            continue # Continue to the next plan card
+    if CHROMEDRIVER_PATH:
+        service = Service(CHROMEDRIVER_PATH)
+        return webdriver.Chrome(service=service, options=options)
+    return webdriver.Chrome(options=options)
 
-    return current_page_plans
 
-# --- Main Scraping Logic ---
-try:
-    print(f"Navigating to: {AIRTEL_RECHARGE_URL}")
-    driver.get(AIRTEL_RECHARGE_URL)
+# --- Condition-based waits (no fixed sleeps) ---
+def tab_locator(plan_type_name):
+    # Locate the tab/button for a plan type.
+    # We prioritize data-tab-name, then try text directly.
+    return (
+        By.XPATH,
+        f"//div[@data-tab-name='{plan_type_name}'] | " # Try div with data-tab-name
+        f"//a[@data-tab-name='{plan_type_name}'] | " # Try a with data-tab-name
+        f"//div[contains(@class, 'tab-') and normalize-space(text())='{plan_type_name}'] | " # Try div with tab-like class and exact text
+        f"//a[contains(@class, 'tab-') and normalize-space(text())='{plan_type_name}']" # Try a with tab-like class and exact text
+    )
+
 
-    # Initial wait for the main page body to load
-    print("Waiting for initial page content to load...")
-    WebDriverWait(driver, 30).until( # Increased wait time for robustness
-        EC.presence_of_element_located((By.TAG_NAME, 'body'))
+def tab_cards_locator(plan_type_name):
+    # Plan cards inside the content container of this tab, so a previous tab's cards never satisfy the wait
+    return (
+        By.XPATH,
+        f"//div[@class='tabs-single-content' and @data-tab-name='{plan_type_name}']"
+        f"//div[contains(concat(' ', normalize-space(@class), ' '), ' {PLAN_CARD_WRAPPER_CLASS} ')]"
     )
-    time.sleep(ACTION_DELAY) # Give extra time for dynamic elements to render
 
-    # Loop through each plan type
-    for plan_type_name in PLAN_TYPES:
+
+def page_ready(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def load_recharge_page(driver, url):
+    print(f"Navigating to: {url}")
+    with span("page_load", PIPELINE):
+        driver.get(url)
+        WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(page_ready)
+        WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
+
+
+def scrape_plan_type(driver, plan_type_name, parser_backend=DEFAULT_BACKEND):
+    with span("tab_render", PIPELINE):
+        plan_type_tab = WebDriverWait(driver, TAB_TIMEOUT).until(
+            EC.element_to_be_clickable(tab_locator(plan_type_name))
+        )
+        plan_type_tab.click()
+        print(f"Clicked on tab for '{plan_type_name}'.")
+
+        # Wait until this tab's own cards are present and visible, i.e. the content has rendered
+        WebDriverWait(driver, CONTENT_TIMEOUT).until(
+            EC.visibility_of_element_located(tab_cards_locator(plan_type_name))
+        )
+    with span("parse", PIPELINE):
+        plans = extract_plans_data(driver.page_source, plan_type_name, driver.current_url, backend=parser_backend)
+    count_items("parse", len(plans), PIPELINE)
+    return plans
+
+
+# --- Scraper engine with a pool of browser sessions ---
+class AirtelPlanScraper:
+    def __init__(self, url=AIRTEL_RECHARGE_URL, plan_types=None, pool_size=DEFAULT_POOL_SIZE, driver_factory=create_driver,
+                 parser_backend=DEFAULT_BACKEND):
+        self.url = url
+        self.plan_types = list(plan_types or PLAN_TYPES)
+        self.pool_size = max(1, min(pool_size, len(self.plan_types)))
+        self.driver_factory = driver_factory
+        self.parser_backend = parser_backend
+        self.timings = {}  # plan type -> wall-clock seconds
+
+    def _scrape_task(self, sessions, plan_type_name):
+        session = sessions.get()  # Check a browser session out of the pool
+        start = time.perf_counter()
         print(f"\n--- Processing Plan Type: {plan_type_name} ---")
+        plans = []
         try:
-            # Locate the tab/button for the current plan type.
-            # Based on your image, these are likely div/a elements with data-tab-name or specific text/class.
-            # We'll prioritize data-tab-name, then try text directly.
-            tab_element_locator = (
-                By.XPATH,
-                f"//div[@data-tab-name='{plan_type_name}'] | " # Try div with data-tab-name
-                f"//a[@data-tab-name='{plan_type_name}'] | " # Try a with data-tab-name
-                f"//div[contains(@class, 'tab-') and normalize-space(text())='{plan_type_name}'] | " # Try div with tab-like class and exact text
-                f"//a[contains(@class, 'tab-') and normalize-space(text())='{plan_type_name}']" # Try a with tab-like class and exact text
-            )
-
-            # Wait for the tab element to be clickable
-            plan_type_tab = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable(tab_element_locator)
-            )
-            plan_type_tab.click()
-            print(f"Clicked on tab for '{plan_type_name}'.")
-
-            # After clicking, wait for the content specific to this tab to load.
-            # We wait for the 'tabs-single-content' div to show the correct 'data-tab-name'.
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, f"//div[@class='tabs-single-content' and @data-tab-name='{plan_type_name}']"))
-            )
-            # Also wait for at least one plan card to appear to confirm content loaded
-            WebDriverWait(driver, 15).until(
-                 EC.presence_of_element_located((By.CLASS_NAME, PLAN_CARD_WRAPPER_CLASS))
-            )
-            time.sleep(ACTION_DELAY) # Give it a moment to fully render after the wait
-
-            # Get the HTML source of the *current* page (after tab content has loaded)
-            current_page_html = driver.page_source
-
-            # Extract plans for this specific plan type
-            extracted_plans = extract_plans_data(current_page_html, plan_type_name, driver.current_url)
-            all_plans_by_type[plan_type_name] = extracted_plans
-            print(f"Extracted {len(extracted_plans)} plans for '{plan_type_name}'.")
-
+            if not session["ready"]:
+                load_recharge_page(session["driver"], self.url)
+                session["ready"] = True
+            plans = scrape_plan_type(session["driver"], plan_type_name, self.parser_backend)
+            print(f"Extracted {len(plans)} plans for '{plan_type_name}'.")
         except TimeoutException:
             print(f"Timeout: Could not find or click tab for '{plan_type_name}' or content did not load after clicking.")
-            all_plans_by_type[plan_type_name] = [] # Record as empty if failed
+            session["ready"] = False # Reload the page before this session is reused
         except NoSuchElementException:
             print(f"Element not found: Tab for '{plan_type_name}' not found with specified selectors.")
-            all_plans_by_type[plan_type_name] = []
+            session["ready"] = False
         except WebDriverException as e:
             print(f"WebDriver error for tab '{plan_type_name}': {e}. Skipping.")
-            all_plans_by_type[plan_type_name] = []
+            session["ready"] = False
         except Exception as e:
             print(f"An unexpected error occurred while processing '{plan_type_name}': {e}")
-            all_plans_by_type[plan_type_name] = []
+            session["ready"] = False
+        finally:
+            self.timings[plan_type_name] = time.perf_counter() - start
+            observe_stage("plan_type", self.timings[plan_type_name], PIPELINE)
+            print(f"'{plan_type_name}' took {self.timings[plan_type_name]:.2f}s")
+            sessions.put(session)
+        return plans # Empty if the tab failed
+
+    def run(self):
+        # Returns {plan type: [plan_info, ...]}; per-tab wall-clock times are left in self.timings
+        sessions = queue.Queue()
+        drivers = []
+        try:
+            for _ in range(self.pool_size):
+                driver = self.driver_factory()
+                drivers.append(driver)
+                sessions.put({"driver": driver, "ready": False})
+            with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+                results = list(executor.map(functools.partial(self._scrape_task, sessions), self.plan_types))
+            return dict(zip(self.plan_types, results))
+        finally:
+            for driver in drivers:
+                driver.quit()
+            print('\nBrowser sessions closed.')
+
+
+# --- Local fixture server for offline runs ---
+def serve_fixtures(directory, port=0):
+    # Serves the HTML fixtures on localhost; returns (server, base_url). Call server.shutdown() when done.
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def fixture_card_counts(path):
+    # {tab name: plan cards} counted straight from a fixture's markup, independent of the parser backends
+    with open(path, encoding='utf-8') as f:
+        sections = re.split(r'<div class="tabs-single-content" data-tab-name="([^"]+)"', f.read())
+    return {html.unescape(name): body.count(f'class="{PLAN_CARD_WRAPPER_CLASS}"')
+            for name, body in zip(sections[1::2], sections[2::2])}
+
+
+def check_fixture_scrape(all_plans_by_type, fixture_path):
+    # Every tab must come back with exactly the cards the fixture holds; a tab whose click or wait broke scrapes 0
+    expected = fixture_card_counts(fixture_path)
+    return {name: (len(all_plans_by_type.get(name, [])), count) for name, count in expected.items()
+            if len(all_plans_by_type.get(name, [])) != count}
+
+
+def build_plan_ingestor(persist_dir):
+    # Chroma collection of one document per plan, kept in step with the snapshot history
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain.vectorstores import Chroma
+    from rag_core.ingest import IncrementalIngestor
+    from rag_core.registry import acquire_chroma_client, acquire_embeddings
+
+    vectordb = Chroma(client=acquire_chroma_client(persist_dir), persist_directory=persist_dir,
+                      embedding_function=acquire_embeddings(EMBEDDING_MODEL, pipeline=PIPELINE))
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    return vectordb, IncrementalIngestor(vectordb, text_splitter, os.path.join(persist_dir, "ingest_manifest.json"),
+                                         pipeline=PIPELINE)
+
+
+def save_plans(all_plans_by_type, output_filename):
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        json.dump(all_plans_by_type, f, ensure_ascii=False, indent=4)
+    print(f"\nAll extracted plan data saved to {output_filename}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape Airtel recharge plans by plan type")
+    parser.add_argument("--url", default=AIRTEL_RECHARGE_URL)
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE)
+    parser.add_argument("--fixtures", help="Serve this directory locally, scrape its recharge_online.html instead and "
+                                           "check every tab against the cards in the fixture")
+    parser.add_argument("--parser", choices=sorted(PARSER_BACKENDS), default=DEFAULT_BACKEND)
+    parser.add_argument("--output", default='airtel_plans_by_type_final.json')
+    parser.add_argument("--store", default=PLAN_STORE_PATH, help="Typed Parquet plan store for structured queries")
+    parser.add_argument("--history", default=PLAN_HISTORY_PATH, help="Versioned snapshot store each run is diffed against")
+    parser.add_argument("--index-dir", help="Push only the plans that changed since the last run into this Chroma store")
+    parser.add_argument("--metrics-out", help="Write stage latency histograms here in Prometheus text format")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if args.fixtures:
+        server, base_url = serve_fixtures(args.fixtures)
+        url = f"{base_url}/recharge_online.html"
+    try:
+        scraper = AirtelPlanScraper(url=url, pool_size=args.pool_size, parser_backend=args.parser)
+        start = time.perf_counter()
+        all_plans_by_type = scraper.run()
+        elapsed = time.perf_counter() - start
+    finally:
+        if server:
+            server.shutdown()
+
+    # --- Final Data Processing and Saving ---
+    print("\n--- Scraping Complete ---")
+    for plan_type_name in scraper.plan_types:
+        print(f"{plan_type_name}: {scraper.timings.get(plan_type_name, 0.0):.2f}s")
+    print(f"Total wall-clock time: {elapsed:.2f}s")
+
+    total_plans = sum(len(plans) for plans in all_plans_by_type.values())
+    print(f"Total plans extracted across all categories: {total_plans}")
+    if args.fixtures:
+        mismatched = check_fixture_scrape(all_plans_by_type, os.path.join(args.fixtures, "recharge_online.html"))
+        if mismatched:
+            sys.exit("Fixture check failed, (scraped, expected) cards per tab: " + json.dumps(mismatched, ensure_ascii=False))
+        print("Fixture check passed: every tab scraped all of its cards")
+    save_plans(all_plans_by_type, args.output)
 
-finally:
-    if 'driver' in locals() and driver is not None:
-        driver.quit()
-        print('\nBrowser closed.')
+    store = PlanStore.from_plans_by_type(all_plans_by_type)
+    store.save(args.store)
+    print(f"Typed plan store with {len(store.df)} plans saved to {args.store}")
 
-# --- Final Data Processing and Saving ---
-print("\n--- Scraping Complete ---")
+    history = PlanHistory(args.history)
+    try:
+        with span("history", PIPELINE):
+            recorded = history.record(all_plans_by_type, source=url)
+        print(f"Snapshot v{recorded['version']}: {len(recorded['added'])} added, {len(recorded['changed'])} changed, "
+              f"{len(recorded['removed'])} removed since " + (f"v{recorded['previous_version']}" if recorded['previous_version'] else "nothing"))
+        if args.index_dir:
+            vectordb, ingestor = build_plan_ingestor(args.index_dir)
+            with span("index_delta", PIPELINE):
+                stats = push_delta(ingestor, history, recorded)
+            vectordb.persist()
+            print(f"Plan index updated: {stats}")
+    finally:
+        history.close()
+        REGISTRY.close()  # Embedding worker processes and cache, if the index was updated
+    if args.metrics_out:
+        write_prometheus(args.metrics_out)
+        print(f"Stage metrics written to {args.metrics_out}")
 
-total_plans = sum(len(plans) for plans in all_plans_by_type.values())
-print(f"Total plans extracted across all categories: {total_plans}")
 
-output_filename = 'airtel_plans_by_type_final.json'
-with open(output_filename, 'w', encoding='utf-8') as f:
-    json.dump(all_plans_by_type, f, ensure_ascii=False, indent=4)
-print(f"\nAll extracted plan data saved to {output_filename}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+# Concurrent page fetcher: pooled async HTTP for static pages, headless Chrome only for pages that need JavaScript.
+# Offline check against a local stub: python page_fetcher.py --stub-pages 50 --stub-delay 0.3
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.metrics import cache_event, count_items, observe_stage, span
+
+DEFAULT_CACHE_DIR = ".page_cache"
+DEFAULT_CONCURRENCY = 32   # Connections open at once across all hosts
+DEFAULT_PER_HOST = 4       # ...and to any single host, to stay polite
+DEFAULT_TIMEOUT = 20       # Seconds for a whole request, or for the browser to finish loading a page
+DEFAULT_PARSE_WORKERS = 4  # Threads parsing HTML, so a large page never stalls the event loop
+MIN_TEXT_CHARS = 200       # Less visible text than this, plus scripts, means the page renders client-side
+PIPELINE = "pages"         # Label on the fetcher's stage metrics
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+GONE_STATUSES = (404, 410)  # The only responses that remove a page from the index
+
+
+# --- Text extraction ---
+def extract_text(html):
+    # (title, visible text) with scripts, styles and whitespace runs removed
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(["script", "style", "noscript", "template"]):
+        tag.decompose()
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    return title, " ".join((soup.body or soup).get_text(" ").split())
+
+
+def needs_javascript(html, text, min_text_chars=MIN_TEXT_CHARS):
+    return len(text) < min_text_chars and "<script" in html.lower()
+
+
+def parse_body(body, charset, content_type, min_text_chars=MIN_TEXT_CHARS):
+    # (title, text, needs_js) for a fetched body; CPU-bound, so the fetcher runs it in a worker thread
+    decoded = body.decode(charset or "utf-8", errors="replace")
+    if content_type in HTML_TYPES:
+        title, text = extract_text(decoded)
+        return title, text, needs_javascript(decoded, text, min_text_chars)
+    if content_type.startswith("text/"):
+        return "", " ".join(decoded.split()), False
+    return "", "", False
+
+
+# --- On-disk response cache keyed by URL ---
+def _atomic_write(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ResponseCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def get(self, url):
+        # (metadata, body) or None; a body that does not match its metadata is treated as a miss
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get("body_sha256") != hashlib.sha256(body).hexdigest():
+            return None
+        return meta, body
+
+    def put(self, url, meta, body):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        _atomic_write(body_path, body)
+        _atomic_write(meta_path, json.dumps(dict(meta, body_sha256=hashlib.sha256(body).hexdigest())).encode("utf-8"))
+
+
+# --- Fetcher ---
+class PageFetcher:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST, timeout_s=DEFAULT_TIMEOUT,
+                 cache_dir=DEFAULT_CACHE_DIR, max_age_s=0, use_browser=True, driver_factory=None,
+                 min_text_chars=MIN_TEXT_CHARS, parse_workers=DEFAULT_PARSE_WORKERS):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout_s = timeout_s
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.max_age_s = max_age_s        # Cached pages younger than this are served without even a conditional request
+        self.use_browser = use_browser
+        self.driver_factory = driver_factory
+        self.min_text_chars = min_text_chars
+        self.stats = collections.Counter()  # source -> pages
+        self._driver = None
+        self._browser = ThreadPoolExecutor(max_workers=1)  # One Chrome, driven from one thread, for JS pages only
+        self._parsers = ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix="page-parse")
+
+    # Browser fallback
+    def _render_in_browser(self, url):
+        from selenium.webdriver.support.ui import WebDriverWait
+        from data_coll import create_driver, page_ready
+        if self._driver is None:
+            self._driver = (self.driver_factory or create_driver)()
+        with span("browser_render", PIPELINE):
+            self._driver.get(url)
+            WebDriverWait(self._driver, self.timeout_s).until(page_ready)
+            return self._driver.page_source
+
+    # HTTP
+    async def _get(self, session, url, cached):
+        # (source, metadata, body); conditional when a cached copy exists, stale copy served if the fetch fails
+        headers = {}
+        if cached:
+            meta, body = cached
+            if time.time() - meta["fetched_at"] < self.max_age_s:
+                return "cache", meta, body
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and cached:
+                    meta = dict(cached[0], fetched_at=time.time())
+                    self.cache.put(url, meta, cached[1])
+                    return "revalidated", meta, cached[1]
+                body = await response.read()
+                meta = {
+                    "url": url, "final_url": str(response.url), "status": response.status,
+                    "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+                    "content_type": response.content_type, "charset": response.charset, "fetched_at": time.time(),
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if cached:
+                return "stale", dict(cached[0], error=f"{type(e).__name__}: {e}"), cached[1]
+            return "error", {"url": url, "status": None, "error": f"{type(e).__name__}: {e}"}, b""
+        if response.status == 200 and self.cache:
+            self.cache.put(url, meta, body)
+        return "network", meta, body
+
+    async def fetch(self, session, url):
+        start = time.perf_counter()
+        cached = self.cache.get(url) if self.cache else None
+        source, meta, body = await self._get(session, url, cached)
+        cache_event("page", {"network": "miss", "error": "miss"}.get(source, "hit"))
+        page = {"url": url, "final_url": meta.get("final_url", url), "status": meta.get("status"), "source": source,
+                "title": "", "text": "", "needs_js": False, "error": meta.get("error")}
+        if body and meta.get("status") == 200:
+            loop = asyncio.get_running_loop()
+            page["title"], page["text"], page["needs_js"] = await loop.run_in_executor(
+                self._parsers, parse_body, body, meta.get("charset"), meta.get("content_type") or "", self.min_text_chars)
+            if page["needs_js"] and self.use_browser:
+                try:
+                    html = await loop.run_in_executor(self._browser, self._render_in_browser, url)
+                    page["title"], page["text"] = await loop.run_in_executor(self._parsers, extract_text, html)
+                    page["source"] = "browser"
+                except Exception as e:
+                    page["error"] = f"browser: {type(e).__name__}: {e}"
+        page["elapsed_s"] = time.perf_counter() - start
+        self.stats[page["source"]] += 1
+        observe_stage("fetch", page["elapsed_s"], PIPELINE)
+        count_items("fetch", 1, PIPELINE)
+        return page
+
+    async def iter_pages(self, urls):
+        # Yields pages as they finish, not in input order; duplicate URLs are fetched once
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout_s)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={"User-Agent": USER_AGENT}) as session:
+            tasks = [asyncio.ensure_future(self.fetch(session, url)) for url in dict.fromkeys(urls)]
+            try:
+                for next_page in asyncio.as_completed(tasks):
+                    yield await next_page
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    def stream(self, urls, max_buffered=64):
+        # Blocking iterator for synchronous consumers such as IncrementalIngestor.sync. The event loop runs
+        # in a background thread and stops handing pages over once max_buffered of them are waiting.
+        # A consumer that stops early (break, exception) stops the pump, which cancels the fetches still running.
+        pages = queue.Queue(maxsize=max_buffered)
+        finished = object()
+        stop = threading.Event()
+        errors = []
+
+        def hand_over(item):
+            # Waits while the consumer is behind; False once it has gone away
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        async def pump():
+            loop = asyncio.get_running_loop()
+            fetched = self.iter_pages(urls)
+            try:
+                async for page in fetched:
+                    if not await loop.run_in_executor(None, hand_over, page):
+                        break
+            except Exception as e:
+                errors.append(e)
+            finally:
+                await fetched.aclose()
+                await loop.run_in_executor(None, hand_over, finished)
+
+        thread = threading.Thread(target=asyncio.run, args=(pump(),), daemon=True)
+        thread.start()
+        try:
+            while True:
+                page = pages.get()
+                if page is finished:
+                    break
+                yield page
+        finally:
+            stop.set()
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def fetch_all(self, urls):
+        async def collect():
+            return [page async for page in self.iter_pages(urls)]
+        return asyncio.run(collect())
+
+    def close(self):
+        if self._driver is not None:
+            self._browser.submit(self._driver.quit).result()
+            self._driver = None
+        self._browser.shutdown()
+        self._parsers.shutdown()
+
+
+def page_rows(pages, gone=None):
+    # Fetched pages as (row key, text, metadata) rows for rag_core.ingest.IncrementalIngestor.sync_delta. A page
+    # that failed this time (network error, 5xx, JavaScript page without a browser) yields nothing and keeps what
+    # is already indexed for it; only a definitive 404/410 is appended to `gone`, for sync_delta to remove.
+    for page in pages:
+        if page["text"]:
+            yield page["url"], page["text"], {"url": page["url"], "title": page["title"], "source": page["source"]}
+        elif page["status"] in GONE_STATUSES and gone is not None:
+            gone.append(page["url"])
+
+
+# --- Local HTTP stub for offline runs ---
+class StubHandler(BaseHTTPRequestHandler):
+    # Fixed pages with ETag / Last-Modified validators and an artificial per-request latency
+    pages = {}        # path -> (content type, body bytes)
+    delay_s = 0.0
+    last_modified = formatdate(usegmt=True)
+    requests = None   # collections.Counter of (path, status)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        time.sleep(self.delay_s)
+        if path not in self.pages:
+            return self._reply(path, 404)
+        content_type, body = self.pages[path]
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == self.last_modified:
+            return self._reply(path, 304, etag=etag)
+        self._reply(path, 200, content_type, body, etag)
+
+    def _reply(self, path, status, content_type=None, body=b"", etag=None):
+        self.requests[(path, status)] += 1
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.last_modified)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client cancelled the request
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stub(pages, delay_s=0.0, port=0):
+    # Returns (server, base_url); server.requests counts responses by (path, status). Call server.shutdown() when done.
+    handler = type("Handler", (StubHandler,), {"pages": pages, "delay_s": delay_s, "requests": collections.Counter()})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.requests = handler.requests
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def stub_pages(count, fixtures_dir=None):
+    # `count` static articles, one client-rendered page, plus any saved HTML fixtures
+    html = "text/html; charset=utf-8"
+    pages = {}
+    for i in range(count):
+        paragraph = f"Plan update {i}: unlimited calls, 2GB per day and 100 SMS per day for 28 days. " * 8
+        pages[f"/article/{i}"] = (html, f"<html><head><title>Article {i}</title></head><body><p>{paragraph}</p></body></html>".encode())
+    pages["/app"] = (html, b'<html><head><title>App</title><script src="/bundle.js"></script></head><body><div id="root"></div></body></html>')
+    for name in sorted(os.listdir(fixtures_dir)) if fixtures_dir and os.path.isdir(fixtures_dir) else []:
+        with open(os.path.join(fixtures_dir, name), "rb") as f:
+            pages[f"/{name}"] = (html, f.read())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch pages against a local stub and compare cold vs revalidated runs")
+    parser.add_argument("--stub-pages", type=int, default=50)
+    parser.add_argument("--stub-delay", type=float, default=0.3, help="Seconds the stub waits before each response")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST)
+    parser.add_argument("--browser", action="store_true", help="Render the stub's JavaScript page in headless Chrome")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.TemporaryDirectory()  # Fresh, so the first pass really is cold
+    server, base_url = serve_stub(stub_pages(args.stub_pages, args.fixtures), args.stub_delay)
+    urls = [base_url + path for path in server.RequestHandlerClass.pages]
+    try:
+        for run in ("cold", "warm"):
+            fetcher = PageFetcher(args.concurrency, args.per_host, cache_dir=cache_dir.name, use_browser=args.browser)
+            server.requests.clear()
+            start = time.perf_counter()
+            pages = list(fetcher.stream(urls))
+            elapsed = time.perf_counter() - start
+            fetcher.close()
+            texts = sum(1 for page in pages if page["text"])
+            js_pages = sum(1 for page in pages if page["needs_js"])
+            print(f"{run}: {len(pages)} pages in {elapsed:.2f}s (serial at {args.stub_delay}s each: "
+                  f"{len(pages) * args.stub_delay:.2f}s), {texts} with text, {js_pages} needing JavaScript, sources {dict(fetcher.stats)}, "
+                  f"stub responses {dict(collections.Counter(status for _, status in server.requests.elements()))}")
+    finally:
+        server.shutdown()
+        cache_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
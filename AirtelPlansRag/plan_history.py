@@ -0,0 +1,251 @@
+# Versioned plan snapshots: each scrape is diffed against the previous one and only the changes are stored.
+# Usage: python plan_history.py --price 299        (what the ₹299 plan(s) offered over time)
+#        python plan_history.py --name "Truly Unlimited 299" --plan-type "Truly Unlimited"
+import argparse
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+
+from plan_store import normalize_plan
+
+PLAN_HISTORY_PATH = 'airtel_plan_history.sqlite3'
+EVENT_COLUMNS = ['plan_key', 'version', 'change', 'plan_type', 'name', 'price_inr', 'data_gb_per_day',
+                 'data_gb_total', 'validity_days', 'ott_benefits', 'content_hash', 'plan']
+
+
+# --- Plan identity ---
+def price_key(price_inr):
+    return 'na' if price_inr is None or math.isnan(price_inr) else f'{price_inr:g}'
+
+
+def plan_hash(plan_info):
+    # Content fingerprint; the page URL is not part of the plan
+    content = {key: value for key, value in plan_info.items() if key != 'source_url'}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def plan_variant(plan_info):
+    # Normalized validity and data, e.g. "28d-1.5GB/day": what tells same-priced plans of one type apart
+    normalized = normalize_plan(plan_info)
+    validity, per_day, total = (_nullable(normalized[key]) for key in ('validity_days', 'data_gb_per_day', 'data_gb_total'))
+    parts = [] if validity is None else [f'{validity:g}d']
+    if per_day is not None:
+        parts.append(f'{per_day:g}GB/day')
+    elif total is not None:
+        parts.append(f'{total:g}GB')
+    return '-'.join(parts)
+
+
+def keyed_plans(all_plans_by_type):
+    # {plan key: plan_info}, keyed "<plan type>|₹<price>". Plans sharing a type and price get a suffix from their
+    # own content ("#28d-1.5GB/day", plus a content hash if even that is shared), so adding or dropping one
+    # sibling never renames the others; only a lone plan gains its suffix when a sibling first appears.
+    groups = {}
+    for plan_type, plans in all_plans_by_type.items():
+        for plan in plans:
+            groups.setdefault(f"{plan_type}|₹{price_key(normalize_plan(plan)['price_inr'])}", []).append(plan)
+    keyed = {}
+    for base, plans in groups.items():
+        if len(plans) == 1:
+            keyed[base] = plans[0]
+            continue
+        variants = [plan_variant(plan) for plan in plans]
+        for plan, variant in zip(plans, variants):
+            if not variant or variants.count(variant) > 1:
+                variant = '-'.join(filter(None, (variant, plan_hash(plan)[:8])))
+            keyed[f'{base}#{variant}'] = plan
+    return keyed
+
+
+def _nullable(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+# --- Snapshot store ---
+class PlanHistory:
+    def __init__(self, path=PLAN_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS snapshots ('
+            'version INTEGER PRIMARY KEY AUTOINCREMENT, scraped_at REAL NOT NULL, source TEXT, '
+            'plans INTEGER NOT NULL, added INTEGER NOT NULL, changed INTEGER NOT NULL, removed INTEGER NOT NULL);'
+            # One row per plan per version in which it appeared, changed or disappeared
+            'CREATE TABLE IF NOT EXISTS plan_events ('
+            'plan_key TEXT NOT NULL, version INTEGER NOT NULL, change TEXT NOT NULL, plan_type TEXT, name TEXT, '
+            'price_inr REAL, data_gb_per_day REAL, data_gb_total REAL, validity_days REAL, ott_benefits TEXT, '
+            'content_hash TEXT NOT NULL, plan TEXT NOT NULL, PRIMARY KEY (plan_key, version));'
+            'CREATE INDEX IF NOT EXISTS plan_events_price ON plan_events (price_inr, version);'
+            'CREATE INDEX IF NOT EXISTS plan_events_type ON plan_events (plan_type, version);'
+            'CREATE INDEX IF NOT EXISTS plan_events_name ON plan_events (name, version);'
+            # The latest snapshot, so a diff never has to replay the event log
+            'CREATE TABLE IF NOT EXISTS current_plans ('
+            'plan_key TEXT PRIMARY KEY, version INTEGER NOT NULL, content_hash TEXT NOT NULL, plan TEXT NOT NULL);'
+        )
+        self._conn.commit()
+
+    def latest_version(self):
+        with self._lock:
+            row = self._conn.execute('SELECT MAX(version) FROM snapshots').fetchone()
+        return row[0]
+
+    def current(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT plan_key, plan FROM current_plans').fetchall()
+        return {row['plan_key']: json.loads(row['plan']) for row in rows}
+
+    def diff(self, all_plans_by_type):
+        # Changes against the latest snapshot. A plan type with no plans this run (e.g. its tab failed to load)
+        # counts as not observed, so its plans are carried over rather than reported as removed.
+        scraped_types = {plan_type for plan_type, plans in all_plans_by_type.items() if plans}
+        new = keyed_plans({plan_type: plans for plan_type, plans in all_plans_by_type.items() if plans})
+        with self._lock:
+            rows = self._conn.execute('SELECT plan_key, content_hash, plan FROM current_plans').fetchall()
+        old = {row['plan_key']: (row['content_hash'], row['plan']) for row in rows}
+        delta = {'added': {}, 'changed': {}, 'removed': {}}
+        for key, plan in new.items():
+            if key not in old:
+                delta['added'][key] = plan
+            elif old[key][0] != plan_hash(plan):
+                delta['changed'][key] = plan
+        for key, (_, plan_json) in old.items():
+            plan = json.loads(plan_json)
+            if key not in new and plan.get('plan_type') in scraped_types:
+                delta['removed'][key] = plan
+        return delta
+
+    def record(self, all_plans_by_type, source=None, scraped_at=None):
+        # Stores this scrape as a new version holding only its changes; returns the version, the one before it and the diff
+        delta = self.diff(all_plans_by_type)
+        scraped_at = scraped_at or time.time()
+        previous_version = self.latest_version()
+        with self._lock, self._conn:
+            plan_count = self._conn.execute('SELECT COUNT(*) FROM current_plans').fetchone()[0]
+            plan_count += len(delta['added']) - len(delta['removed'])
+            version = self._conn.execute(
+                'INSERT INTO snapshots (scraped_at, source, plans, added, changed, removed) VALUES (?, ?, ?, ?, ?, ?)',
+                (scraped_at, source, plan_count, len(delta['added']), len(delta['changed']), len(delta['removed'])),
+            ).lastrowid
+            events = []
+            for change in ('added', 'changed', 'removed'):
+                for key, plan in delta[change].items():
+                    normalized = normalize_plan(plan)
+                    events.append((key, version, change, plan.get('plan_type'), plan.get('name'),
+                                   _nullable(normalized['price_inr']), _nullable(normalized['data_gb_per_day']),
+                                   _nullable(normalized['data_gb_total']), _nullable(normalized['validity_days']),
+                                   normalized['ott_benefits'], plan_hash(plan), json.dumps(plan, ensure_ascii=False)))
+            self._conn.executemany(
+                f"INSERT INTO plan_events ({', '.join(EVENT_COLUMNS)}) VALUES ({', '.join('?' * len(EVENT_COLUMNS))})", events)
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO current_plans (plan_key, version, content_hash, plan) VALUES (?, ?, ?, ?)',
+                [(event[0], version, event[10], event[11]) for event in events if event[2] != 'removed'])
+            self._conn.executemany('DELETE FROM current_plans WHERE plan_key = ?', [(key,) for key in delta['removed']])
+        return dict(delta, version=version, previous_version=previous_version)
+
+    def snapshot(self, version=None):
+        # Every plan as it stood at `version` (default: latest), rebuilt from the event log
+        version = version if version is not None else self.latest_version()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT e.plan_key, e.plan FROM plan_events e JOIN ('
+                '  SELECT plan_key, MAX(version) AS version FROM plan_events WHERE version <= ? GROUP BY plan_key'
+                ') latest ON e.plan_key = latest.plan_key AND e.version = latest.version '
+                "WHERE e.change != 'removed'",
+                (version or 0,),
+            ).fetchall()
+        return {row['plan_key']: json.loads(row['plan']) for row in rows}
+
+    def history(self, price=None, plan_type=None, name=None, plan_key=None):
+        # Change events oldest first, with the scrape time; each filter is served from an index, not a scan
+        clauses, params = [], []
+        for column, value in (('e.price_inr', price), ('e.plan_type', plan_type), ('e.name', name), ('e.plan_key', plan_key)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT s.scraped_at, {', '.join('e.' + c for c in EVENT_COLUMNS if c != 'plan')} "
+                f'FROM plan_events e JOIN snapshots s ON s.version = e.version {where} ORDER BY e.version, e.plan_key',
+                params,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def versions(self):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute('SELECT * FROM snapshots ORDER BY version')]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Pushing a diff into the RAG vector index ---
+def plan_document(plan_key, plan):
+    text = (f"{plan.get('plan_type')} plan {plan.get('name')}: price {plan.get('price')}, data {plan.get('data')}, "
+            f"validity {plan.get('validity')}, calls {plan.get('calls')}, SMS {plan.get('sms')}, "
+            f"OTT benefits {plan.get('ott_benefits')}")
+    if plan.get('other_details'):
+        text += '. ' + '; '.join(plan['other_details'])
+    metadata = {'plan_key': plan_key, 'plan_type': plan.get('plan_type') or '', 'source_url': plan.get('source_url') or ''}
+    price = _nullable(normalize_plan(plan)['price_inr'])
+    if price is not None:
+        metadata['price_inr'] = price
+    return plan_key, text, metadata
+
+
+def push_delta(ingestor, history, recorded):
+    # Only the plans that changed are embedded. If the index did not reflect the previous version (first run,
+    # or an earlier push failed), it is reconciled against the full current snapshot instead.
+    marker = {'plan_history_version': recorded['version']}
+    if ingestor.manifest.source == {'plan_history_version': recorded['previous_version']}:
+        rows = [plan_document(key, plan) for change in ('added', 'changed') for key, plan in recorded[change].items()]
+        removed = list(recorded['removed'])
+    else:
+        current = history.current()
+        rows = [plan_document(key, plan) for key, plan in current.items()]
+        removed = [key for key in ingestor.manifest.rows if key not in current]
+    return ingestor.sync_delta(rows, removed, source=marker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the Airtel plan snapshot history')
+    parser.add_argument('--history', default=PLAN_HISTORY_PATH)
+    parser.add_argument('--price', type=float)
+    parser.add_argument('--plan-type')
+    parser.add_argument('--name')
+    parser.add_argument('--key')
+    parser.add_argument('--versions', action='store_true', help='List the recorded snapshots instead')
+    args = parser.parse_args()
+
+    history = PlanHistory(args.history)
+    try:
+        if args.versions:
+            for snapshot in history.versions():
+                print(f"v{snapshot['version']} {time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot['scraped_at']))}: "
+                      f"{snapshot['plans']} plans (+{snapshot['added']} ~{snapshot['changed']} -{snapshot['removed']})")
+            return
+        for event in history.history(args.price, args.plan_type, args.name, args.key):
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(event['scraped_at']))
+            price = '?' if event['price_inr'] is None else f"₹{event['price_inr']:g}"
+            details = [price]
+            if event['data_gb_per_day'] is not None:
+                details.append(f"{event['data_gb_per_day']:g}GB/day")
+            elif event['data_gb_total'] is not None:
+                details.append(f"{event['data_gb_total']:g}GB")
+            if event['validity_days'] is not None:
+                details.append(f"{event['validity_days']:g} days")
+            details.append(event['ott_benefits'] or 'no OTT')
+            print(f"{when} v{event['version']} {event['change']:>7} {event['plan_key']}: {event['name']} ({', '.join(details)})")
+    finally:
+        history.close()
+
+
+if __name__ == '__main__':
+    main()
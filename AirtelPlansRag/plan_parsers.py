@@ -0,0 +1,230 @@
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # lxml is optional; BeautifulSoup stays available as the fallback
+    lxml_html = None
+
+PLAN_CARD_WRAPPER_CLASS = 'packs-card-content'
+PLAN_DETAIL_CLASS = 'pack-card-detail'
+HEADING_CLASS = 'pack-card-heading'
+SUB_HEADING_CLASS = 'pack-card-sub-heading'
+BENEFITS_HEADING_CLASS = 'pack-card-benefits-heading'
+BENEFITS_CONTENT_ELEMENTS = ['div', 'span', 'p'] # Common tags for content
+TAB_CONTENT_CLASS = 'tabs-single-content'
+LEFT_SECTION_CLASS = 'pack-card-left-section'
+BENEFITS_CONTAINER_CLASS = 'pack-card-benefits'
+NAME_CLASS_PATTERN = re.compile(r'plan-name|pack-title|recharge-name|product-name|heading|text', re.I)
+NAME_TAGS = ['h2', 'h3', 'strong', 'span']
+DEFAULT_BACKEND = 'lxml'
+# Sub-heading label -> plan_info field, checked in order
+DETAIL_LABELS = [('validity', 'validity'), ('sms', 'sms'), ('call', 'calls'), ('data', 'data'), ('price', 'price')]
+
+
+# --- Backend-independent plan assembly ---
+def new_plan_info(plan_type_name, source_url):
+    return {
+        'plan_type': plan_type_name,
+        'source_url': source_url,
+        'name': 'N/A', # Placeholder for plan name
+        'price': 'N/A',
+        'data': 'N/A',
+        'validity': 'N/A',
+        'calls': 'N/A',
+        'sms': 'N/A',
+        'ott_benefits': 'None',
+        'other_details': [] # To catch any other scraped details not explicitly categorized
+    }
+
+
+def classify_detail(plan_info, heading_text, sub_heading_text):
+    # The sub-heading names the field ("Validity", "SMS", ...); trust it first, so values like
+    # "100/day" SMS or "N/A" cannot land in another field
+    for label, field in DETAIL_LABELS:
+        if label in sub_heading_text:
+            plan_info[field] = heading_text
+            return
+    # Logic to classify details based on keywords
+    if '₹' in heading_text or 'rs.' in heading_text.lower():
+        plan_info['price'] = heading_text
+    elif 'gb' in heading_text.lower() or 'mb' in heading_text.lower() or 'data' in sub_heading_text:
+        plan_info['data'] = heading_text
+    elif 'day' in heading_text.lower() or 'days' in heading_text.lower() or 'validity' in sub_heading_text:
+        plan_info['validity'] = heading_text
+    elif 'calls' in sub_heading_text or 'unlimited' in heading_text.lower() and 'calls' not in plan_info['calls'].lower():
+        plan_info['calls'] = heading_text
+    elif 'sms' in sub_heading_text:
+        plan_info['sms'] = heading_text
+    else:
+        # Catch all other details not specifically categorized
+        combined_text = f"{heading_text} {sub_heading_text}".strip()
+        if combined_text:
+            plan_info['other_details'].append(combined_text)
+
+
+def set_benefits(plan_info, benefits_text, heading_text):
+    if benefits_text:
+        # Drop duplicates but keep page order, so every backend gives the same string
+        plan_info['ott_benefits'] = ", ".join(dict.fromkeys(benefits_text))
+    else:
+        # If nothing specific found, capture the heading text itself or note
+        plan_info['ott_benefits'] = heading_text.strip() if heading_text.strip() else 'None'
+        if '+1 More' in heading_text:
+            plan_info['ott_benefits'] += " (Click 'View Detail' for full benefits)"
+
+
+def _matches_name_class(class_attr):
+    # Same rule as BeautifulSoup's regex class_ match: any single class, or the whole attribute
+    if not class_attr:
+        return False
+    return any(NAME_CLASS_PATTERN.search(c) for c in class_attr.split()) or bool(NAME_CLASS_PATTERN.search(class_attr))
+
+
+# --- BeautifulSoup backend (fallback) ---
+class BeautifulSoupPlanParser:
+    name = 'bs4'
+
+    def find_cards(self, html_content, plan_type_name):
+        soup = BeautifulSoup(html_content, 'html.parser')
+        # Scope to the active tab's container when the page has one
+        scope = soup.find('div', class_=TAB_CONTENT_CLASS, attrs={'data-tab-name': plan_type_name}) or soup
+        return scope.find_all('div', class_=PLAN_CARD_WRAPPER_CLASS)
+
+    def parse_card(self, card, plan_info):
+        left_section = card.find('div', class_=LEFT_SECTION_CLASS)
+        if left_section:
+            # Look for a heading or the first strong text that looks like a name
+            name_el = left_section.find(NAME_TAGS, class_=NAME_CLASS_PATTERN)
+            if name_el:
+                plan_info['name'] = name_el.text.strip()
+            else: # Fallback: Sometimes the first prominent text is the name
+                first_text_el = left_section.find(string=True)
+                if first_text_el and first_text_el.strip():
+                    plan_info['name'] = first_text_el.strip()
+
+        # Extract details using the 'pack-card-detail' structure
+        for detail_section in card.find_all('div', class_=PLAN_DETAIL_CLASS):
+            heading_el = detail_section.find('div', class_=HEADING_CLASS)
+            sub_heading_el = detail_section.find('div', class_=SUB_HEADING_CLASS)
+            heading_text = heading_el.text.strip() if heading_el else ''
+            sub_heading_text = sub_heading_el.text.strip().lower() if sub_heading_el else ''
+            classify_detail(plan_info, heading_text, sub_heading_text)
+
+        # Extract OTT Benefits: visible text after the 'Additional Benefit(s)' heading
+        benefits_heading_el = card.find('div', class_=BENEFITS_HEADING_CLASS)
+        if benefits_heading_el:
+            benefits_text = []
+            for el in benefits_heading_el.find_next_siblings(BENEFITS_CONTENT_ELEMENTS):
+                if el.text.strip() and '+1 More' not in el.text.strip(): # Avoid "more" links themselves
+                    benefits_text.append(el.text.strip())
+            benefits_container_el = card.find('div', class_=BENEFITS_CONTAINER_CLASS)
+            if benefits_container_el:
+                benefits_text.append(benefits_container_el.text.strip())
+            set_benefits(plan_info, benefits_text, benefits_heading_el.text)
+
+
+# --- lxml backend (fast path) ---
+def _has_class(tag, class_name):
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+
+class LxmlPlanParser:
+    name = 'lxml'
+
+    def __init__(self):
+        if lxml_html is None:
+            raise ImportError("lxml is not installed; use the 'bs4' parser backend")
+        self._tab_content = etree.XPath(f"//{_has_class('div', TAB_CONTENT_CLASS)}[@data-tab-name=$name]")
+        self._cards = etree.XPath(f".//{_has_class('div', PLAN_CARD_WRAPPER_CLASS)}")
+        self._left_section = etree.XPath(f".//{_has_class('div', LEFT_SECTION_CLASS)}")
+        self._name_candidates = etree.XPath(
+            ".//*[" + " or ".join(f"self::{tag}" for tag in NAME_TAGS) + "][@class]"
+        )
+        self._first_text = etree.XPath(".//text()")
+        self._details = etree.XPath(f".//{_has_class('div', PLAN_DETAIL_CLASS)}")
+        self._heading = etree.XPath(f".//{_has_class('div', HEADING_CLASS)}")
+        self._sub_heading = etree.XPath(f".//{_has_class('div', SUB_HEADING_CLASS)}")
+        self._benefits_heading = etree.XPath(f".//{_has_class('div', BENEFITS_HEADING_CLASS)}")
+        self._benefits_siblings = etree.XPath(
+            "following-sibling::*[" + " or ".join(f"self::{tag}" for tag in BENEFITS_CONTENT_ELEMENTS) + "]"
+        )
+        self._benefits_container = etree.XPath(f".//{_has_class('div', BENEFITS_CONTAINER_CLASS)}")
+
+    def find_cards(self, html_content, plan_type_name):
+        root = lxml_html.fromstring(html_content)
+        containers = self._tab_content(root, name=plan_type_name)
+        return self._cards(containers[0] if containers else root)
+
+    def parse_card(self, card, plan_info):
+        left_sections = self._left_section(card)
+        if left_sections:
+            left_section = left_sections[0]
+            name_el = next((el for el in self._name_candidates(left_section) if _matches_name_class(el.get('class'))), None)
+            if name_el is not None:
+                plan_info['name'] = name_el.text_content().strip()
+            else:
+                first_text = self._first_text(left_section)
+                if first_text and first_text[0].strip():
+                    plan_info['name'] = first_text[0].strip()
+
+        for detail_section in self._details(card):
+            heading_el = self._heading(detail_section)
+            sub_heading_el = self._sub_heading(detail_section)
+            heading_text = heading_el[0].text_content().strip() if heading_el else ''
+            sub_heading_text = sub_heading_el[0].text_content().strip().lower() if sub_heading_el else ''
+            classify_detail(plan_info, heading_text, sub_heading_text)
+
+        benefits_heading = self._benefits_heading(card)
+        if benefits_heading:
+            benefits_heading_el = benefits_heading[0]
+            benefits_text = []
+            for el in self._benefits_siblings(benefits_heading_el):
+                text = el.text_content().strip()
+                if text and '+1 More' not in text:
+                    benefits_text.append(text)
+            benefits_container = self._benefits_container(card)
+            if benefits_container:
+                benefits_text.append(benefits_container[0].text_content().strip())
+            set_benefits(plan_info, benefits_text, benefits_heading_el.text_content())
+
+
+PARSER_BACKENDS = {'bs4': BeautifulSoupPlanParser, 'lxml': LxmlPlanParser}
+_parsers = {}
+
+
+def get_parser(backend=DEFAULT_BACKEND):
+    # Falls back to BeautifulSoup when the requested backend cannot be loaded
+    if backend not in _parsers:
+        try:
+            _parsers[backend] = PARSER_BACKENDS[backend]()
+        except ImportError as e:
+            print(f"WARNING: {e}. Falling back to BeautifulSoup.")
+            _parsers[backend] = BeautifulSoupPlanParser()
+    return _parsers[backend]
+
+
+# --- Function to Extract Plan Data from HTML ---
+def extract_plans_data(html_content, plan_type_name, source_url, backend=DEFAULT_BACKEND):
+    parser = get_parser(backend)
+    current_page_plans = []
+
+    # Find all individual plan card containers of this tab
+    plan_cards = parser.find_cards(html_content, plan_type_name)
+
+    if not plan_cards:
+        print(f"WARNING: No plan cards found for '{plan_type_name}' with class '{PLAN_CARD_WRAPPER_CLASS}'.")
+        return current_page_plans
+
+    print(f"Found {len(plan_cards)} potential plan cards for '{plan_type_name}'.")
+    for i, card in enumerate(plan_cards):
+        plan_info = new_plan_info(plan_type_name, source_url)
+        try:
+            parser.parse_card(card, plan_info)
+            current_page_plans.append(plan_info)
+        except Exception as e:
+            print(f"Error processing plan card {i+1} for '{plan_type_name}' on {source_url}: {e}")
+            continue # Continue to the next plan card
+
+    return current_page_plans
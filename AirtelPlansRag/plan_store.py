@@ -0,0 +1,174 @@
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+PLAN_STORE_PATH = 'airtel_plans.parquet'
+STORE_COLUMNS = ['plan_type', 'name', 'price_inr', 'data_gb_per_day', 'data_gb_total',
+                 'validity_days', 'calls', 'sms', 'ott_benefits', 'ott_count', 'source_url']
+
+PRICE_PATTERN = re.compile(r'(?:₹|rs\.?)\s*([\d,]+(?:\.\d+)?)', re.I)
+DATA_PATTERN = re.compile(r'([\d.]+)\s*(gb|mb)\s*(/\s*day|per\s*day)?', re.I)
+VALIDITY_PATTERN = re.compile(r'(\d+)\s*(day|month|year)s?\b', re.I)
+VALIDITY_UNIT_DAYS = {'day': 1, 'month': 30, 'year': 365}
+UPPER_BOUND_WORDS = r'(?:under|below|less than|upto|up to|<=?|≤)'
+VALIDITY_BOUND_PATTERN = re.compile(r'(' + UPPER_BOUND_WORDS + r'\s*)?(\d+)\s*days?\b')
+# A bound is a price unless the number carries another unit ("30 days", "2GB/day", "100/day SMS")
+BUDGET_PATTERN = re.compile(UPPER_BOUND_WORDS + r'\s*(?:₹|rs\.?)?\s*([\d,]+)(?![\d,.]|\s*(?:days?|months?|years?|gb|mb|/))')
+
+
+# --- String -> number normalization ---
+def parse_price(text):
+    match = PRICE_PATTERN.search(text or '')
+    return float(match.group(1).replace(',', '')) if match else np.nan
+
+
+def parse_data(text):
+    # Returns (GB per day, total GB); only one of them is set for a given plan
+    match = DATA_PATTERN.search(text or '')
+    if not match:
+        return np.nan, np.nan
+    amount = float(match.group(1))
+    if match.group(2).lower() == 'mb':
+        amount /= 1024
+    return (amount, np.nan) if match.group(3) else (np.nan, amount)
+
+
+def parse_validity(text):
+    match = VALIDITY_PATTERN.search(text or '')
+    if not match:
+        return np.nan
+    return float(int(match.group(1)) * VALIDITY_UNIT_DAYS[match.group(2).lower()])
+
+
+def parse_ott(text):
+    if not text or text == 'None':
+        return []
+    text = text.replace(" (Click 'View Detail' for full benefits)", '')
+    return [b.strip() for b in text.split(',') if b.strip() and 'benefit' not in b.lower()]
+
+
+def normalize_plan(plan_info):
+    data_per_day, data_total = parse_data(plan_info.get('data'))
+    ott = parse_ott(plan_info.get('ott_benefits'))
+    return {
+        'plan_type': plan_info.get('plan_type'),
+        'name': plan_info.get('name'),
+        'price_inr': parse_price(plan_info.get('price')),
+        'data_gb_per_day': data_per_day,
+        'data_gb_total': data_total,
+        'validity_days': parse_validity(plan_info.get('validity')),
+        'calls': plan_info.get('calls'),
+        'sms': plan_info.get('sms'),
+        'ott_benefits': ', '.join(ott),
+        'ott_count': len(ott),
+        'source_url': plan_info.get('source_url'),
+    }
+
+
+# --- Typed plan store with sorted indexes ---
+class PlanStore:
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.df['plan_type'] = self.df['plan_type'].astype('category')
+        for column in ('price_inr', 'data_gb_per_day', 'data_gb_total', 'validity_days'):
+            self.df[column] = self.df[column].astype('float32')
+        self.df['ott_count'] = self.df['ott_count'].astype('int16')
+        # Sorted indexes: row positions ordered by the key (NaNs sort last and are cut off)
+        self._indexes = {}
+        for column in ('price_inr', 'validity_days'):
+            values = self.df[column].to_numpy()
+            order = np.argsort(values, kind='stable')
+            valid = order[~np.isnan(values[order])]
+            self._indexes[column] = (values[valid], valid)
+
+    @classmethod
+    def from_plans_by_type(cls, all_plans_by_type):
+        rows = [normalize_plan(plan) for plans in all_plans_by_type.values() for plan in plans]
+        return cls(pd.DataFrame(rows, columns=STORE_COLUMNS))
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_plans_by_type(json.load(f))
+
+    @classmethod
+    def load(cls, path=PLAN_STORE_PATH):
+        return cls(pd.read_parquet(path))
+
+    def save(self, path=PLAN_STORE_PATH):
+        self.df.to_parquet(path, index=False)
+
+    def _range(self, column, low, high):
+        # Row positions with low <= column <= high, via binary search on the sorted index
+        keys, positions = self._indexes[column]
+        start = 0 if low is None else np.searchsorted(keys, low, side='left')
+        end = len(keys) if high is None else np.searchsorted(keys, high, side='right')
+        return positions[start:end]
+
+    def query(self, min_price=None, max_price=None, min_validity=None, max_validity=None,
+              min_data_per_day=None, plan_type=None, has_ott=None, sort_by='price_inr', limit=None):
+        # Start from the narrower of the two index ranges, then filter the remaining columns
+        candidates = None
+        for column, low, high in (('price_inr', min_price, max_price), ('validity_days', min_validity, max_validity)):
+            if low is not None or high is not None:
+                positions = self._range(column, low, high)
+                candidates = positions if candidates is None else np.intersect1d(candidates, positions, assume_unique=True)
+        rows = self.df if candidates is None else self.df.iloc[np.sort(candidates)]
+
+        mask = np.ones(len(rows), dtype=bool)
+        if min_data_per_day is not None:
+            mask &= (rows['data_gb_per_day'] >= min_data_per_day).to_numpy()
+        if plan_type is not None:
+            mask &= (rows['plan_type'] == plan_type).to_numpy()
+        if has_ott is not None:
+            mask &= ((rows['ott_count'] > 0) == has_ott).to_numpy()
+        rows = rows[mask]
+        if sort_by:
+            rows = rows.sort_values(sort_by, kind='stable')
+        return rows.head(limit) if limit else rows
+
+    def cheapest(self, **filters):
+        rows = self.query(sort_by='price_inr', limit=1, **filters)
+        return None if rows.empty else rows.iloc[0].to_dict()
+
+
+# --- Structured answers for the RAG layer (no LLM call) ---
+def parse_plan_question(question):
+    # Pulls numeric constraints out of questions like "cheapest plan with >=2GB/day and at least 56 days under ₹500"
+    q = question.lower()
+    filters = {}
+    data = re.search(r'([\d.]+)\s*gb\s*(?:/|per)\s*day', q)
+    if data:
+        filters['min_data_per_day'] = float(data.group(1))
+    for validity in VALIDITY_BOUND_PATTERN.finditer(q):
+        # "under 30 days" caps validity; any other "N days" ("for 56", "at least 56") is a minimum
+        filters['max_validity' if validity.group(1) else 'min_validity'] = float(validity.group(2))
+    budget = BUDGET_PATTERN.search(q)
+    if budget:
+        filters['max_price'] = float(budget.group(1).replace(',', ''))
+    if 'ott' in q or 'prime' in q or 'hotstar' in q or 'netflix' in q:
+        filters['has_ott'] = True
+    return filters
+
+
+def answer_plan_question(store, question, limit=3):
+    # Returns a text answer, or None when the question has no structured constraints (let the LLM handle it)
+    filters = parse_plan_question(question)
+    if not filters:
+        return None
+    rows = store.query(limit=limit, **filters)
+    if rows.empty:
+        return "No plan matches those requirements."
+    lines = []
+    for plan in rows.itertuples():
+        details = [f"₹{plan.price_inr:g}"]
+        if not np.isnan(plan.data_gb_per_day):
+            details.append(f"{plan.data_gb_per_day:g}GB/day")
+        if not np.isnan(plan.validity_days):
+            details.append(f"{plan.validity_days:g} days")
+        if plan.ott_benefits:
+            details.append(plan.ott_benefits)
+        lines.append(f"{plan.name} ({plan.plan_type}): " + ", ".join(details))
+    return "\n".join(lines)
@@ -1,25 +1,90 @@
-import requests
-from selenium import webdriver
-from selenium.webdriver.common.by import By
+import argparse
+import os
+import sys
 import time
+
+import requests
 from dotenv import load_dotenv
-import os
+
+from page_fetcher import DEFAULT_CACHE_DIR, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST, PageFetcher, page_rows, serve_stub, stub_pages
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 load_dotenv()
 
 API_KEY=os.environ.get('PROGRAMMABLE_SEARCH_ENGINE_API_KEY')
 CSE_ID=os.environ.get('CUSTOM_SEARCH_ENGINE_ID')
-query="India"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def search_links(query):
+    url=f"https://www.googleapis.com/customsearch/v1?key={API_KEY}&cx={CSE_ID}&q={query}"
+    response=requests.get(url)
+    results=response.json()
+    return [(item['title'], item['link']) for item in results.get('items',[])]
+
+
+def build_ingestor(persist_dir, query):
+    # Chroma store for fetched pages; each query keeps its own manifest so its pages are synced independently
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain.vectorstores import Chroma
+    from rag_core.ingest import IncrementalIngestor
+    from rag_core.registry import acquire_chroma_client, acquire_embeddings
+
+    vectordb = Chroma(client=acquire_chroma_client(persist_dir), persist_directory=persist_dir,
+                      embedding_function=acquire_embeddings(EMBEDDING_MODEL, pipeline="pages"))
+    manifest_path = os.path.join(persist_dir, f"manifest_{''.join(c if c.isalnum() else '_' for c in query)}.json")
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    return vectordb, IncrementalIngestor(vectordb, text_splitter, manifest_path, pipeline="pages")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch Custom Search results concurrently and optionally ingest them")
+    parser.add_argument("--query", default="India")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-browser", action="store_true", help="Never start Chrome, even for JavaScript-only pages")
+    parser.add_argument("--ingest-dir", help="Stream extracted text into a Chroma store in this directory")
+    parser.add_argument("--stub", type=int, metavar="PAGES", help="Fetch this many pages from a local HTTP stub instead of searching")
+    args = parser.parse_args()
+
+    server = None
+    if args.stub:
+        server, base_url = serve_stub(stub_pages(args.stub), delay_s=0.3)
+        links = [(path, base_url + path) for path in server.RequestHandlerClass.pages]
+    else:
+        links = search_links(args.query)
+    for title, link in links:
+        print(f"Opening : {title} -{link}")
+
+    fetcher = PageFetcher(args.concurrency, args.per_host, cache_dir=args.cache_dir, use_browser=not args.no_browser)
+    start = time.perf_counter()
+    try:
+        def pages():
+            # Each page is printed and handed on as soon as it arrives; nothing waits for the slowest link
+            for page in fetcher.stream(link for _, link in links):
+                print(f"[{page['source']}] {page['url']} - {len(page['text'])} chars"
+                      + (f" ({page['error']})" if page["error"] else ""))
+                yield page
 
-url=f"https://www.googleapis.com/customsearch/v1?key={API_KEY}&cx={CSE_ID}&q={query}"
-response=requests.get(url)
-results=response.json()
+        if args.ingest_dir:
+            vectordb, ingestor = build_ingestor(args.ingest_dir, args.query)
+            gone = []  # Filled while the pages stream through; sync_delta reads it once they have all arrived
+            stats = ingestor.sync_delta(page_rows(pages(), gone), gone)
+            vectordb.persist()
+            print(f"Synced fetched pages: {stats}")
+        else:
+            for _ in pages():
+                pass
+    finally:
+        fetcher.close()
+        if server:
+            server.shutdown()
+        if args.ingest_dir:
+            from rag_core.registry import REGISTRY
+            REGISTRY.close()  # Embedding worker processes and cache
+    print(f"Fetched {len(links)} links in {time.perf_counter() - start:.2f}s: {dict(fetcher.stats)}")
 
-driver=webdriver.Chrome()
-for item in results.get('items',[]):
-    title=item['title']
-    link=item['link']
-    print(f"Opening : {title} -{link}")
-    driver.get(link)
-    time.sleep(3)
 
-driver.quit()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
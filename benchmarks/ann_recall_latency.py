@@ -0,0 +1,136 @@
+# Recall@k vs p99 latency of the vector index backends, with a sweep over HNSW build/search parameters
+# and over the quantized backend's compression mode and rescoring shortlist. RAM MB is what stays resident:
+# the quantized backend's full-precision vectors live in a memory-mapped file that is only read for rescoring.
+# Vectors come from an existing Chroma store (--persist-dir) or are synthetic clustered data (--size).
+# Usage: python benchmarks/ann_recall_latency.py --size 200000 --dim 768 --plot ann.png
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.vector_index import QUANTIZATIONS, create_index, load_index
+
+
+def synthetic_vectors(size, dim, clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size)
+    return centers[labels] + 0.3 * rng.normal(size=(size, dim)).astype(np.float32)
+
+
+def chroma_vectors(persist_dir, collection_name, page_size=5000):
+    import chromadb
+    collection = chromadb.PersistentClient(path=persist_dir).get_collection(collection_name)
+    blocks = []
+    offset = 0
+    while True:
+        page = collection.get(limit=page_size, offset=offset, include=["embeddings"])
+        if not len(page["ids"]):
+            break
+        blocks.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += len(page["ids"])
+    return np.concatenate(blocks)
+
+
+def measure(index, queries, truth, k):
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = index.search([query], k)[0][0]
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(found) & expected)
+    latencies.sort()
+    return hits / (len(queries) * k), latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector index recall vs latency")
+    parser.add_argument("--persist-dir", help="Read embeddings from this Chroma store instead of generating them")
+    parser.add_argument("--collection", default="langchain", help="Chroma collection name (LangChain's default)")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--M", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--quantization", nargs="+", default=list(QUANTIZATIONS), choices=QUANTIZATIONS)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[0, 50, 200],
+                        help="Full-precision rescoring shortlist sizes (0 = compressed scores only)")
+    parser.add_argument("--plot", help="Write a recall vs p99 latency chart to this PNG")
+    args = parser.parse_args()
+
+    vectors = chroma_vectors(args.persist_dir, args.collection) if args.persist_dir else synthetic_vectors(args.size, args.dim)
+    ids = list(range(len(vectors)))
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)] + 0.05 * rng.normal(size=(args.queries, vectors.shape[1])).astype(np.float32)
+    print(f"{len(vectors)} vectors of dim {vectors.shape[1]}, {args.queries} queries, k={args.k}")
+
+    points = {}
+    print(f"{'backend':>26} {'build s':>8} {'RAM MB':>8} {'recall':>7} {'p99 ms':>8}")
+    for dtype in ("float32", "float16"):
+        exact = create_index("numpy", vectors.shape[1], dtype=dtype)
+        start = time.perf_counter()
+        exact.add(ids, vectors)
+        _ = exact.matrix
+        build = time.perf_counter() - start
+        if dtype == "float32":
+            truth = [set(found) for found, _ in exact.search(queries, args.k)]
+        recall, p99 = measure(exact, queries, truth, args.k)
+        ram = exact.resident_bytes() / 2 ** 20
+        if dtype == "float32":
+            baseline_ram = ram
+        print(f"{'numpy ' + dtype:>26} {build:>8.2f} {ram:>8.1f} {recall:>7.3f} {p99:>8.2f}")
+        points.setdefault(f"numpy {dtype}", []).append((p99, recall))
+
+    for M in args.M:
+        index = create_index("hnsw", vectors.shape[1], M=M, max_elements=len(vectors))
+        start = time.perf_counter()
+        index.add(ids, vectors)
+        build = time.perf_counter() - start
+        for ef in args.ef:
+            index.set_ef(max(ef, args.k))
+            recall, p99 = measure(index, queries, truth, args.k)
+            print(f"{f'hnsw M={M} ef={ef}':>26} {build:>8.2f} {'-':>8} {recall:>7.3f} {p99:>8.2f}")
+            points.setdefault(f"hnsw M={M}", []).append((p99, recall))
+
+    for quantization in args.quantization:
+        index = create_index("quantized", vectors.shape[1], quantization=quantization)
+        start = time.perf_counter()
+        index.add(ids, vectors)
+        with tempfile.TemporaryDirectory() as path:
+            # Round-trip through disk so the full-precision vectors are memory-mapped, as when serving
+            index.save(path)
+            build = time.perf_counter() - start
+            index = load_index(path)
+            ram = index.resident_bytes() / 2 ** 20
+            for rescore in args.rescore:
+                index.rescore = rescore
+                recall, p99 = measure(index, queries, truth, args.k)
+                label = f"{quantization} rescore={rescore}"
+                print(f"{label:>26} {build:>8.2f} {ram:>8.1f} {recall:>7.3f} {p99:>8.2f}")
+                points.setdefault(f"quantized {quantization}", []).append((p99, recall))
+            print(f"{'':>26} {quantization} saves {100 * (1 - ram / baseline_ram):.1f}% RAM vs numpy float32")
+            del index  # Release the memory map before the directory is removed
+
+    if args.plot:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        for label, series in points.items():
+            plt.plot([p for p, _ in series], [r for _, r in series], marker="o", label=label)
+        plt.xlabel("p99 latency (ms)")
+        plt.ylabel(f"recall@{args.k}")
+        plt.xscale("log")
+        plt.legend()
+        plt.grid(True, alpha=0.3)
+        plt.savefig(args.plot, dpi=120, bbox_inches="tight")
+        print(f"Plot saved to {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
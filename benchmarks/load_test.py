@@ -0,0 +1,58 @@
+# Load test for the async serving mode against a local stub LLM.
+# Usage: python benchmarks/load_test.py [--requests 256] [--retrieval-ms 20] [--llm-ms 200]
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.serving import AsyncQAService
+from stubs import StubQAChain, StubStreamingLLM
+
+CONCURRENCY_LEVELS = [1, 8, 32]
+
+
+# --- Load generation ---
+async def run_level(service, concurrency, total_requests):
+    latencies = []
+    counter = iter(range(total_requests))
+
+    async def user():
+        for i in counter:
+            start = time.perf_counter()
+            await service.arun(f"question {i}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "rps": total_requests / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async QA serving load test")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--retrieval-ms", type=float, default=20)
+    parser.add_argument("--llm-ms", type=float, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    chain = StubQAChain(args.retrieval_ms / 1000, StubStreamingLLM(first_token_s=args.llm_ms / 1000, tokens=1))
+    service = AsyncQAService(chain, max_workers=args.workers)
+    print(f"{'users':>6} {'p50 ms':>10} {'p99 ms':>10} {'req/s':>10}")
+    for concurrency in CONCURRENCY_LEVELS:
+        stats = asyncio.run(run_level(service, concurrency, args.requests))
+        print(f"{stats['concurrency']:>6} {stats['p50_ms']:>10.1f} {stats['p99_ms']:>10.1f} {stats['rps']:>10.1f}")
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
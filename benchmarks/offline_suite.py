@@ -0,0 +1,311 @@
+# Offline ingestion + query benchmark on synthetic news/medical corpora, through the bots' real code paths
+# (CSV streaming, token chunking into a parquet chunk file, incremental sync into Chroma and BM25, vector index,
+# hybrid retrieval, RetrievalQA) with a hashing embedding and a fake LLM.
+# Every (corpus, rows) pair runs in a fresh process, so peak RSS belongs to that run alone.
+# Usage: python benchmarks/offline_suite.py --corpus news medical --rows 10000 100000 --output results.json
+#        python benchmarks/offline_suite.py --rows 10000 --baseline results.json   # flag regressions vs a saved run
+#        python benchmarks/offline_suite.py --rows 10000 --rerank --llm-ms-per-prompt-token 0.5 --baseline results.json
+#        python benchmarks/offline_suite.py --index-backend quantized --index-params '{"quantization": "int8"}'
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.chunking import DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS
+from rag_core.metrics import count_tokens
+from rag_core.vector_index import INDEX_BACKENDS
+from synthetic import TEXT_COLUMNS, HashEmbeddings, make_questions, write_corpus
+
+ANSWER = "A deterministic answer from the benchmark stand-in."
+PROMPT_TOKENS = []  # Filled by the LLM stand-in, one entry per QA call
+
+# Metric -> True if higher is better; used when comparing against a baseline
+COMPARED_METRICS = {
+    "rows_per_s": True,
+    "embedded_docs_per_s": True,
+    "ingest_s": False,
+    "chunk_s": False,
+    "index_build_s": False,
+    "size_on_disk_mb": False,
+    "peak_rss_mb": False,
+    "retrieve_p50_ms": False,
+    "retrieve_p99_ms": False,
+    "qa_p50_ms": False,
+    "qa_p99_ms": False,
+    "prompt_tokens_mean": False,
+}
+
+
+def dir_size_mb(path):
+    total = 0
+    for root, _, names in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+    return total / 2 ** 20
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10  # bytes on macOS, KiB on Linux
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return (statistics.median(latencies) * 1000,
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000)
+
+
+def fake_llm(ms_per_prompt_token=0.0):
+    # Fixed answer; optionally sleeps in proportion to the prompt, like a hosted model's prefill
+    try:
+        from langchain_core.language_models.llms import LLM
+    except ImportError:
+        from langchain.llms.base import LLM
+
+    class BenchLLM(LLM):
+        ms_per_prompt_token: float = 0.0
+
+        @property
+        def _llm_type(self):
+            return "offline-bench"
+
+        def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+            tokens = count_tokens(prompt)
+            PROMPT_TOKENS.append(tokens)
+            time.sleep(tokens * self.ms_per_prompt_token / 1000)
+            return ANSWER
+
+    return BenchLLM(ms_per_prompt_token=ms_per_prompt_token)
+
+
+def ingest(kind, csv_path, persist_dir, embeddings, args):
+    # Mirrors the bots, both syncing through the incremental ingestor with BM25 kept in step with Chroma:
+    # news splits rows into token chunks in the process pool, writes the parquet chunk file and syncs from it;
+    # medical syncs one document per row
+    from langchain.vectorstores import Chroma
+    from rag_core.chunking import TokenChunker, iter_chunked_rows
+    from rag_core.hybrid import load_or_build_bm25
+    from rag_core.ingest import IncrementalIngestor, content_hash
+    from rag_core.loader import iter_csv_rows
+
+    vectordb = Chroma(persist_directory=persist_dir, embedding_function=embeddings)
+    bm25_path = os.path.join(persist_dir, "bm25_index.pkl")
+    bm25 = load_or_build_bm25(vectordb, bm25_path)
+    ingestor = IncrementalIngestor(vectordb, None, os.path.join(persist_dir, "ingest_manifest.json"),
+                                   keyword_index=bm25, pipeline="bench")
+    chunk_s = None
+    if kind == "news":
+        chunker = TokenChunker(args.tokenizer, chunk_tokens=args.chunk_tokens, overlap_tokens=args.overlap_tokens,
+                               num_workers=args.chunk_workers, pipeline="bench")
+        chunk_path = os.path.join(persist_dir, "chunks.parquet")
+        rows = ((None, text, metadata) for text, metadata in
+                iter_csv_rows(csv_path, TEXT_COLUMNS[kind], max_memory_mb=args.max_memory_mb, with_row_ids=True))
+        start = time.perf_counter()
+        try:
+            chunker.write_chunk_file(rows, chunk_path, csv_path)
+        finally:
+            chunker.close()
+        chunk_s = time.perf_counter() - start
+        stats = ingestor.sync_chunks(iter_chunked_rows(chunk_path), source_path=csv_path)
+    else:
+        from langchain.schema import Document
+        rows = ((None, content_hash(text), [Document(page_content=text, metadata=metadata)]) for text, metadata in
+                iter_csv_rows(csv_path, TEXT_COLUMNS[kind], max_memory_mb=args.max_memory_mb))
+        stats = ingestor.sync_chunks(rows, source_path=csv_path)
+    if hasattr(vectordb, "persist"):
+        vectordb.persist()  # Older langchain Chroma wrappers only write on persist()
+    bm25.save(bm25_path)
+    return vectordb, bm25, stats["added"], chunk_s
+
+
+def timed_queries(fn, questions, warmup=5):
+    for question in questions[:warmup]:
+        fn(question)
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        fn(question)
+        latencies.append(time.perf_counter() - start)
+    return percentiles(latencies)
+
+
+def run_one(kind, rows, args):
+    from langchain.chains import RetrievalQA
+    from rag_core.hybrid import HybridRetriever
+    from rag_core.rerank import CrossEncoderReranker, RerankingRetriever
+    from rag_core.vector_index import load_or_build_index
+
+    csv_path = write_corpus(os.path.join(args.work_dir, f"{kind}_{rows}_seed{args.seed}.csv"), kind, rows, args.seed)
+    persist_dir = tempfile.mkdtemp(prefix=f"bench_{kind}_", dir=args.work_dir)
+    try:
+        embeddings = HashEmbeddings(dim=args.dim)
+        start = time.perf_counter()
+        vectordb, bm25, row_count, chunk_s = ingest(kind, csv_path, persist_dir, embeddings, args)
+        ingest_s = time.perf_counter() - start
+        chunks = vectordb._collection.count()
+        embed_s = embeddings.seconds
+
+        vector_index = None
+        index_build_s = None
+        if args.index_backend != "chroma":
+            start = time.perf_counter()
+            vector_index = load_or_build_index(vectordb, args.index_backend,
+                                               os.path.join(persist_dir, f"{args.index_backend}_index"), rebuild=True,
+                                               **args.index_params)
+            index_build_s = time.perf_counter() - start
+
+        retriever = HybridRetriever(vectordb=vectordb, bm25=bm25, k=args.rerank_fetch_k if args.rerank else args.k,
+                                    fetch_k=args.fetch_k, vector_index=vector_index)
+        if args.rerank:
+            retriever = RerankingRetriever(base_retriever=retriever,
+                                           reranker=CrossEncoderReranker(args.rerank_model, pipeline="bench").load(),
+                                           token_budget=args.context_tokens, max_docs=args.rerank_max_docs)
+        qa = RetrievalQA.from_chain_type(llm=fake_llm(args.llm_ms_per_prompt_token), chain_type="stuff",
+                                         retriever=retriever)
+        questions = make_questions(kind, args.queries, args.seed)
+        retrieve_p50, retrieve_p99 = timed_queries(retriever.get_relevant_documents, questions)
+        qa_p50, qa_p99 = timed_queries(lambda q: qa.invoke({"query": q}), questions)
+        prompt_tokens = PROMPT_TOKENS[-len(questions):]
+
+        return {
+            "corpus": kind,
+            "rows": row_count,
+            "chunks": chunks,
+            "ingest_s": round(ingest_s, 3),
+            "rows_per_s": round(row_count / ingest_s, 1),
+            "chunk_s": round(chunk_s, 3) if chunk_s is not None else None,
+            "embedded_docs_per_s": round(chunks / embed_s, 1) if embed_s else None,
+            "index_backend": args.index_backend,
+            "index_params": args.index_params,
+            "index_build_s": round(index_build_s, 3) if index_build_s is not None else None,
+            "size_on_disk_mb": round(dir_size_mb(persist_dir), 2),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "retrieve_p50_ms": round(retrieve_p50, 2),
+            "retrieve_p99_ms": round(retrieve_p99, 2),
+            "qa_p50_ms": round(qa_p50, 2),
+            "qa_p99_ms": round(qa_p99, 2),
+            "rerank": args.rerank,
+            "prompt_tokens_mean": round(statistics.mean(prompt_tokens), 1),
+            "prompt_tokens_max": max(prompt_tokens),
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    # Returns the number of metrics that got worse by more than `tolerance` (relative)
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["corpus"], r["rows"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        base = baseline.get((result["corpus"], result["rows"]))
+        if base is None:
+            print(f"{result['corpus']}/{result['rows']}: no baseline run")
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            regressions += worse
+            print(f"{result['corpus']:>8} {result['rows']:>8} {metric:>20} {old:>10} -> {new:>10} "
+                  f"({change:+.1%}){'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible offline ingestion and query benchmark")
+    parser.add_argument("--corpus", nargs="+", choices=sorted(TEXT_COLUMNS), default=["news", "medical"])
+    parser.add_argument("--rows", nargs="+", type=int, default=[10000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of the hashing embedding stand-in")
+    parser.add_argument("--tokenizer", default="sentence-transformers/all-mpnet-base-v2",
+                        help="Tokenizer sizing the news chunks; the news bot uses its embedding model's")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS)
+    parser.add_argument("--chunk-workers", type=int, help="Splitting processes (default: all cores but one)")
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--index-backend", choices=["chroma", *INDEX_BACKENDS], default="chroma")
+    parser.add_argument("--index-params", type=json.loads, default={},
+                        help='JSON, as NEWS_INDEX_PARAMS, e.g. \'{"quantization": "int8", "rescore": 50}\'')
+    parser.add_argument("--rerank", action="store_true", help="Over-fetch, cross-encoder rerank and pack the context")
+    parser.add_argument("--rerank-model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    parser.add_argument("--rerank-fetch-k", type=int, default=20)
+    parser.add_argument("--rerank-max-docs", type=int, default=4)
+    parser.add_argument("--context-tokens", type=int, default=512)
+    parser.add_argument("--llm-ms-per-prompt-token", type=float, default=0.0,
+                        help="Simulated prefill cost, so prompt size shows up in QA latency")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-memory-mb", type=int, default=256)
+    parser.add_argument("--work-dir", default="./bench_data", help="Generated corpora are cached here between runs")
+    parser.add_argument("--keep", action="store_true", help="Keep the built stores for inspection")
+    parser.add_argument("--output", default="offline_bench.json")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative change counted as a regression")
+    parser.add_argument("--run-one", nargs=2, metavar=("CORPUS", "ROWS"), help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    os.makedirs(args.work_dir, exist_ok=True)
+
+    if args.run_one:
+        # Child process: one measurement, written where the parent asked
+        result = run_one(args.run_one[0], int(args.run_one[1]), args)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    results = []
+    child_args = list(sys.argv[1:])
+    for kind in args.corpus:
+        for rows in args.rows:
+            result_file = os.path.join(args.work_dir, f".result_{kind}_{rows}.json")
+            subprocess.run([sys.executable, os.path.abspath(__file__), *child_args,
+                            "--run-one", kind, str(rows), "--result-file", result_file], check=True)
+            with open(result_file, encoding="utf-8") as f:
+                results.append(json.load(f))
+            os.remove(result_file)
+            r = results[-1]
+            print(f"{kind:>8} {rows:>8} rows: {r['rows_per_s']:>9} rows/s, {r['embedded_docs_per_s']} docs/s embedded, "
+                  f"{r['size_on_disk_mb']} MB on disk, peak RSS {r['peak_rss_mb']} MB, "
+                  f"retrieve p50/p99 {r['retrieve_p50_ms']}/{r['retrieve_p99_ms']} ms, "
+                  f"qa p50/p99 {r['qa_p50_ms']}/{r['qa_p99_ms']} ms, {r['prompt_tokens_mean']} prompt tokens")
+
+    report = {
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("run_one", "result_file", "baseline", "output", "keep")},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "git_commit": git_commit(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Recall@k and query latency of dense-only vs hybrid (BM25 + dense, RRF) retrieval.
+# Questions file: JSONL with {"question": ..., "answer": ...}; a hit is a retrieved chunk containing the answer text.
+# Usage: python benchmarks/retrieval_recall.py --persist-dir news_chatbot/news_chroma_db --questions held_out.jsonl
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.embeddings import CachedEmbeddings
+from rag_core.hybrid import HybridRetriever, load_or_build_bm25
+
+K_VALUES = [1, 2, 4, 8]
+
+
+def load_questions(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(name, retrieve, questions, k):
+    hits = 0
+    latencies = []
+    for item in questions:
+        start = time.perf_counter()
+        docs = retrieve(item["question"], k)
+        latencies.append(time.perf_counter() - start)
+        answer = item["answer"].lower()
+        hits += any(answer in doc.page_content.lower() for doc in docs)
+    latencies.sort()
+    return {
+        "retriever": name,
+        "k": k,
+        "recall": hits / len(questions),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main():
+    from langchain.vectorstores import Chroma
+
+    parser = argparse.ArgumentParser(description="Compare dense and hybrid retrieval recall@k")
+    parser.add_argument("--persist-dir", required=True)
+    parser.add_argument("--questions", required=True)
+    parser.add_argument("--model", default="sentence-transformers/all-mpnet-base-v2")
+    parser.add_argument("--cache", default="./embedding_cache.sqlite3")
+    args = parser.parse_args()
+
+    embeddings = CachedEmbeddings(model_name=args.model, cache_path=args.cache)
+    vectordb = Chroma(persist_directory=args.persist_dir, embedding_function=embeddings)
+    bm25 = load_or_build_bm25(vectordb, os.path.join(args.persist_dir, "bm25_index.pkl"))
+    questions = load_questions(args.questions)
+    print(f"{len(questions)} questions, {vectordb._collection.count()} chunks, {len(bm25)} in BM25 index")
+
+    def dense(query, k):
+        return vectordb.similarity_search(query, k=k)
+
+    def hybrid(query, k):
+        return HybridRetriever(vectordb=vectordb, bm25=bm25, k=k).get_relevant_documents(query)
+
+    print(f"{'retriever':>10} {'k':>3} {'recall':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for k in K_VALUES:
+        for name, retrieve in (("dense", dense), ("hybrid", hybrid)):
+            r = evaluate(name, retrieve, questions, k)
+            print(f"{r['retriever']:>10} {r['k']:>3} {r['recall']:>8.3f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
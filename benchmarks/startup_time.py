@@ -0,0 +1,93 @@
+# Cold-start benchmark: module import time, time until /health answers, and time until /ready for each bot.
+# Each bot is started as a fresh process from its own directory, like a new replica would be.
+# Usage: python benchmarks/startup_time.py [--timeout 600] [--bots news_chatbot medical_chatbot]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BOTS = {
+    # bot directory -> environment variable holding its health port
+    "news_chatbot": "NEWS_HEALTH_PORT",
+    "medical_chatbot": "MEDICAL_HEALTH_PORT",
+    "personal_assistant": "ASSISTANT_HEALTH_PORT",
+}
+
+IMPORT_SNIPPET = """
+import importlib.util, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("bot_main", "main.py")
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print(time.perf_counter() - start)
+"""
+
+
+def import_time(bot_dir):
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=bot_dir, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def probe(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None, None
+
+
+def time_to_ready(bot_dir, port_env, port, timeout):
+    env = dict(os.environ, **{port_env: str(port)})
+    start = time.perf_counter()
+    # stdin stays open so the CLI bot sits at its prompt instead of exiting
+    process = subprocess.Popen([sys.executable, "main.py"], cwd=bot_dir, env=env, stdin=subprocess.PIPE,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    health_s = ready_s = None
+    state = "timeout"
+    try:
+        while time.perf_counter() - start < timeout and process.poll() is None:
+            if health_s is None:
+                code, _ = probe(port, "/health")
+                if code == 200:
+                    health_s = time.perf_counter() - start
+            else:
+                code, statuses = probe(port, "/ready")
+                states = {s["state"] for s in (statuses or {}).values()}
+                if code == 200:
+                    ready_s = time.perf_counter() - start
+                    state = "ready"
+                    break
+                if "failed" in states:
+                    state = "failed"
+                    break
+            time.sleep(0.05)
+    finally:
+        process.kill()
+        process.wait()
+    return health_s, ready_s, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot cold-start benchmark")
+    parser.add_argument("--bots", nargs="+", default=list(BOTS), choices=list(BOTS))
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--base-port", type=int, default=18081)
+    args = parser.parse_args()
+
+    print(f"{'bot':>20} {'import s':>9} {'health s':>9} {'ready s':>9}  state")
+    for offset, bot in enumerate(args.bots):
+        bot_dir = os.path.join(REPO_ROOT, bot)
+        imported = import_time(bot_dir)
+        health_s, ready_s, state = time_to_ready(bot_dir, BOTS[bot], args.base_port + offset, args.timeout)
+        fmt = lambda value: f"{value:>9.2f}" if value is not None else f"{'-':>9}"
+        print(f"{bot:>20} {imported:>9.2f} {fmt(health_s)} {fmt(ready_s)}  {state}")
+
+
+if __name__ == "__main__":
+    main()
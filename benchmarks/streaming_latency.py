@@ -0,0 +1,106 @@
+# Time-to-first-token vs total latency for streamed answers, compared with the blocking path,
+# against a local fake streaming LLM. --check asserts the event contract instead (order, cache, cancellation).
+# Usage: python benchmarks/streaming_latency.py [--requests 20] [--first-token-ms 300] [--token-ms 20] [--check]
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.qa_cache import SemanticQACache
+from rag_core.serving import AsyncQAService
+from stubs import StubQAChain, StubStreamingLLM
+
+
+async def blocking_latency(service, query):
+    start = time.perf_counter()
+    await service.arun(query)
+    elapsed = (time.perf_counter() - start) * 1000
+    return {"first_output_ms": elapsed, "total_ms": elapsed}
+
+
+async def streamed_latency(service, query):
+    first_output = None
+    start = time.perf_counter()
+    async for kind, payload in service.astream({"query": query}):
+        if first_output is None:
+            first_output = (time.perf_counter() - start) * 1000  # Sources reach the UI here
+        if kind == "done":
+            timings = payload["timings"]
+    return {"first_output_ms": first_output, "first_token_ms": timings["first_token_ms"], "total_ms": timings["total_ms"]}
+
+
+async def run(args):
+    llm = StubStreamingLLM(first_token_s=args.first_token_ms / 1000, token_s=args.token_ms / 1000, tokens=args.tokens)
+    service = AsyncQAService(StubQAChain(args.retrieval_ms / 1000, llm))
+    for name, measure in (("blocking", blocking_latency), ("streamed", streamed_latency)):
+        samples = [await measure(service, f"question {i}") for i in range(args.requests)]
+        summary = ", ".join(f"{key} p50={statistics.median(s[key] for s in samples):.0f}"
+                            for key in samples[0])
+        print(f"{name:>9}: {summary}")
+    service.shutdown()
+
+
+async def check():
+    # Fails with an AssertionError on the first violation of what the front ends rely on
+    llm = StubStreamingLLM(first_token_s=0.05, token_s=0.005, tokens=20)
+    cache = SemanticQACache()
+    service = AsyncQAService(StubQAChain(0.01, llm), cache=cache)
+
+    # Fresh answer: sources exactly once before any token, then tokens, then one "done" carrying the streamed text
+    events = [event async for event in service.astream({"query": "event order"})]
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "sources" and kinds[-1] == "done", kinds
+    assert set(kinds[1:-1]) == {"token"} and len(kinds) == llm.tokens + 2, kinds
+    done = events[-1][1]
+    assert done["result"]["result"] == "".join(payload for kind, payload in events if kind == "token")
+    timings = done["timings"]
+    assert timings["retrieval_ms"] <= timings["first_token_ms"] <= timings["total_ms"], timings
+
+    # Cache hit: same order, one token holding the whole answer
+    kinds = [kind async for kind, _ in service.astream({"query": "event order"})]
+    assert kinds == ["sources", "token", "done"], kinds
+    assert cache.stats["exact_hits"] == 1, cache.stats
+
+    # Client goes away after the first token: the LLM stream is cancelled and the partial answer is not cached
+    first_token = asyncio.Event()
+
+    async def consume():
+        async for kind, _ in service.astream({"query": "cancelled"}):
+            if kind == "token":
+                first_token.set()
+
+    task = asyncio.create_task(consume())
+    await first_token.wait()
+    task.cancel()
+    try:
+        await task
+        raise AssertionError("stream finished despite cancellation")
+    except asyncio.CancelledError:
+        pass
+    assert llm.cancelled == 1, llm.cancelled
+    assert cache.lookup("cancelled")[0] is None, "partial answer was cached"
+
+    # The service keeps serving after a cancelled request
+    kinds = [kind async for kind, _ in service.astream({"query": "after cancel"})]
+    assert kinds[0] == "sources" and kinds[-1] == "done", kinds
+    service.shutdown()
+    print("Streaming checks passed: event order, cache hit order, cancellation")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming vs blocking answer latency")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--retrieval-ms", type=float, default=30)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--check", action="store_true", help="Assert the streaming event contract and exit")
+    args = parser.parse_args()
+    asyncio.run(check() if args.check else run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Local stand-ins for the retriever and LLM pieces of a RetrievalQA chain, shaped like the LangChain objects
+# rag_core.serving touches. No model downloads or network calls.
+import asyncio
+import time
+
+
+class StubDocument:
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class StubRetriever:
+    def __init__(self, latency_s):
+        self.latency_s = latency_s
+
+    def get_relevant_documents(self, query):
+        time.sleep(self.latency_s)  # Blocking, like an embedding + Chroma search
+        return [StubDocument(f"context for {query}")]
+
+
+class StubPrompt:
+    def format_prompt(self, context, question):
+        return f"Context: {context}\nQuestion: {question}\nAnswer:"
+
+
+class StubStreamingLLM:
+    # Emits `tokens` words, the first after `first_token_s` and the rest every `token_s` (async client behaviour)
+    def __init__(self, first_token_s=0.2, token_s=0.02, tokens=40):
+        self.first_token_s = first_token_s
+        self.token_s = token_s
+        self.tokens = tokens
+        self.cancelled = 0  # Streams abandoned mid-answer, e.g. the client went away
+
+    async def astream(self, prompt):
+        try:
+            await asyncio.sleep(self.first_token_s)
+            for i in range(self.tokens):
+                if i:
+                    await asyncio.sleep(self.token_s)
+                yield f"word{i} "
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    async def ainvoke(self, prompt):
+        return "".join([token async for token in self.astream(prompt)])
+
+
+class StubLLMChain:
+    def __init__(self, llm):
+        self.llm = llm
+        self.prompt = StubPrompt()
+
+
+class StubCombineChain:
+    def __init__(self, llm):
+        self.llm_chain = StubLLMChain(llm)
+
+    def _get_inputs(self, docs, question):
+        return {"context": "\n\n".join(doc.page_content for doc in docs), "question": question}
+
+    async def arun(self, input_documents, question):
+        prompt = self.llm_chain.prompt.format_prompt(**self._get_inputs(input_documents, question))
+        return await self.llm_chain.llm.ainvoke(prompt)
+
+
+class StubQAChain:
+    input_key = "query"
+    output_key = "result"
+    return_source_documents = False
+
+    def __init__(self, retrieval_s=0.02, llm=None):
+        self.retriever = StubRetriever(retrieval_s)
+        self.combine_documents_chain = StubCombineChain(llm or StubStreamingLLM())
+
+    def prep_outputs(self, inputs, outputs):
+        return {**inputs, **outputs}
@@ -0,0 +1,116 @@
+# Deterministic synthetic corpora and a hashing embedding stand-in for offline benchmarks.
+# Same seed + size always produces the same CSV, the same vectors and the same questions.
+import csv
+import hashlib
+import os
+import random
+import re
+import time
+
+import numpy as np
+
+TOPICS = {
+    "news": {
+        "politics": "parliament election minister coalition ballot senate policy reform vote campaign",
+        "economy": "inflation market shares rupee budget exports growth interest bank investors",
+        "sports": "cricket match wicket tournament goal league coach stadium final championship",
+        "technology": "startup software chip smartphone launch cloud satellite network data privacy",
+        "weather": "monsoon rainfall cyclone temperature flood heatwave forecast drought storm coast",
+        "health": "hospital vaccine outbreak doctors patients clinic treatment ministry cases ward",
+    },
+    "medical": {
+        "cardiology": "heart arrhythmia hypertension cholesterol stent angina murmur ecg palpitations valve",
+        "respiratory": "asthma bronchitis pneumonia inhaler wheezing cough spirometry oxygen lungs sputum",
+        "diabetes": "insulin glucose hba1c metformin neuropathy retinopathy hypoglycemia diet pancreas thirst",
+        "infection": "fever antibiotics bacteria culture sepsis viral swab rash chills pathogen",
+        "neurology": "migraine seizure stroke numbness tremor mri neuron dizziness memory nerve",
+        "orthopedics": "fracture ligament cartilage arthritis joint spine tendon cast physiotherapy knee",
+    },
+}
+FILLER = ("the a of and to in on for with after said report reported officials local new week year "
+          "early late today major recent according during while under over").split()
+# Column layout each bot reads: news_chatbot's Content column, medical_chatbot's column "a"
+TEXT_COLUMNS = {"news": "Content", "medical": "a"}
+WORDS_PER_ROW = {"news": (120, 400), "medical": (40, 160)}
+
+
+def _row_text(rng, topic_words, length):
+    words = []
+    while len(words) < length:
+        sentence = [rng.choice(topic_words) if rng.random() < 0.35 else rng.choice(FILLER)
+                    for _ in range(rng.randint(8, 20))]
+        sentence[0] = sentence[0].capitalize()
+        words.extend(sentence)
+        words[-1] += "."
+    return " ".join(words)
+
+
+def write_corpus(path, kind, rows, seed=0):
+    # Streams rows to disk, so a 1M-row corpus never sits in memory; reused if it already exists
+    if os.path.exists(path):
+        return path
+    rng = random.Random(seed)
+    topics = {name: words.split() for name, words in TOPICS[kind].items()}
+    names = sorted(topics)
+    low, high = WORDS_PER_ROW[kind]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        if kind == "news":
+            writer.writerow(["Headline", "Content", "Topic"])
+        else:
+            writer.writerow(["a"])
+        for i in range(rows):
+            topic = names[rng.randrange(len(names))]
+            text = _row_text(rng, topics[topic], rng.randint(low, high))
+            if kind == "news":
+                writer.writerow([f"{topic.title()} update {i}", text, topic])
+            else:
+                writer.writerow([text])
+    os.replace(tmp_path, path)
+    return path
+
+
+def make_questions(kind, count, seed=0):
+    rng = random.Random(seed + 1)
+    topics = {name: words.split() for name, words in TOPICS[kind].items()}
+    names = sorted(topics)
+    questions = []
+    for _ in range(count):
+        words = rng.sample(topics[names[rng.randrange(len(names))]], 3)
+        questions.append(f"What is the latest on {words[0]} and {words[1]} {words[2]}?")
+    return questions
+
+
+# --- Embedding stand-in: feature hashing of word tokens, L2-normalised ---
+class HashEmbeddings:
+    # Same interface as a LangChain Embeddings object; no model download, identical vectors on every run.
+    # Keeps its own counters so the suite can report embedding throughput separately from the rest of ingestion.
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.texts_embedded = 0
+        self.seconds = 0.0
+        self._buckets = {}
+
+    def _bucket(self, token):
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = self._buckets[token] = (digest % self.dim, 1.0 if digest >> 63 else -1.0)
+        return bucket
+
+    def embed_documents(self, texts):
+        start = time.perf_counter()
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                index, sign = self._bucket(token)
+                matrix[row, index] += sign
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        self.texts_embedded += len(texts)
+        self.seconds += time.perf_counter() - start
+        return matrix.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
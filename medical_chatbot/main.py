@@ -1,55 +1,174 @@
-import pandas as pd
+import argparse
 import os
-from langchain.embeddings import SentenceTransformerEmbeddings
-from langchain.chat_models import ChatOpenAI
-from langchain.vectorstores import Chroma
-from langchain.llms import OpenAI 
-from langchain.chains import RetrievalQA 
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.metrics import maybe_profile, span
+from rag_core.registry import REGISTRY
+from rag_core.warmup import BackgroundWarmup, start_health_server
 
 persist_dir="./chroma_db"
+bm25_path=os.path.join(persist_dir, "bm25_index.pkl")
+manifest_path=os.path.join(persist_dir, "medical_manifest.json")
 embedding_model_name="all-MiniLM-L6-v2"
 openai_model_name="gpt-3.5-turbo"
-os.environ["OPENAI_API_KEY"]="YOUR_OPENAI_API_KEY"
-try:
-    df=pd.read_csv("alldata_1_for_kaggle.csv",encoding="latin-1")
-    df['text']=df['a']
-    df=df[['text']]
-    texts=df['text'].tolist()
-    metadatas=df.to_dict('records')
-    print(f"Loaded {len(texts)} documents")
-
-    embedding_func=SentenceTransformerEmbeddings(model_name=embedding_model_name)
-    if os.path.exists(persist_dir):
-        vectordb=Chroma(persist_directory=persist_dir, embedding_function=embedding_func)
-        print(f"Loaded existing vector db with {len(vectordb)} documents")
-    else:
-        vectordb=Chroma.from_texts(
-            texts=texts,
-            embedding=embedding_func,
-            metadatas=metadatas,
-            persist_directory=persist_dir,
-        )
+dataset_path="alldata_1_for_kaggle.csv"
+max_memory_mb=256
+embedding_cache_path="./embedding_cache.sqlite3"
+health_port=int(os.environ.get("MEDICAL_HEALTH_PORT", 8082))
+pipeline="medical"  # Label on this bot's metrics
+rerank=os.environ.get("MEDICAL_RERANK", "1")=="1"  # Over-fetch, rerank with a cross-encoder, pack into context_tokens
+rerank_fetch_k=int(os.environ.get("MEDICAL_RERANK_FETCH_K", 20))
+context_tokens=int(os.environ.get("MEDICAL_CONTEXT_TOKENS", 512))
+os.environ.setdefault("OPENAI_API_KEY", "YOUR_OPENAI_API_KEY")  # A real key in the environment wins
+
+
+def clear_collection(vectordb, page_size=5000):
+    while True:
+        ids=vectordb._collection.get(limit=page_size, include=[])["ids"]
+        if not ids:
+            break
+        vectordb._collection.delete(ids=ids)
+
+
+def build_pipeline(resources=None):
+    # Heavy imports (langchain, chromadb, sentence-transformers, pandas) happen here, in the warm-up thread.
+    # `resources` is a rag_core.registry lease when several bots share one process (rag_server).
+    from langchain.chat_models import ChatOpenAI
+    from langchain.vectorstores import Chroma
+    from langchain.chains import RetrievalQA 
+    from langchain.schema import Document
+    from rag_core.hybrid import HybridRetriever, load_or_build_bm25
+    from rag_core.ingest import IncrementalIngestor, content_hash, manifest_version
+    from rag_core.loader import iter_csv_rows
+    from rag_core.qa_cache import CachedQA, SemanticQACache
+    from rag_core.registry import REGISTRY, acquire_chroma_client, acquire_embeddings, acquire_reranker
+    from rag_core.rerank import RerankingRetriever
+
+    resources=resources or REGISTRY
+    embedding_func=acquire_embeddings(embedding_model_name, cache_path=embedding_cache_path, resources=resources, pipeline=pipeline)
+    vectordb=Chroma(client=acquire_chroma_client(persist_dir, resources=resources), persist_directory=persist_dir, embedding_function=embedding_func)
+    if not os.path.exists(manifest_path) and vectordb._collection.count():
+        # Vectors without a manifest come from the old append-only loader (random ids the manifest cannot
+        # match), so start the collection over; the embedding cache makes adding them back cheap
+        print("Vector db has no ingest manifest, rebuilding it")
+        clear_collection(vectordb)
+    # The directory may already hold other bots' collections, so the manifest tracks this collection alone
+    bm25=load_or_build_bm25(vectordb, bm25_path)
+    ingestor=IncrementalIngestor(vectordb, None, manifest_path, keyword_index=bm25, pipeline=pipeline)
+    if os.path.exists(dataset_path) and ingestor.source_changed(dataset_path):
+        # One document per CSV row, streamed in bounded batches. The dataset is only recorded as ingested once
+        # the last batch is in, so an interrupted run resumes here: stored rows keep their ids, and their
+        # embeddings come from the cache. The empty manifest written first marks the vectors as ours.
+        ingestor.manifest.save()
+        rows=((None, content_hash(text), [Document(page_content=text, metadata=metadata)])
+              for text, metadata in iter_csv_rows(dataset_path, "a", encoding="latin-1", max_memory_mb=max_memory_mb))
+        stats=ingestor.sync_chunks(rows, source_path=dataset_path)
         vectordb.persist()
-        print(f"Vector db persisted")
+        bm25.save(bm25_path)
+        print(f"Synced vector db: {stats}")
+    elif ingestor.manifest.source is None:
+        raise FileNotFoundError(f"Dataset not found: {dataset_path}")
+    print(f"Loaded vector db with {vectordb._collection.count()} documents")
     llm=ChatOpenAI(model_name=openai_model_name)
     print("Model initialized")
-    retriever=vectordb.as_retriever(search_kwargs={"k":2})
+    retriever=HybridRetriever(vectordb=vectordb, bm25=bm25, k=rerank_fetch_k if rerank else 2)
+    if rerank:
+        retriever=RerankingRetriever(base_retriever=retriever, reranker=acquire_reranker(resources=resources, pipeline=pipeline),
+                                     token_budget=context_tokens, max_docs=4)
     qa_chain=RetrievalQA.from_llm(
         llm=llm,
         retriever=retriever
     )
+    # Any sync of the collection clears the cache, including edits that keep the document count
+    qa_cache=SemanticQACache(embeddings=embedding_func, version_fn=lambda: manifest_version(manifest_path))
+    qa_chain=CachedQA(qa_chain, qa_cache)
     print("RetrievalQA chain created")
-    while True:
-        ui=input('Enter your query:')
-        if ui.lower()=='exit':
-            print("Exiting the chatbot")
-            break
-        result=qa_chain({"query":ui})
-        print('Chatbot : ',result['result'])
-    
-except FileNotFoundError as e1:
-    print(e1)
-except ImportError as e2:
-    print(e2)
-except Exception as e:
-    print(e)
\ No newline at end of file
+    return qa_chain, qa_cache
+
+
+def build_service(resources=None, max_workers=4):
+    # Async front for rag_server; the standalone bot below stays a terminal loop on the sync chain
+    from rag_core.serving import AsyncQAService
+    qa_chain, qa_cache = build_pipeline(resources)
+    return AsyncQAService(qa_chain.chain, cache=qa_cache, max_workers=max_workers, pipeline=pipeline)
+
+
+def build_interface(warmup):
+    # Web UI used when rag_server mounts this bot; warmup builds build_service()
+    import gradio as gr
+
+    async def ask(query):
+        if not warmup.ready:
+            yield "Loading the medical index, your answer will follow shortly..."
+        service=await warmup.wait_async()
+        answer=""
+        with span("ui", pipeline):
+            async for kind, payload in service.astream({"query": query}):
+                if kind=="token":
+                    answer+=payload
+                    yield f"Chatbot : {answer}"
+    return gr.Interface(
+        fn=ask,
+        inputs=gr.Textbox(lines=2, placeholder="Enter your query..."),
+        outputs=gr.Textbox(),
+        title="Medical Chatbot"
+    )
+
+
+def run_batch(args):
+    # Offline mode: answer a whole file of questions, resumable, instead of the interactive prompt
+    from rag_core.batch_qa import BatchQARunner, read_queries
+
+    queries=read_queries(args.batch, query_field=args.query_field, id_field=args.id_field)
+    print(f"Read {len(queries)} queries from {args.batch}")
+    qa_chain, _ = build_pipeline()
+    runner=BatchQARunner(qa_chain.chain, concurrency=args.concurrency, batch_size=args.batch_size,
+                         max_retries=args.max_retries, pipeline=pipeline)
+    stats=runner.run(queries, args.output)
+    print(f"Batch complete: {stats}. Answers in {args.output}")
+
+
+def main():
+    parser=argparse.ArgumentParser(description="Medical chatbot: interactive, or batch answering with --batch")
+    parser.add_argument("--batch", help="JSONL or CSV file of questions to answer offline")
+    parser.add_argument("--output", default="answers.jsonl", help="JSONL results; rerunning resumes where it stopped")
+    parser.add_argument("--query-field", default="query")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight at once")
+    parser.add_argument("--batch-size", type=int, default=256, help="Questions embedded and searched together")
+    parser.add_argument("--max-retries", type=int, default=4)
+    args=parser.parse_args()
+    try:
+        if args.batch:
+            run_batch(args)
+            return
+        # The prompt is available immediately; the model and index load in the background
+        warmup=BackgroundWarmup("medical_chatbot", build_pipeline).start()
+        start_health_server(health_port, [warmup])
+        while True:
+            ui=input('Enter your query:')
+            if ui.lower()=='exit':
+                print("Exiting the chatbot")
+                if warmup.ready:
+                    qa_cache=warmup.result[1]
+                    print(f"QA cache stats: {qa_cache.stats} (hit rate {qa_cache.hit_rate():.0%})")
+                break
+            if not warmup.ready:
+                print("Loading the medical index, one moment...")
+            qa_chain, _ = warmup.wait()
+            with maybe_profile(f"{pipeline}-query"), span("query", pipeline):
+                result=qa_chain({"query":ui})
+            print('Chatbot : ',result['result'])
+
+    except FileNotFoundError as e1:
+        print(e1)
+    except ImportError as e2:
+        print(e2)
+    except Exception as e:
+        print(e)
+    finally:
+        REGISTRY.close()  # Stops the embedding worker processes and closes the embedding cache
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,96 @@
-import pandas as pd
+import json
 import os
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
-from langchain.llms import HuggingFaceHub
-from langchain.chains import RetrievalQA
-import gradio as gr
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.metrics import span
+from rag_core.registry import REGISTRY
+from rag_core.warmup import BackgroundWarmup, start_health_server
+
 # Define the path for the ChromaDB directory
 persist_dir = "./news_chroma_db"
+manifest_path = os.path.join(persist_dir, "ingest_manifest.json")
+bm25_path = os.path.join(persist_dir, "bm25_index.pkl")
+DATASET_PATH = "english_news_dataset.csv"
+TEXT_COLUMN = "Content"
+MAX_MEMORY_MB = 256  # Memory ceiling for each CSV batch held during ingestion
+# Token-sized chunks written once to a columnar file; re-embedding or re-indexing reads it instead of re-splitting
+CHUNK_FILE_PATH = "./news_chunks.parquet"
+CHUNK_TOKENS = int(os.environ.get("NEWS_CHUNK_TOKENS", 256))            # all-mpnet-base-v2 truncates at 384
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("NEWS_CHUNK_OVERLAP_TOKENS", 32))
+CHUNK_WORKERS = int(os.environ.get("NEWS_CHUNK_WORKERS", 0)) or None    # 0 = all cores but one
+EMBEDDING_CACHE_PATH = "./embedding_cache.sqlite3"  # Kept outside persist_dir so it survives a rebuild
+RETRIEVAL_WORKERS = int(os.environ.get("NEWS_RETRIEVAL_WORKERS", 8))    # Threads for blocking retrieval
+QUEUE_CONCURRENCY = int(os.environ.get("NEWS_QUEUE_CONCURRENCY", 16))   # Gradio requests served at once
+# Dense search backend: "chroma" (built-in), "numpy" (exact, memory-mapped), "hnsw" (approximate)
+# or "quantized" (int8/float16/binary/pq codes in RAM, top-N rescored from memory-mapped float32)
+INDEX_BACKEND = os.environ.get("NEWS_INDEX_BACKEND", "chroma")
+INDEX_PARAMS = json.loads(os.environ.get("NEWS_INDEX_PARAMS", "{}"))   # e.g. {"M": 32, "ef": 128} or {"quantization": "int8"}
+HEALTH_PORT = int(os.environ.get("NEWS_HEALTH_PORT", 8081))             # /health, /ready and /metrics
+PIPELINE = "news"                                                       # Label on this bot's metrics
+# Cross-encoder reranking: over-fetch RERANK_FETCH_K chunks, keep the best within CONTEXT_TOKENS
+RERANK = os.environ.get("NEWS_RERANK", "1") == "1"
+RERANK_FETCH_K = int(os.environ.get("NEWS_RERANK_FETCH_K", 20))
+CONTEXT_TOKENS = int(os.environ.get("NEWS_CONTEXT_TOKENS", 512))
+
 
-try:
-    # Load the dataset
-    df = pd.read_csv("english_news_dataset.csv", encoding="latin-1",on_bad_lines='skip')
-    TEXT_COLUMN = "Content"
-    df = df.dropna(subset=[TEXT_COLUMN])
-    texts = df[TEXT_COLUMN].tolist()
+def build_pipeline(resources=None):
+    # Heavy imports (langchain, chromadb, sentence-transformers, pandas) happen here, in the warm-up thread.
+    # `resources` is a rag_core.registry lease when several bots share one process (rag_server).
+    from langchain.vectorstores import Chroma
+    from langchain.llms import HuggingFaceHub
+    from langchain.chains import RetrievalQA
+    from rag_core.chunking import TokenChunker, chunk_file_current, iter_chunked_rows
+    from rag_core.hybrid import HybridRetriever, load_or_build_bm25
+    from rag_core.ingest import IncrementalIngestor, manifest_version
+    from rag_core.loader import iter_csv_rows
+    from rag_core.qa_cache import CachedQA, SemanticQACache
+    from rag_core.registry import REGISTRY, acquire_chroma_client, acquire_embeddings, acquire_reranker
+    from rag_core.rerank import RerankingRetriever
+    from rag_core.serving import AsyncQAService
+    from rag_core.vector_index import load_or_build_index
 
-    # Initialize text splitter
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    docs = text_splitter.create_documents(texts)
+    resources = resources or REGISTRY
 
     # Initialize embeddings
     embedding_model_name = "sentence-transformers/all-mpnet-base-v2"
-    embeddings = HuggingFaceEmbeddings(model_name=embedding_model_name)
-
-    # Check for existence of essential ChromaDB files before loading
-    expected_files = ["index/id_to_uuid.pkl", "index/uuid_to_id.pkl", "index/chroma-embeddings.parquet", "index/chroma-metadata.parquet", "chroma.sqlite3"]
-    all_files_present = all(os.path.exists(os.path.join(persist_dir, f)) for f in expected_files)
-
-    # Load or create the vector database
-    if os.path.exists(persist_dir) and os.listdir(persist_dir) and all_files_present:
-        try:
-            vectordb = Chroma(persist_directory=persist_dir, embedding_function=embeddings)
-            print(f"Loaded existing vector db with {vectordb._collection.count()} documents")
-        except Exception as load_error:
-            print(f"Error loading existing ChromaDB: {load_error}")
-            print("Creating a new vector database...")
-            vectordb = Chroma.from_documents(
-                documents=docs,
-                embedding=embeddings,
-                persist_directory=persist_dir
-            )
-            vectordb.persist()
-            print(f"Created and persisted new vector db with {vectordb._collection.count()} documents")
-    else:
-        print("Creating a new vector database...")
-        vectordb = Chroma.from_documents(
-            documents=docs,
-            embedding=embeddings,
-            persist_directory=persist_dir
-        )
+
+    # Initialize text splitter: sized in the embedding model's own tokens, so no chunk is silently truncated
+    text_splitter = TokenChunker(embedding_model_name, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                                 num_workers=CHUNK_WORKERS, pipeline=PIPELINE)
+    # Batched, multi-process CPU embedding with an on-disk cache, so rebuilds never re-embed seen text.
+    # Shared through the registry: one copy of the weights per process, whichever bot loads it first.
+    embeddings = acquire_embeddings(embedding_model_name, cache_path=EMBEDDING_CACHE_PATH, resources=resources,
+                                    pipeline=PIPELINE)
+
+    # Load (or create) the vector database and bring it up to date with the CSV.
+    # Only new or changed rows are split and embedded; an untouched CSV is not even read.
+    vectordb = Chroma(client=acquire_chroma_client(persist_dir, resources=resources), persist_directory=persist_dir,
+                      embedding_function=embeddings)
+    # Keyword index over the same chunks, updated by the ingestor alongside the vectors
+    bm25 = load_or_build_bm25(vectordb, bm25_path)
+    stats = None
+    ingestor = IncrementalIngestor(vectordb, text_splitter, manifest_path, keyword_index=bm25, pipeline=PIPELINE)
+    if ingestor.source_changed(DATASET_PATH):
+        if not chunk_file_current(CHUNK_FILE_PATH, text_splitter, DATASET_PATH):
+            # Stream the CSV in bounded batches through the splitting pool into the chunk file
+            rows = ((None, text, metadata) for text, metadata in
+                    iter_csv_rows(DATASET_PATH, TEXT_COLUMN, encoding="latin-1", max_memory_mb=MAX_MEMORY_MB,
+                                  with_row_ids=True))
+            print(f"Chunked dataset: {text_splitter.write_chunk_file(rows, CHUNK_FILE_PATH, DATASET_PATH)}")
+        text_splitter.close()
+        stats = ingestor.sync_chunks(iter_chunked_rows(CHUNK_FILE_PATH), source_path=DATASET_PATH)
         vectordb.persist()
-        print(f"Created and persisted new vector db with {vectordb._collection.count()} documents")
+        bm25.save(bm25_path)
+        print(f"Synced vector db: {stats}")
+    print(f"Loaded vector db with {vectordb._collection.count()} documents")
+
+    vector_index = None
+    if INDEX_BACKEND != "chroma":
+        # Built once from the stored embeddings; on every load, chunks added to or removed from the collection
+        # are applied to it. Rebuilt when INDEX_PARAMS change a build parameter (ef / rescore apply without one).
+        vector_index = load_or_build_index(vectordb, INDEX_BACKEND, os.path.join(persist_dir, f"{INDEX_BACKEND}_index"),
+                                           **INDEX_PARAMS)
+        print(f"Using {INDEX_BACKEND} vector index")
 
     # Initialize Hugging Face Hub LLM
     HUGGINGFACEHUB_API_TOKEN = ""
@@ -59,16 +98,46 @@ try:
     llm = HuggingFaceHub(repo_id=llm_model_name, model_kwargs={"temperature": 0.5, "max_length": 512}, huggingfacehub_api_token=HUGGINGFACEHUB_API_TOKEN, task="text-generation")
 
     # Set up the RetrievalQA chain
-    retriever = vectordb.as_retriever(search_kwargs={"k": 2})
+    # Dense + BM25 results merged with reciprocal rank fusion
+    retriever = HybridRetriever(vectordb=vectordb, bm25=bm25, k=2, vector_index=vector_index)
+    if RERANK:
+        # Overlapping CHUNK_TOKENS-token chunks are deduplicated and only the most relevant text reaches the prompt
+        retriever.k = RERANK_FETCH_K
+        retriever = RerankingRetriever(base_retriever=retriever, reranker=acquire_reranker(resources=resources, pipeline=PIPELINE),
+                                       token_budget=CONTEXT_TOKENS, max_docs=4)
     qa = RetrievalQA.from_chain_type(llm=llm, chain_type="stuff", retriever=retriever)
+    # Answer repeated and near-duplicate questions from cache; any sync of the collection clears it
+    qa_cache = SemanticQACache(embeddings=embeddings, version_fn=lambda: manifest_version(manifest_path))
+    qa = CachedQA(qa, qa_cache)
+    service = AsyncQAService(qa.chain, cache=qa_cache, max_workers=RETRIEVAL_WORKERS, pipeline=PIPELINE)
+    return service
+
 
-    # Interactive query loop
-    def chat_with(query):
+def build_interface(warmup):
+    # Also mounted by rag_server, which serves every bot from one process
+    import gradio as gr
+    from rag_core.serving import format_sources
+
+    # Interactive query loop: sources appear once retrieval is done, then the answer streams in
+    async def chat_with(query):
         if query.lower()=="exit":
-            return "Chat Ended"
-        result=qa.run(query)
-        return f"Chatbor :{result}"
-    interface=gr.Interface(
+            yield "Chat Ended"
+            return
+        if not warmup.ready:
+            yield "Loading the news index, your answer will follow shortly..."
+        service = await warmup.wait_async()
+        sources = ""
+        answer = ""
+        # "ui" covers the whole handler, including rendering the partial answers
+        with span("ui", PIPELINE):
+            async for kind, payload in service.astream({"query": query}):
+                if kind == "sources":
+                    sources = format_sources(payload)
+                    yield sources
+                elif kind == "token":
+                    answer += payload
+                    yield f"{sources}\n\nChatbor :{answer}"
+    return gr.Interface(
         fn=chat_with,
         inputs=gr.Textbox(lines=2,placeholder="Enter your question here..."),
         outputs=gr.Textbox(),
@@ -76,6 +145,21 @@ try:
         description="Ask questions about the news articles and type 'exit' to end the chat.",
         theme="default"
     )
-    interface.launch()
-except Exception as e:
-    print(f"An error occurred: {e}")
\ No newline at end of file
+
+
+def main():
+    try:
+        # Health endpoint and warm-up start first; the UI comes up while the model and index load
+        warmup = BackgroundWarmup("news_chatbot", build_pipeline).start()
+        start_health_server(HEALTH_PORT, [warmup])
+        interface = build_interface(warmup)
+        interface.queue(default_concurrency_limit=QUEUE_CONCURRENCY)
+        interface.launch()
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        REGISTRY.close()  # Stops the embedding worker processes and closes the embedding cache
+
+
+if __name__ == "__main__":
+    main()
@@ -7,42 +7,172 @@
 # 1. Data Preparation & Indexing
 # ----------------------
 #
+# Heavy packages (gradio, langchain, llama-index, chromadb) are imported where they are first
+# used, so the health endpoint and UI come up while the knowledge base warms in the background.
 import os
 import json
-import gradio as gr
-from langchain.chains import RetrievalQA
-from langchain_openai import OpenAIEmbeddings, OpenAI
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader
-from langchain_chroma import Chroma
-from langchain.memory import ConversationBufferMemory
+import hashlib
+import threading
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.conversation import is_follow_up
+from rag_core.ingest import chunk_id
+from rag_core.serving import format_sources
+from rag_core.metrics import span
+from rag_core.registry import REGISTRY
+from rag_core.warmup import BackgroundWarmup, start_health_server
 
 # Set up environment
-os.environ["OPENAI_API_KEY"] = ''
+os.environ.setdefault("OPENAI_API_KEY", '')  # A real key in the environment wins
+RETRIEVAL_WORKERS = int(os.environ.get("ASSISTANT_RETRIEVAL_WORKERS", 8))   # Threads for blocking retrieval
+QUEUE_CONCURRENCY = int(os.environ.get("ASSISTANT_QUEUE_CONCURRENCY", 16))  # Gradio requests served at once
+WATCH_DATA_DIR = os.environ.get("ASSISTANT_WATCH_DATA", "0") == "1"          # Apply data/ changes live
+HEALTH_PORT = int(os.environ.get("ASSISTANT_HEALTH_PORT", 8083))            # /health, /ready and /metrics
+PIPELINE = "assistant"                                                      # Label on this app's metrics
+RERANK = os.environ.get("ASSISTANT_RERANK", "1") == "1"                      # Cross-encoder rerank + packing
+RERANK_FETCH_K = int(os.environ.get("ASSISTANT_RERANK_FETCH_K", 20))         # Candidates scored per question
+CONTEXT_TOKENS = int(os.environ.get("ASSISTANT_CONTEXT_TOKENS", 1024))       # Retrieved-context tokens per prompt
+HISTORY_DB_PATH = os.environ.get("ASSISTANT_HISTORY_DB", "./conversation_history.sqlite3")
+HISTORY_TOKEN_BUDGET = int(os.environ.get("ASSISTANT_HISTORY_TOKENS", 1024))  # Conversation tokens per prompt
+HISTORY_WINDOW_TURNS = int(os.environ.get("ASSISTANT_HISTORY_WINDOW", 4))     # Recent turns kept verbatim
+HISTORY_MAX_TURNS = int(os.environ.get("ASSISTANT_HISTORY_MAX_TURNS", 200))   # Stored turns per user
 
 # ----------------------
 # 1. Data Preparation & Indexing
 # ----------------------
 class KnowledgeBaseManager:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", persist_directory="./chroma_db", collection_name="knowledge_base", resources=None):
         self.data_dir = data_dir
+        self.resources = resources  # rag_core.registry lease when several bots share one process
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.manifest_path = os.path.join(persist_directory, "kb_manifest.json")
+        self.bm25_path = os.path.join(persist_directory, "kb_bm25.pkl")
         self.vector_store = None
         self.index = None
+        self.keyword_index = None
+        self.embeddings = None
+        self.files = {}          # path -> {"mtime": ..., "hash": ..., "ids": [...]}
+        self.on_change = []      # Callbacks run after a sync that changed the collection
+        self._sync_lock = threading.Lock()
+        self._stop_watching = threading.Event()
         
-    def load_documents(self):
-        return SimpleDirectoryReader(self.data_dir).load_data()
+    def load_documents(self, path):
+        from langchain_core.documents import Document
+        from llama_index.core import SimpleDirectoryReader
+
+        # One file at a time, so only added/changed files are read and embedded
+        return [
+            Document(page_content=doc.text, metadata={"source": path, **doc.metadata})
+            for doc in SimpleDirectoryReader(input_files=[path]).load_data()
+        ]
+
+    def scan_files(self):
+        found = {}
+        for root, _, names in os.walk(self.data_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                found[path] = os.stat(path).st_mtime
+        return found
     
     def setup_vector_store(self):
-        embeddings = OpenAIEmbeddings()
-        documents = self.load_documents()
-        
-        self.vector_store = Chroma.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            persist_directory="./chroma_db",
-            collection_name="knowledge_base"
+        from langchain_chroma import Chroma
+        from langchain_openai import OpenAIEmbeddings
+        from rag_core.hybrid import load_or_build_bm25
+        from rag_core.registry import REGISTRY, acquire_chroma_client
+
+        resources = self.resources or REGISTRY
+        self.embeddings = resources.acquire(("embeddings", "openai", "remote"), OpenAIEmbeddings)
+        # Open the persisted collection; embeddings only happen for files sync() finds new or changed
+        self.vector_store = Chroma(
+            client=acquire_chroma_client(self.persist_directory, resources=resources),
+            collection_name=self.collection_name,
+            embedding_function=self.embeddings,
+            persist_directory=self.persist_directory
         )
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.files = json.load(f)
+        else:
+            # Collections built before the manifest existed hold untracked (often duplicated) vectors
+            stale_ids = self.vector_store.get(include=[])["ids"]
+            if stale_ids:
+                self.vector_store.delete(ids=stale_ids)
+            if os.path.exists(self.bm25_path):
+                os.remove(self.bm25_path)
+        self.keyword_index = load_or_build_bm25(self.vector_store, self.bm25_path)
+        self.sync()
         return self.vector_store
 
+    def sync(self):
+        with self._sync_lock:
+            stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+            current = self.scan_files()
+            for path, mtime in current.items():
+                known = self.files.get(path)
+                if known and known["mtime"] == mtime:
+                    stats["unchanged"] += 1
+                    continue
+                with open(path, "rb") as f:
+                    file_hash = hashlib.sha256(f.read()).hexdigest()
+                if known and known["hash"] == file_hash:
+                    known["mtime"] = mtime  # Touched but not modified
+                    stats["unchanged"] += 1
+                    continue
+                if known:
+                    self._delete(known["ids"])
+                with span("load", PIPELINE):
+                    documents = self.load_documents(path)
+                ids = [chunk_id(path, i, doc.page_content) for i, doc in enumerate(documents)]
+                if documents:
+                    with span("upsert", PIPELINE):
+                        self.vector_store.add_documents(documents, ids=ids)
+                    with span("keyword_index", PIPELINE):
+                        self.keyword_index.add_many(ids, [doc.page_content for doc in documents])
+                self.files[path] = {"mtime": mtime, "hash": file_hash, "ids": ids}
+                stats["updated" if known else "added"] += 1
+
+            for path in [p for p in self.files if p not in current]:
+                self._delete(self.files.pop(path)["ids"])
+                stats["removed"] += 1
+
+            changed = stats["added"] or stats["updated"] or stats["removed"]
+            if changed or not os.path.exists(self.manifest_path):
+                self._save_manifest()
+                self.keyword_index.save(self.bm25_path)
+            if changed:
+                print(f"Knowledge base synced: {stats}")
+                for callback in self.on_change:
+                    callback()
+            return stats
+
+    def _delete(self, ids):
+        if ids:
+            self.vector_store.delete(ids=ids)
+            for doc_id in ids:
+                self.keyword_index.remove(doc_id)
+
+    def _save_manifest(self):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.files, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def start_watching(self, interval=5.0):
+        # Polls data_dir in a background thread; queries keep running against the live collection
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"Knowledge base sync failed: {e}")
+        self._stop_watching.clear()
+        threading.Thread(target=watch, name="kb-watcher", daemon=True).start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+
 
 # ----------------------
 # 2. User Profile Management
@@ -55,8 +185,7 @@ class UserProfileManager:
         self.profiles[user_id] = {
             "learning_style": "visual",  # visual/auditory/kinesthetic
             "difficulty_level": "intermediate",
-            "preferred_topics": [],
-            "learning_history": []
+            "preferred_topics": []
         }
         return self.profiles[user_id]
     
@@ -69,58 +198,157 @@ class UserProfileManager:
 # 3. Learning Assistant Core
 # ----------------------
 class LearningAssistant:
-    def __init__(self):
-        self.knowledge_base = KnowledgeBaseManager()
+    def __init__(self, watch_data=WATCH_DATA_DIR, resources=None):
+        from langchain.chains import RetrievalQA
+        from langchain_openai import OpenAI
+        from rag_core.conversation import BoundedConversationMemory, ConversationStore
+        from rag_core.hybrid import HybridRetriever
+        from rag_core.qa_cache import CachedQA, SemanticQACache
+        from rag_core.registry import REGISTRY, acquire_reranker
+        from rag_core.rerank import RerankingRetriever
+        from rag_core.serving import AsyncQAService
+
+        self.knowledge_base = KnowledgeBaseManager(resources=resources)
         self.user_manager = UserProfileManager()
         self.vector_store = self.knowledge_base.setup_vector_store()
         
         # Initialize LangChain components
-        self.memory = ConversationBufferMemory()
+        self.llm = OpenAI(temperature=0.7)
+        # Per-user history in SQLite: recent turns verbatim plus a running summary, within a fixed token budget
+        self.memory = BoundedConversationMemory(
+            ConversationStore(HISTORY_DB_PATH, max_turns_per_user=HISTORY_MAX_TURNS),
+            summarize_fn=OpenAI(temperature=0).invoke,
+            token_budget=HISTORY_TOKEN_BUDGET,
+            window_turns=HISTORY_WINDOW_TURNS
+        )
+        retriever = HybridRetriever(
+            vectordb=self.vector_store,
+            bm25=self.knowledge_base.keyword_index,
+            k=RERANK_FETCH_K if RERANK else 4
+        )
+        if RERANK:
+            retriever = RerankingRetriever(
+                base_retriever=retriever,
+                reranker=acquire_reranker(resources=resources or REGISTRY, pipeline=PIPELINE),
+                token_budget=CONTEXT_TOKENS,
+                max_docs=8
+            )
         self.qa_chain = RetrievalQA.from_chain_type(
-            llm=OpenAI(temperature=0.7),
+            llm=self.llm,
             chain_type="stuff",
-            retriever=self.vector_store.as_retriever(),
-            memory=self.memory,
+            retriever=retriever,
             return_source_documents=True
         )
+        # Cache answers per question within a (learning style, level) scope; exact and near-duplicate
+        # questions skip retrieval + LLM. Follow-ups that build on conversation memory are never cached.
+        self.qa_cache = SemanticQACache(
+            embeddings=self.knowledge_base.embeddings,
+            version_fn=self.vector_store._collection.count
+        )
+        self.qa_chain = CachedQA(self.qa_chain, self.qa_cache)
+        self.service = AsyncQAService(self.qa_chain.chain, cache=self.qa_cache, max_workers=RETRIEVAL_WORKERS,
+                                      pipeline=PIPELINE)
+        # Edited files can keep the same chunk count, so invalidate explicitly on every KB change
+        self.knowledge_base.on_change.append(self.qa_cache.invalidate)
+        if watch_data:
+            self.knowledge_base.start_watching()
     
-    def personalize_prompt(self, user_id, question):
+    def _profile_scope(self, user_id):
         profile = self.user_manager.profiles.get(user_id, {})
-        style = profile.get("learning_style", "general")
-        level = profile.get("difficulty_level", "intermediate")
+        return profile.get("learning_style", "general"), profile.get("difficulty_level", "intermediate")
+
+    def personalize_prompt(self, user_id, question, history=None):
+        style, level = self._profile_scope(user_id)
+        history = self.memory.context(user_id) if history is None else history
+        history = f"{history}\n        " if history else ""
         
         return f"""Adapt this response for a {style} learner at {level} level.
         Use examples and analogies appropriate for this style.
-        Question: {question}
+        {history}Question: {question}
         Answer:"""
     
+    def _chain_inputs(self, user_id, question):
+        # Retrieval and the cache see only the raw question, the cache scoped by profile since the template is
+        # identical for every question. Only follow-ups get the conversation history in their prompt; they
+        # bypass the cache, and every self-contained question is answered (and cached) without it.
+        follow_up = is_follow_up(question)
+        history = self.memory.context(user_id) if follow_up else ""
+        return {
+            "query": self.personalize_prompt(user_id, question, history),
+            "retrieval_query": question,
+            "cache_key": question,
+            "cache_scope": self._profile_scope(user_id),
+            "cacheable": not follow_up,
+        }
+
     def ask_question(self, user_id, question):
-        personalized_prompt = self.personalize_prompt(user_id, question)
-        result = self.qa_chain.invoke({"query": personalized_prompt})
-        
-        # Update user history
-        self.user_manager.profiles[user_id]["learning_history"].append({
-            "question": question,
-            "response": result["result"]
-        })
-        
+        result = self.qa_chain.invoke(self._chain_inputs(user_id, question))
+        return self._record_answer(user_id, question, result)
+
+    async def ask_question_async(self, user_id, question):
+        result = await self.service.ainvoke(self._chain_inputs(user_id, question))
+        return self._record_answer(user_id, question, result)
+
+    async def stream_question(self, user_id, question):
+        # Yields the text to display: sources first, then the answer as it streams in
+        sources = ""
+        answer = ""
+        async for kind, payload in self.service.astream(self._chain_inputs(user_id, question)):
+            if kind == "sources":
+                sources = format_sources(payload)
+                yield sources
+            elif kind == "token":
+                answer += payload
+                yield f"{answer}\n\n{sources}"
+            elif kind == "done":
+                self._record_answer(user_id, question, payload["result"])
+
+    def _record_answer(self, user_id, question, result):
+        # Update user history; summarizing old turns is an LLM call, so it runs off the request path
+        self.memory.add_turn(user_id, question, result["result"])
+        if self.memory.needs_summary(user_id):
+            self.service.executor.submit(self._summarize, user_id)
         return result["result"]
 
+    def _summarize(self, user_id):
+        try:
+            self.memory.update_summary(user_id)
+        except Exception as e:
+            print(f"Conversation summary failed for {user_id}: {e}")
+
+    def learning_history(self, user_id, limit=20):
+        return [{"question": q, "response": a} for q, a in self.memory.history(user_id, limit)]
+
 # ----------------------
 # 4. Gradio Interface (Updated)
 # ----------------------
-def main():
-    assistant = LearningAssistant()
-    user_id = "sample_user"
-    
+DEFAULT_USER_ID = "sample_user"
+
+
+def build_assistant(resources=None, user_id=DEFAULT_USER_ID):
+    assistant = LearningAssistant(resources=resources)
     # Initialize default profile
     assistant.user_manager.create_profile(user_id)
+    return assistant
+
+
+def build_interface(warmup, user_id=DEFAULT_USER_ID):
+    # Also mounted by rag_server, which serves every bot from one process
+    import gradio as gr
     
-    def chat(message, history):
-        response = assistant.ask_question(user_id, message)
-        return response
+    async def chat(message, history):
+        history = (history or []) + [(message, "")]
+        if not warmup.ready:
+            history[-1] = (message, "Loading the knowledge base, your answer will follow shortly...")
+            yield "", history
+        assistant = await warmup.wait_async()
+        with span("ui", PIPELINE):
+            async for partial in assistant.stream_question(user_id, message):
+                history[-1] = (message, partial)
+                yield "", history
 
     def update_profile(learning_style, difficulty, topics):
+        assistant = warmup.wait()
         assistant.user_manager.update_preferences(user_id, {
             "learning_style": learning_style,
             "difficulty_level": difficulty,
@@ -128,6 +356,12 @@ def main():
         })
         return "Profile updated successfully!"
 
+    def clear_history():
+        # Also forget the stored conversation, so the next prompt starts without earlier context
+        if warmup.ready:
+            warmup.result.memory.clear(user_id)
+        return None
+
     with gr.Blocks(theme=gr.themes.Soft()) as demo:
         gr.Markdown("# 🧠 Personalized Learning Assistant")
         
@@ -157,12 +391,24 @@ def main():
                 status = gr.Textbox(label="Update Status")
 
         msg.submit(chat, [msg, chatbot], [msg, chatbot])
-        clear.click(lambda: None, None, chatbot, queue=False)
+        clear.click(clear_history, None, chatbot, queue=False)
         update_btn.click(update_profile, 
                         [learning_style, difficulty, topics], 
                         status)
 
-    demo.launch()
+    return demo
+
+
+def main():
+    # Health endpoint and warm-up start first; the UI comes up while the knowledge base loads
+    warmup = BackgroundWarmup("personal_assistant", build_assistant).start()
+    start_health_server(HEALTH_PORT, [warmup])
+    demo = build_interface(warmup)
+    demo.queue(default_concurrency_limit=QUEUE_CONCURRENCY)
+    try:
+        demo.launch()
+    finally:
+        REGISTRY.close()  # Shared models and the reranker are released with the process
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1 @@
+# Shared building blocks for the RAG bots in this repo (ingestion, retrieval, serving).
@@ -0,0 +1,130 @@
+import asyncio
+import csv
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rag_core.metrics import observe_stage, span
+
+DEFAULT_BATCH_SIZE = 256    # Queries embedded and searched together
+DEFAULT_CONCURRENCY = 8     # LLM calls in flight at once
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF_S = 1.0     # First retry delay; doubles per attempt, with jitter
+# Matched by class name across the MRO, so no LLM client library has to be importable here
+TRANSIENT_ERROR_NAMES = {"RateLimitError", "APITimeoutError", "APIConnectionError", "Timeout", "TimeoutException",
+                         "TimeoutError", "ConnectionError", "ClientConnectionError", "ServiceUnavailableError"}
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(error):
+    # Rate limits, timeouts and dropped connections are worth retrying; anything else would fail the same way again
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in TRANSIENT_STATUS_CODES
+
+
+# --- Input / resume helpers ---
+def read_queries(path, query_field="query", id_field="id"):
+    # JSONL or CSV; rows without an id get their 0-based line/row number, so reruns see the same ids
+    queries = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for index, row in enumerate(rows):
+            query = (row.get(query_field) or "").strip()
+            if query:
+                queries.append((str(row.get(id_field) or index), query))
+    return queries
+
+
+def completed_ids(output_path):
+    # Ids already answered in an earlier run; failed rows and a torn last line are retried
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+# --- Batch runner for a RetrievalQA "stuff" chain ---
+class BatchQARunner:
+    def __init__(self, chain, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_s=DEFAULT_BACKOFF_S, pipeline="default"):
+        self.chain = chain
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.pipeline = pipeline
+        self.stats = {"skipped": 0, "ok": 0, "failed": 0, "retries": 0}
+
+    def _retrieve(self, queries):
+        retriever = self.chain.retriever
+        with span("batch_retrieve", self.pipeline):
+            if hasattr(retriever, "retrieve_batch"):
+                return retriever.retrieve_batch(queries)
+            return [retriever.get_relevant_documents(query) for query in queries]
+
+    async def _answer(self, semaphore, query_id, query, docs, out):
+        # Transient errors are retried with exponential backoff; the result line is written the moment it is ready
+        record = {"id": query_id, "query": query}
+        start = time.perf_counter()
+        async with semaphore:
+            for attempt in range(1, self.max_retries + 2):
+                try:
+                    answer = await self.chain.combine_documents_chain.arun(input_documents=docs, question=query)
+                    record.update(status="ok", answer=answer)
+                    break
+                except Exception as e:
+                    if attempt > self.max_retries or not is_transient(e):
+                        record.update(status="error", error=f"{type(e).__name__}: {e}")
+                        break
+                    self.stats["retries"] += 1
+                    delay = self.backoff_s * 2 ** (attempt - 1)
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+        elapsed = time.perf_counter() - start
+        observe_stage("batch_llm", elapsed, self.pipeline)
+        record.update(attempts=attempt, latency_ms=round(elapsed * 1000, 1),
+                      sources=[" ".join(doc.page_content.split())[:200] for doc in docs])
+        self.stats[record["status"] if record["status"] == "ok" else "failed"] += 1
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()  # A crash loses at most the calls still in flight
+
+    async def arun(self, queries, output_path):
+        done = completed_ids(output_path)
+        pending = [(query_id, query) for query_id, query in queries if query_id not in done]
+        self.stats["skipped"] = len(queries) - len(pending)
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=1) as executor:
+            # Retrieval for the next batch runs in a thread while this batch's LLM calls are in flight
+            next_docs = None
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                if next_docs is None:
+                    next_docs = loop.run_in_executor(executor, self._retrieve, [query for _, query in batch])
+                docs = await next_docs
+                following = pending[start + self.batch_size:start + 2 * self.batch_size]
+                next_docs = (loop.run_in_executor(executor, self._retrieve, [query for _, query in following])
+                             if following else None)
+                await asyncio.gather(*(
+                    self._answer(semaphore, query_id, query, query_docs, out)
+                    for (query_id, query), query_docs in zip(batch, docs)
+                ))
+                print(f"Answered {start + len(batch)}/{len(pending)} queries ({self.stats})")
+        return self.stats
+
+    def run(self, queries, output_path):
+        return asyncio.run(self.arun(queries, output_path))
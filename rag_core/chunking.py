@@ -0,0 +1,207 @@
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from rag_core.ingest import content_hash, source_fingerprint
+from rag_core.metrics import count_items, span
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.schema import Document
+
+DEFAULT_CHUNK_TOKENS = 256    # Comfortably inside all-mpnet-base-v2's 384-token window, special tokens included
+DEFAULT_OVERLAP_TOKENS = 32
+DEFAULT_BATCH_ROWS = 256      # Rows sent to a worker at once
+CHUNK_COLUMNS = ["row_key", "row_id", "row_hash", "chunk_index", "start_index", "end_index", "tokens", "text", "metadata"]
+
+
+# --- Worker-process side of the pool ---
+_worker_splitter = None
+_worker_tokenizer = None
+
+
+def _init_worker(model_name, chunk_tokens, overlap_tokens):
+    global _worker_splitter, _worker_tokenizer
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from transformers import AutoTokenizer
+    from transformers.utils import logging
+    logging.set_verbosity_error()  # Whole articles are measured before splitting; the over-length warning is noise
+    _worker_tokenizer = AutoTokenizer.from_pretrained(model_name)
+    _worker_splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+        _worker_tokenizer, chunk_size=chunk_tokens, chunk_overlap=overlap_tokens)
+
+
+def _split_in_worker(texts):
+    # One entry per text: [(start_index, end_index, tokens, chunk text)], offsets into the original text
+    results = []
+    for text in texts:
+        chunks = []
+        search_from = 0
+        for chunk in _worker_splitter.split_text(text):
+            start = text.find(chunk, search_from)
+            if start == -1:  # Splitter normalised whitespace at the boundary; fall back to a full search
+                start = text.find(chunk)
+            if start != -1:
+                search_from = start + 1
+            end = start + len(chunk) if start != -1 else -1
+            chunks.append((start, end, len(_worker_tokenizer.encode(chunk)), chunk))
+        results.append(chunks)
+    return results
+
+
+# --- Token-aware splitter running in a process pool ---
+class TokenChunker:
+    # Drop-in for a LangChain text splitter (create_documents), sized by the embedding model's tokenizer
+    def __init__(self, model_name, chunk_tokens=DEFAULT_CHUNK_TOKENS, overlap_tokens=DEFAULT_OVERLAP_TOKENS,
+                 num_workers=None, batch_rows=DEFAULT_BATCH_ROWS, pipeline="default"):
+        self.model_name = model_name
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.num_workers = num_workers if num_workers is not None else max(1, (os.cpu_count() or 1) - 1)
+        self.batch_rows = batch_rows
+        self.pipeline = pipeline
+        self._pool = None
+
+    def config(self):
+        # Anything that changes chunk boundaries; a chunk file built with another config is stale
+        return {"model_name": self.model_name, "chunk_tokens": self.chunk_tokens, "overlap_tokens": self.overlap_tokens}
+
+    def _get_pool(self):
+        # Always a pool, even of one: the tokenizer is only ever loaded in the workers
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.chunk_tokens, self.overlap_tokens),
+            )
+        return self._pool
+
+    def iter_split(self, rows):
+        # rows: iterable of (row_key, text, metadata). Yields (row_key, text, metadata, chunks) in input order,
+        # with at most two batches per worker in flight so a huge CSV streams through bounded memory.
+        pool = self._get_pool()
+        in_flight = deque()
+        batch = []
+
+        def submit():
+            in_flight.append((batch, pool.submit(_split_in_worker, [text for _, text, _ in batch])))
+
+        def drain_one():
+            done_batch, future = in_flight.popleft()
+            for (row_key, text, metadata), chunks in zip(done_batch, future.result()):
+                yield row_key, text, metadata, chunks
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_rows:
+                submit()
+                batch = []
+                if len(in_flight) >= 2 * self.num_workers:
+                    yield from drain_one()
+        if batch:
+            submit()
+        while in_flight:
+            yield from drain_one()
+
+    def create_documents(self, texts, metadatas=None):
+        metadatas = metadatas or [{} for _ in texts]
+        docs = []
+        for _, _, metadata, chunks in self.iter_split((None, text, metadata) for text, metadata in zip(texts, metadatas)):
+            docs.extend(chunk_documents(metadata, chunks))
+        return docs
+
+    def write_chunk_file(self, rows, path, source_path=None, row_group_rows=50000):
+        # Splits every row once and writes a parquet file of chunks plus a sidecar recording what it was built from
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("row_key", pa.string()), ("row_id", pa.int64()), ("row_hash", pa.string()), ("chunk_index", pa.int32()),
+            ("start_index", pa.int64()), ("end_index", pa.int64()), ("tokens", pa.int32()), ("text", pa.string()),
+            ("metadata", pa.string()),
+        ])
+        columns = {name: [] for name in CHUNK_COLUMNS}
+        stats = {"rows": 0, "chunks": 0, "tokens": 0}
+        tmp_path = path + ".tmp"
+        if os.path.exists(_sidecar_path(path)):
+            os.remove(_sidecar_path(path))  # The old sidecar must never vouch for a half-rebuilt file
+
+        def flush(writer):
+            writer.write_table(pa.table(columns, schema=schema))
+            for values in columns.values():
+                values.clear()
+
+        with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer, span("chunk", self.pipeline):
+            for position, (row_key, text, metadata, chunks) in enumerate(self.iter_split(rows)):
+                # Source row number from the loader when it supplies one, else the position in the stream
+                metadata = dict(metadata or {})
+                row_id = int(metadata.pop("row_id", position))
+                row_hash = content_hash(text)
+                for chunk_index, (start, end, tokens, chunk) in enumerate(chunks):
+                    for name, value in zip(CHUNK_COLUMNS, (
+                            None if row_key is None else str(row_key), row_id, row_hash, chunk_index,
+                            start, end, tokens, chunk, json.dumps(metadata))):
+                        columns[name].append(value)
+                    stats["tokens"] += tokens
+                stats["rows"] += 1
+                stats["chunks"] += len(chunks)
+                if len(columns["text"]) >= row_group_rows:
+                    flush(writer)
+            if columns["text"]:
+                flush(writer)
+        count_items("chunk", stats["rows"], self.pipeline)
+        os.replace(tmp_path, path)  # Atomic, so a crash never leaves a half-written chunk file
+        with open(_sidecar_path(path), "w", encoding="utf-8") as f:
+            json.dump({"source": source_fingerprint(source_path) if source_path else None,
+                       "chunker": self.config(), "stats": stats}, f)
+        return stats
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def chunk_documents(metadata, chunks):
+    return [
+        Document(page_content=chunk, metadata=dict(metadata or {}, chunk_index=index, start_index=start,
+                                                   end_index=end, tokens=tokens))
+        for index, (start, end, tokens, chunk) in enumerate(chunks)
+    ]
+
+
+# --- Reading a chunk file back ---
+def _sidecar_path(path):
+    return path + ".meta.json"
+
+
+def chunk_file_current(path, chunker, source_path=None):
+    # True when the file was built from this exact source file with the same chunking config
+    if not os.path.exists(path) or not os.path.exists(_sidecar_path(path)):
+        return False
+    with open(_sidecar_path(path), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    source = source_fingerprint(source_path) if source_path else None
+    return meta.get("chunker") == chunker.config() and meta.get("source") == source
+
+
+def iter_chunked_rows(path, batch_size=10000):
+    # Yields (row_key, row_hash, [Document]) per source row, in file order, for IncrementalIngestor.sync_chunks
+    import pyarrow.parquet as pq
+
+    current = None
+    for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=CHUNK_COLUMNS):
+        for row in record_batch.to_pylist():
+            if current is None or row["row_id"] != current[0]:
+                if current is not None:
+                    yield current[1:]
+                current = (row["row_id"], row["row_key"], row["row_hash"], [])
+            metadata = dict(json.loads(row["metadata"]), row_id=row["row_id"], chunk_index=row["chunk_index"],
+                            start_index=row["start_index"], end_index=row["end_index"], tokens=row["tokens"])
+            current[3].append(Document(page_content=row["text"], metadata=metadata))
+    if current is not None:
+        yield current[1:]
@@ -0,0 +1,192 @@
+import re
+import sqlite3
+import threading
+import time
+
+from rag_core.metrics import count_tokens, truncate_tokens
+
+DEFAULT_HISTORY_PATH = "./conversation_history.sqlite3"
+
+SUMMARY_PROMPT = """Progressively summarize the conversation between a student and a learning assistant.
+Keep the topics covered, what the student struggled with and anything they asked to remember.
+Use at most {max_words} words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{lines}
+
+New summary:"""
+
+
+# Words that point back at earlier turns: pronouns, "again", "what about ...", "more examples"
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|he|she|him|his|her|above|previous|earlier|before|again|"
+    r"last|same|more|else|also|another|instead|elaborate|continue|you said|you mentioned)\b"
+    r"|^\s*(and|but|so|why|what about|how about)\b", re.I)
+
+
+def is_follow_up(question):
+    # True when a question probably leans on the conversation so far; very short questions ("why?", "example?")
+    # count too. Answers to anything else do not depend on memory and can be shared through the answer cache.
+    return len(question.split()) <= 2 or bool(FOLLOW_UP_PATTERN.search(question))
+
+
+def format_turns(turns):
+    return "\n".join(f"Student: {question}\nAssistant: {answer}" for question, answer in turns)
+
+
+# --- Persistent per-user conversation history ---
+class ConversationStore:
+    def __init__(self, path=DEFAULT_HISTORY_PATH, max_turns_per_user=200):
+        self.path = path
+        self.max_turns_per_user = max_turns_per_user
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, question TEXT NOT NULL, "
+            "answer TEXT NOT NULL, created REAL NOT NULL, summarized INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS turns_by_user ON turns (user_id, id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries (user_id TEXT PRIMARY KEY, summary TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def add_turn(self, user_id, question, answer):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO turns (user_id, question, answer, created) VALUES (?, ?, ?, ?)",
+                (user_id, question, answer, time.time()),
+            )
+            # Per-user cap; only turns already folded into the summary are dropped
+            self._conn.execute(
+                "DELETE FROM turns WHERE user_id = ? AND summarized = 1 AND id NOT IN "
+                "(SELECT id FROM turns WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+                (user_id, user_id, self.max_turns_per_user),
+            )
+            self._conn.commit()
+
+    def recent_turns(self, user_id, limit):
+        # Oldest first, as they would be read in a transcript
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, answer FROM turns WHERE user_id = ? ORDER BY id DESC LIMIT ?", (user_id, limit)
+            ).fetchall()
+        return rows[::-1]
+
+    def context_turns(self, user_id, window_turns):
+        # The sliding window plus any older turn not folded into the summary yet, oldest first
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, answer FROM turns WHERE user_id = ? AND (summarized = 0 OR id IN "
+                "(SELECT id FROM turns WHERE user_id = ? ORDER BY id DESC LIMIT ?)) ORDER BY id DESC",
+                (user_id, user_id, window_turns),
+            ).fetchall()
+        return rows[::-1]
+
+    def turns_to_summarize(self, user_id, window_turns):
+        # Turns that have left the sliding window but are not in the summary yet: [(id, question, answer)]
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, question, answer FROM turns WHERE user_id = ? AND summarized = 0 AND id NOT IN "
+                "(SELECT id FROM turns WHERE user_id = ? ORDER BY id DESC LIMIT ?) ORDER BY id",
+                (user_id, user_id, window_turns),
+            ).fetchall()
+
+    def get_summary(self, user_id):
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM summaries WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else ""
+
+    def set_summary(self, user_id, summary, turn_ids):
+        # Summary and "summarized" flags change in one transaction, so no turn is lost or counted twice
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (user_id, summary, updated) VALUES (?, ?, ?)",
+                (user_id, summary, time.time()),
+            )
+            self._conn.executemany("UPDATE turns SET summarized = 1 WHERE id = ?", [(i,) for i in turn_ids])
+            self._conn.commit()
+
+    def clear(self, user_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE user_id = ?", (user_id,))
+            self._conn.execute("DELETE FROM summaries WHERE user_id = ?", (user_id,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Sliding window + running summary under a fixed token budget ---
+class BoundedConversationMemory:
+    def __init__(self, store, summarize_fn=None, token_budget=1024, window_turns=4, summarize_every=1):
+        # summarize_fn(prompt) -> str, usually an LLM call; without one, old turns are only trimmed away
+        self.store = store
+        self.summarize_fn = summarize_fn
+        self.token_budget = token_budget
+        self.window_turns = window_turns
+        # Turns leaving the window are folded in once this many are waiting (default: on eviction). Until then
+        # they stay in the context verbatim, so nothing drops out between the window and the summary.
+        self.summarize_every = summarize_every
+        self.summary_budget = token_budget // 3
+        self._user_locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _user_lock(self, user_id):
+        with self._locks_guard:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    def add_turn(self, user_id, question, answer):
+        self.store.add_turn(user_id, question, answer)
+
+    def needs_summary(self, user_id):
+        return len(self.store.turns_to_summarize(user_id, self.window_turns)) >= self.summarize_every
+
+    def update_summary(self, user_id):
+        # Folds turns that left the window into the summary; safe to call from a background thread
+        with self._user_lock(user_id):
+            pending = self.store.turns_to_summarize(user_id, self.window_turns)
+            if not pending:
+                return
+            summary = self.store.get_summary(user_id)
+            if self.summarize_fn is not None:
+                prompt = SUMMARY_PROMPT.format(
+                    max_words=int(self.summary_budget * 0.75),
+                    summary=summary or "(none)",
+                    lines=format_turns((question, answer) for _, question, answer in pending),
+                )
+                summary = self.summarize_fn(prompt).strip()
+            self.store.set_summary(user_id, truncate_tokens(summary, self.summary_budget), [row[0] for row in pending])
+
+    def context(self, user_id):
+        # Summary first, then as many of the most recent unsummarized or in-window turns as still fit the budget
+        summary = truncate_tokens(self.store.get_summary(user_id), self.summary_budget)
+        used = count_tokens(summary) if summary else 0
+        lines = []
+        for question, answer in reversed(self.store.context_turns(user_id, self.window_turns)):
+            line = format_turns([(question, answer)])
+            remaining = self.token_budget - used
+            if count_tokens(line) > remaining:
+                if not lines and remaining > 0:
+                    lines.append(truncate_tokens(line, remaining))  # Always keep part of the last turn
+                break
+            lines.append(line)
+            used += count_tokens(line)
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        if lines:
+            parts.append("Recent conversation:\n" + "\n".join(reversed(lines)))
+        return "\n".join(parts)
+
+    def history(self, user_id, limit=20):
+        return self.store.recent_turns(user_id, limit)
+
+    def clear(self, user_id):
+        self.store.clear(user_id)
@@ -0,0 +1,185 @@
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rag_core.metrics import cache_event, count_items, span
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    from langchain.embeddings.base import Embeddings
+
+DEFAULT_CACHE_PATH = "./embedding_cache.sqlite3"
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# --- On-disk embedding cache keyed by (model name, text hash) ---
+class EmbeddingCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model_name, hashes):
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                part = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model_name] + part,
+                )
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model_name, items):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model_name, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items],
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Worker-process side of the pool ---
+_worker_model = None
+
+
+def _init_worker(model_name, torch_threads, device="cpu"):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(torch_threads)  # Avoid oversubscribing cores across workers
+    _worker_model = SentenceTransformer(model_name, device=device)
+
+
+def _encode_in_worker(texts, batch_size):
+    return _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True).astype(np.float32)
+
+
+# --- LangChain-compatible embedding engine ---
+class CachedEmbeddings(Embeddings):
+    def __init__(self, model_name, cache_path=DEFAULT_CACHE_PATH, batch_size=256, num_workers=None, pipeline="default",
+                 device="cpu"):
+        self.model_name = model_name
+        self.device = device
+        self.pipeline = pipeline  # Label for the "embed" latency metric
+        self.batch_size = batch_size
+        self.num_workers = num_workers if num_workers is not None else max(1, (os.cpu_count() or 1) // 2)
+        self.cache = EmbeddingCache(cache_path)
+        self._model = None
+        self._pool = None
+        self._load_lock = threading.Lock()  # Instances may be shared by several bots (rag_core.registry)
+
+    def _local_model(self):
+        # Lazily load an in-process copy for queries and small batches
+        with self._load_lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def _get_pool(self):
+        with self._load_lock:
+            if self._pool is None:
+                torch_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, torch_threads, self.device),
+                )
+        return self._pool
+
+    def _encode(self, texts):
+        # Single batch or single worker: encode in-process, no pool start-up cost
+        if self.num_workers <= 1 or len(texts) <= self.batch_size:
+            return self._local_model().encode(texts, batch_size=self.batch_size, convert_to_numpy=True).astype(np.float32)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = self._get_pool().map(_encode_in_worker, batches, [self.batch_size] * len(batches))
+        return np.vstack(list(results))
+
+    def embed_documents(self, texts, pipeline=None):
+        # pipeline: metrics label for this call, when the engine is shared by several bots
+        pipeline = pipeline or self.pipeline
+        hashes = [text_hash(t) for t in texts]
+        cached = self.cache.get_many(self.model_name, list(set(hashes)))
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        cache_event("embedding", "hit", len(cached))
+        cache_event("embedding", "miss", len(missing))
+        if missing:
+            missing_hashes = list(missing)
+            # Encode and persist one super-batch at a time, so a crash keeps finished work
+            step = self.batch_size * self.num_workers
+            for start in range(0, len(missing_hashes), step):
+                part = missing_hashes[start:start + step]
+                with span("embed", pipeline):
+                    vectors = self._encode([missing[h] for h in part])
+                count_items("embed", len(part), pipeline)
+                items = list(zip(part, vectors))
+                self.cache.put_many(self.model_name, items)
+                cached.update(items)
+
+        return [cached[h].tolist() for h in hashes]
+
+    def embed_query(self, text, pipeline=None):
+        # In-process model, no cache: one short text is faster to encode than to look up and store
+        return self.embed_queries([text], pipeline)[0]
+
+    def embed_queries(self, texts, pipeline=None):
+        # Batched, but not cached: queries rarely repeat and would only grow the cache
+        if not texts:
+            return []
+        with span("embed", pipeline or self.pipeline):
+            vectors = self._encode(list(texts))
+        count_items("embed", len(texts), pipeline or self.pipeline)
+        return vectors.tolist()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.cache.close()
+
+
+class PipelineEmbeddings(Embeddings):
+    # One bot's handle on a shared engine: same weights, pool and cache, metrics under the bot's own label.
+    # Closing is left to whoever owns the engine (rag_core.registry), so a bot cannot close it under another.
+    def __init__(self, engine, pipeline):
+        self.engine = engine
+        self.pipeline = pipeline
+
+    def embed_documents(self, texts):
+        return self.engine.embed_documents(texts, pipeline=self.pipeline)
+
+    def embed_query(self, text):
+        return self.engine.embed_query(text, pipeline=self.pipeline)
+
+    def embed_queries(self, texts):
+        return self.engine.embed_queries(texts, pipeline=self.pipeline)
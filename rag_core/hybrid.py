@@ -0,0 +1,204 @@
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+
+try:
+    from langchain_core.documents import Document
+    from langchain_core.retrievers import BaseRetriever
+except ImportError:
+    from langchain.schema import BaseRetriever, Document
+
+TOKEN_PATTERN = re.compile(r"\w+")
+RRF_K = 60  # Standard reciprocal rank fusion constant
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+# --- Incremental BM25 inverted index ---
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}   # term -> {doc_id: term frequency}
+        self.doc_terms = {}  # doc_id -> {term: term frequency}, needed to remove a doc again
+        self.doc_len = {}
+        self.total_len = 0
+        self._lock = threading.RLock()  # Lets a background sync update the index while queries run
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, doc_id, text):
+        counts = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self.doc_len:
+                self.remove(doc_id)
+            self.doc_terms[doc_id] = dict(counts)
+            self.doc_len[doc_id] = sum(counts.values())
+            self.total_len += self.doc_len[doc_id]
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+    def add_many(self, doc_ids, texts):
+        for doc_id, text in zip(doc_ids, texts):
+            self.add(doc_id, text)
+
+    def remove(self, doc_id):
+        with self._lock:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            self.total_len -= self.doc_len.pop(doc_id)
+            for term in terms:
+                docs = self.postings[term]
+                del docs[doc_id]
+                if not docs:
+                    del self.postings[term]
+
+    def search(self, query, k=10):
+        # Returns [(doc_id, score)] best first
+        with self._lock:
+            n_docs = len(self.doc_len)
+            if not n_docs:
+                return []
+            avg_len = self.total_len / n_docs
+            scores = Counter()
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with self._lock, open(tmp_path, "wb") as f:
+            state = {key: value for key, value in self.__dict__.items() if key != "_lock"}
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, "rb") as f:
+            index.__dict__.update(pickle.load(f))
+        return index
+
+    @classmethod
+    def build_from_chroma(cls, vectordb, page_size=5000):
+        # One-off build for stores created before the keyword index existed
+        index = cls()
+        offset = 0
+        while True:
+            page = vectordb._collection.get(limit=page_size, offset=offset, include=["documents"])
+            if not page["ids"]:
+                break
+            index.add_many(page["ids"], page["documents"])
+            offset += len(page["ids"])
+        return index
+
+    def sync_from_chroma(self, vectordb, page_size=5000):
+        # Reconciles a loaded index with the collection it mirrors (e.g. a crash between the vector write and
+        # the index save): missing chunks are added from their stored text, vanished ones removed
+        current = []
+        offset = 0
+        while True:
+            page = vectordb._collection.get(limit=page_size, offset=offset, include=[])
+            if not page["ids"]:
+                break
+            current.extend(page["ids"])
+            offset += len(page["ids"])
+        current_set = set(current)
+        with self._lock:
+            removed = [doc_id for doc_id in self.doc_len if doc_id not in current_set]
+            added = [doc_id for doc_id in current if doc_id not in self.doc_len]
+        for doc_id in removed:
+            self.remove(doc_id)
+        for start in range(0, len(added), page_size):
+            page = vectordb._collection.get(ids=added[start:start + page_size], include=["documents"])
+            self.add_many(page["ids"], page["documents"])
+        return {"added": len(added), "removed": len(removed)}
+
+
+def load_or_build_bm25(vectordb, path):
+    if os.path.exists(path):
+        index = BM25Index.load(path)
+        drift = index.sync_from_chroma(vectordb)
+        if drift["added"] or drift["removed"]:
+            print(f"Keyword index reconciled with the collection: {drift}")
+            index.save(path)
+        return index
+    index = BM25Index.build_from_chroma(vectordb)
+    index.save(path)
+    return index
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=RRF_K):
+    # rankings: lists of doc ids, best first; returns fused doc ids best first
+    scores = Counter()
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (rrf_k + rank + 1)
+    return [doc_id for doc_id, _ in scores.most_common()]
+
+
+# --- Dense + keyword retriever ---
+class HybridRetriever(BaseRetriever):
+    vectordb: object
+    bm25: object
+    k: int = 2
+    fetch_k: int = 20  # Candidates taken from each side before fusion
+    vector_index: object = None  # Optional rag_core.vector_index backend used instead of Chroma's own search
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def dense_ids(self, query):
+        query_embedding = self.vectordb._embedding_function.embed_query(query)
+        if self.vector_index is not None:
+            return self.vector_index.search([query_embedding], self.fetch_k)[0][0]
+        result = self.vectordb._collection.query(query_embeddings=[query_embedding], n_results=self.fetch_k, include=[])
+        return result["ids"][0]
+
+    def dense_ids_batch(self, queries):
+        # All queries embedded in one batch and searched in one call. embed_queries (CachedEmbeddings) skips the
+        # document cache; other embeddings batch through embed_documents, which for them caches nothing.
+        embeddings = self.vectordb._embedding_function
+        embed = getattr(embeddings, "embed_queries", embeddings.embed_documents)
+        query_embeddings = embed(list(queries))
+        if self.vector_index is not None:
+            return [ids for ids, _ in self.vector_index.search(query_embeddings, self.fetch_k)]
+        result = self.vectordb._collection.query(query_embeddings=query_embeddings, n_results=self.fetch_k, include=[])
+        return result["ids"]
+
+    def _fuse(self, query, dense):
+        keyword = [doc_id for doc_id, _ in self.bm25.search(query, self.fetch_k)]
+        return reciprocal_rank_fusion([dense, keyword])[:self.k]
+
+    def _fetch_documents(self, id_lists):
+        # One collection read for every list; ids shared between lists are fetched once
+        unique_ids = list(dict.fromkeys(doc_id for ids in id_lists for doc_id in ids))
+        if not unique_ids:
+            return [[] for _ in id_lists]
+        found = self.vectordb._collection.get(ids=unique_ids, include=["documents", "metadatas"])
+        by_id = {doc_id: (text, metadata) for doc_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])}
+        return [[Document(page_content=by_id[doc_id][0], metadata=by_id[doc_id][1] or {}) for doc_id in ids if doc_id in by_id]
+                for ids in id_lists]
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self._fetch_documents([self._fuse(query, self.dense_ids(query))])[0]
+
+    def retrieve_batch(self, queries):
+        # Same results as get_relevant_documents per query, with vectorized embedding and search
+        dense = self.dense_ids_batch(queries)
+        return self._fetch_documents([self._fuse(query, ids) for query, ids in zip(queries, dense)])
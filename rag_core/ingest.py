@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import time
+
+from rag_core.metrics import count_items, span
+
+
+# --- Hashing helpers ---
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(row_key, chunk_index, chunk_text):
+    # Stable ID: same row + same chunk text always maps to the same vector
+    return hashlib.sha256(f"{row_key}:{chunk_index}:{chunk_text}".encode("utf-8")).hexdigest()[:32]
+
+
+def source_fingerprint(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def manifest_version(path):
+    # Cheap marker of a collection's content for SemanticQACache(version_fn=...): every sync rewrites the
+    # manifest, so any add, edit or removal changes it, even one that leaves the chunk count the same
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# --- Manifest of what is already in the collection ---
+class IngestManifest:
+    def __init__(self, path):
+        self.path = path
+        self.source = None
+        self.rows = {}        # row_key -> {"hash": ..., "chunks": [chunk ids]}
+        self.tombstones = {}  # row_key -> unix time the row disappeared from the source
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.source = data.get("source")
+            self.rows = data.get("rows", {})
+            self.tombstones = data.get("tombstones", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "rows": self.rows, "tombstones": self.tombstones}, f)
+        os.replace(tmp_path, self.path)  # Atomic, so a crash never leaves a half-written manifest
+
+
+# --- Incremental ingestion into a LangChain vector store ---
+class IncrementalIngestor:
+    def __init__(self, vectordb, text_splitter, manifest_path, batch_size=256, keyword_index=None, pipeline="default"):
+        self.vectordb = vectordb
+        self.pipeline = pipeline  # Label for the split / upsert / keyword_index latency metrics
+        self.keyword_index = keyword_index  # Optional BM25Index kept in step with the collection
+        self.text_splitter = text_splitter
+        self.manifest = IngestManifest(manifest_path)
+        self.batch_size = batch_size
+
+    def source_changed(self, source_path):
+        # A warm restart on an untouched file skips reading and splitting entirely
+        return self.manifest.source != source_fingerprint(source_path)
+
+    def sync(self, rows, source_path=None):
+        # rows: iterable of (row_key or None, text, metadata dict); None keys fall back to the content hash
+        return self._sync(((row_key, content_hash(text), (text, metadata)) for row_key, text, metadata in rows),
+                          self._split, source_fingerprint(source_path) if source_path else None)
+
+    def sync_delta(self, rows, removed_keys, source=None):
+        # Applies a change set computed elsewhere: `rows` are added or updated, `removed_keys` dropped, and every
+        # other row is left alone. `source` is any JSON marker for what the collection now reflects (e.g. a version).
+        return self._sync(((row_key, content_hash(text), (text, metadata)) for row_key, text, metadata in rows),
+                          self._split, source, removed_keys=removed_keys)
+
+    def sync_chunks(self, chunked_rows, source_path=None):
+        # Rows already split by rag_core.chunking: (row_key or None, row content hash, [Document]).
+        # Same bookkeeping as sync(), without splitting anything.
+        return self._sync(chunked_rows, self._presplit, source_fingerprint(source_path) if source_path else None)
+
+    def _sync(self, rows, split, source, removed_keys=None):
+        stats = {"unchanged": 0, "added": 0, "updated": 0, "removed": 0, "duplicates": 0, "chunks": 0}
+        seen = set()
+        pending = []
+        for row_key, row_hash, payload in rows:
+            row_key = str(row_key) if row_key is not None else row_hash
+            if row_key in seen:
+                # Repeated key in this source (e.g. identical content-hashed rows): the first occurrence wins,
+                # otherwise the same chunk ids would reach the vector store twice
+                stats["duplicates"] += 1
+                continue
+            seen.add(row_key)
+            existing = self.manifest.rows.get(row_key)
+            if existing and existing["hash"] == row_hash:
+                stats["unchanged"] += 1
+                continue
+            if existing:
+                self._delete_chunks(existing["chunks"])
+                stats["updated"] += 1
+            else:
+                stats["added"] += 1
+            self.manifest.tombstones.pop(row_key, None)
+            pending.append((row_key, row_hash, payload))
+            if len(pending) >= self.batch_size:
+                stats["chunks"] += self._ingest_batch(pending, split)
+                pending = []
+        if pending:
+            stats["chunks"] += self._ingest_batch(pending, split)
+
+        # Rows no longer in the source (or explicitly removed): drop their vectors and keep a tombstone
+        if removed_keys is None:
+            removed_keys = [key for key in self.manifest.rows if key not in seen]
+        else:
+            removed_keys = [str(key) for key in removed_keys if str(key) in self.manifest.rows and str(key) not in seen]
+        removed_at = time.time()
+        for row_key in removed_keys:
+            self._delete_chunks(self.manifest.rows.pop(row_key)["chunks"])
+            self.manifest.tombstones[row_key] = removed_at
+            stats["removed"] += 1
+
+        if source is not None:
+            self.manifest.source = source
+        self.manifest.save()
+        return stats
+
+    def _split(self, pending):
+        texts = [text for _, _, (text, _) in pending]
+        metadatas = [dict(metadata or {}, row_key=row_key) for row_key, _, (_, metadata) in pending]
+        with span("split", self.pipeline):
+            docs = self.text_splitter.create_documents(texts, metadatas=metadatas)
+        count_items("split", len(pending), self.pipeline)
+        return docs
+
+    def _presplit(self, pending):
+        docs = []
+        for row_key, _, row_docs in pending:
+            for doc in row_docs:
+                doc.metadata["row_key"] = row_key
+                docs.append(doc)
+        return docs
+
+    def _ingest_batch(self, pending, split):
+        docs = split(pending)
+        ids = []
+        chunk_counts = {}
+        for doc in docs:
+            row_key = doc.metadata["row_key"]
+            index = chunk_counts.get(row_key, 0)
+            chunk_counts[row_key] = index + 1
+            ids.append(chunk_id(row_key, index, doc.page_content))
+        if docs:
+            # Includes embedding; the embedding engine records its own "embed" stage
+            with span("upsert", self.pipeline):
+                self.vectordb.add_documents(docs, ids=ids)
+            count_items("upsert", len(docs), self.pipeline)
+            if self.keyword_index is not None:
+                with span("keyword_index", self.pipeline):
+                    self.keyword_index.add_many(ids, [doc.page_content for doc in docs])
+
+        chunks_by_row = {}
+        for doc, doc_id in zip(docs, ids):
+            chunks_by_row.setdefault(doc.metadata["row_key"], []).append(doc_id)
+        for row_key, row_hash, _ in pending:
+            self.manifest.rows[row_key] = {"hash": row_hash, "chunks": chunks_by_row.get(row_key, [])}
+        return len(docs)
+
+    def _delete_chunks(self, ids):
+        if ids:
+            self.vectordb.delete(ids=ids)
+            if self.keyword_index is not None:
+                for doc_id in ids:
+                    self.keyword_index.remove(doc_id)
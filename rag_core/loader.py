@@ -0,0 +1,45 @@
+import pandas as pd
+
+# Upper bound on the RAM a single in-flight CSV batch may take
+DEFAULT_MAX_MEMORY_MB = 256
+DEFAULT_CHUNKSIZE = 10000
+
+
+def iter_csv_batches(path, text_column, metadata_columns=None, encoding="utf-8",
+                     chunksize=DEFAULT_CHUNKSIZE, max_memory_mb=DEFAULT_MAX_MEMORY_MB, with_row_ids=False):
+    # Yields lists of (text, metadata) tuples; only one batch of the file is ever held in memory.
+    # with_row_ids adds the 0-based data row number as metadata["row_id"].
+    metadata_columns = list(metadata_columns or [])
+    usecols = [text_column] + [c for c in metadata_columns if c != text_column]
+    reader = pd.read_csv(path, encoding=encoding, on_bad_lines="skip", usecols=usecols,
+                         chunksize=chunksize, iterator=True)
+    batch_rows = chunksize
+    with reader:
+        while True:
+            try:
+                df = reader.get_chunk(batch_rows)
+            except StopIteration:
+                break
+            if df.empty:
+                continue
+            # Shrink (or grow) the next batch so it stays under the memory ceiling
+            bytes_per_row = max(1, df.memory_usage(deep=True).sum() // len(df))
+            batch_rows = max(1, min(chunksize, int(max_memory_mb * 1024 * 1024 // bytes_per_row)))
+
+            df = df.dropna(subset=[text_column])
+            texts = df[text_column].astype(str).tolist()
+            if metadata_columns:
+                metadatas = df[metadata_columns].to_dict("records")
+            else:
+                metadatas = [{} for _ in texts]
+            if with_row_ids:
+                # The chunked reader's index keeps counting across batches, so it is the row number in the file
+                for metadata, row_id in zip(metadatas, df.index):
+                    metadata["row_id"] = int(row_id)
+            del df
+            yield list(zip(texts, metadatas))
+
+
+def iter_csv_rows(path, text_column, **kwargs):
+    for batch in iter_csv_batches(path, text_column, **kwargs):
+        yield from batch
@@ -0,0 +1,168 @@
+import bisect
+import cProfile
+import contextlib
+import os
+import pstats
+import random
+import threading
+import time
+
+# Latency buckets in seconds, from cache hits up to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# cProfile sampling switch: profile this fraction of requests, keep only those slower than the threshold
+PROFILE_SAMPLE_RATE = float(os.environ.get("RAG_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.environ.get("RAG_PROFILE_SLOW_MS", "1000"))
+PROFILE_DIR = os.environ.get("RAG_PROFILE_DIR", "./profiles")
+
+
+# --- Metric types ---
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # label tuple -> [per-bucket counts..., overflow, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 3))
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_labels(key, le=bound)} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(key, le='+Inf')} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(key)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+def _labels(key, **extra):
+    items = list(key) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+STAGE_LATENCY = Histogram("rag_stage_latency_seconds", "Latency of each ingestion/query stage", LATENCY_BUCKETS)
+TOKENS = Histogram("rag_tokens", "Prompt and completion token counts per request", TOKEN_BUCKETS)
+CACHE_EVENTS = Counter("rag_cache_events_total", "Cache hits and misses by cache")
+ITEMS = Counter("rag_items_total", "Items processed per stage (rows, chunks, vectors)")
+METRICS = [STAGE_LATENCY, TOKENS, CACHE_EVENTS, ITEMS]
+
+
+def render_prometheus():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    # Batch jobs have no server to scrape; write a textfile for the node exporter's textfile collector
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+# --- Recording helpers ---
+@contextlib.contextmanager
+def span(stage, pipeline="default"):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, pipeline=pipeline, stage=stage)
+
+
+def observe_stage(stage, seconds, pipeline="default"):
+    STAGE_LATENCY.observe(seconds, pipeline=pipeline, stage=stage)
+
+
+def count_items(stage, amount, pipeline="default"):
+    ITEMS.inc(amount, pipeline=pipeline, stage=stage)
+
+
+def cache_event(cache, event, amount=1):
+    CACHE_EVENTS.inc(amount, cache=cache, event=event)
+
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to the usual ~4 characters per token
+    _encoding = None
+
+
+def count_tokens(text):
+    return len(_encoding.encode(text)) if _encoding is not None else max(1, len(text) // 4)
+
+
+def truncate_tokens(text, max_tokens):
+    # Cheap cut from the end, re-checked with the real counter after each step
+    while text and count_tokens(text) > max_tokens:
+        text = text[:int(len(text) * 0.9)]
+    return text
+
+
+def record_tokens(kind, text, pipeline="default"):
+    TOKENS.observe(count_tokens(text), pipeline=pipeline, kind=kind)
+
+
+# --- cProfile sampling for slow requests ---
+_profile_lock = threading.Lock()  # One profiler at a time; concurrent cProfile sessions corrupt each other
+
+
+@contextlib.contextmanager
+def maybe_profile(name, sample_rate=None, slow_ms=None):
+    sample_rate = PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+    slow_ms = PROFILE_SLOW_MS if slow_ms is None else slow_ms
+    if sample_rate <= 0 or random.random() >= sample_rate or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _profile_lock.release()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= slow_ms:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{name}-{int(time.time() * 1000)}.prof")
+            pstats.Stats(profiler).dump_stats(path)
+            print(f"Slow request ({elapsed_ms:.0f}ms) profile saved to {path}")
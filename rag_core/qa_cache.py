@@ -0,0 +1,154 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from rag_core.metrics import cache_event
+
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+def cache_args(inputs, query):
+    # Optional chain inputs understood by CachedQA and AsyncQAService:
+    #   "cache_key"   text the cache matches on, e.g. the raw question rather than a templated prompt
+    #   "cache_scope" hashable; only entries stored under the same scope can match, e.g. (style, level)
+    #   "cacheable"   False bypasses the cache both ways, e.g. for answers that depend on conversation memory
+    return inputs.get("cache_key", query), inputs.get("cache_scope"), inputs.get("cacheable", True)
+
+
+def retrieval_query(inputs, query):
+    # Optional "retrieval_query": what the retriever searches for, e.g. the raw question, while the LLM still
+    # gets the full prompt (instructions, conversation history) as the question
+    return inputs.get("retrieval_query", query)
+
+
+# --- Exact + near-duplicate answer cache ---
+class SemanticQACache:
+    def __init__(self, embeddings=None, similarity_threshold=0.95, max_entries=1024,
+                 ttl_seconds=3600, version_fn=None):
+        self.embeddings = embeddings            # None disables near-duplicate matching
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_fn = version_fn            # e.g. rag_core.ingest.manifest_version; a change clears the cache
+        self._version = version_fn() if version_fn else None
+        self._entries = OrderedDict()           # (scope, normalized query) -> (result, unit vector or None, stored_at)
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._record("invalidations")
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            self._version = version
+            self.invalidate()
+
+    def _expire(self, now):
+        if self.ttl_seconds is None:
+            return
+        # Entries are kept in insertion/use order, but TTL counts from insertion, so scan them all
+        for key in [k for k, (_, _, stored_at) in self._entries.items() if now - stored_at > self.ttl_seconds]:
+            del self._entries[key]
+            self._record("evictions")
+
+    def _embed(self, query):
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _record(self, event):
+        # Caller holds the lock; mirrors the local stats into the shared metrics registry
+        self.stats[event] += 1
+        cache_event("qa", event)
+
+    def lookup(self, query, scope=None):
+        # Returns (result, vector); vector is handed back to store() so a miss is embedded only once.
+        # Near-duplicate matching only considers entries stored under the same scope.
+        self._check_version()
+        key = (scope, normalize_query(query))
+        with self._lock:
+            self._expire(time.time())
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._record("exact_hits")
+                return self._entries[key][0], None
+
+        if self.embeddings is None:
+            with self._lock:
+                self._record("misses")
+            return None, None
+
+        vector = self._embed(query)
+        with self._lock:
+            candidates = [(k, v) for k, (_, v, _) in self._entries.items() if v is not None and k[0] == scope]
+            if candidates:
+                matrix = np.vstack([v for _, v in candidates])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    best_key = candidates[best][0]
+                    self._entries.move_to_end(best_key)
+                    self._record("semantic_hits")
+                    return self._entries[best_key][0], vector
+            self._record("misses")
+        return None, vector
+
+    def store(self, query, result, vector=None, scope=None):
+        key = (scope, normalize_query(query))
+        with self._lock:
+            self._entries[key] = (result, vector, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._record("evictions")
+
+    def hit_rate(self):
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+
+# --- Drop-in wrapper around a RetrievalQA chain ---
+class CachedQA:
+    def __init__(self, chain, cache, input_key="query"):
+        self.chain = chain
+        self.cache = cache
+        self.input_key = input_key
+
+    def invoke(self, inputs):
+        query = inputs[self.input_key]
+        key, scope, cacheable = cache_args(inputs, query)
+        if not cacheable:
+            return self._run(query, retrieval_query(inputs, query))
+        result, vector = self.cache.lookup(key, scope)
+        if result is not None:
+            return result
+        result = self._run(query, retrieval_query(inputs, query))
+        self.cache.store(key, result, vector, scope)
+        return result
+
+    def _run(self, query, search_query):
+        if search_query == query:
+            return self.chain.invoke({self.input_key: query})
+        # Same steps as the chain, but retrieval only sees search_query
+        docs = self.chain.retriever.get_relevant_documents(search_query)
+        outputs = {self.chain.output_key: self.chain.combine_documents_chain.run(input_documents=docs, question=query)}
+        if self.chain.return_source_documents:
+            outputs["source_documents"] = docs
+        return self.chain.prep_outputs({self.input_key: query}, outputs)
+
+    def __call__(self, inputs):
+        return self.invoke(inputs)
+
+    def run(self, query):
+        return self.invoke({self.input_key: query})["result"]
@@ -0,0 +1,132 @@
+import os
+import threading
+
+DEFAULT_DEVICE = "cpu"
+
+
+# --- Process-wide, reference-counted shared resources ---
+class ResourceRegistry:
+    # acquire() builds a resource once per key and hands the same object to every caller;
+    # release() closes it when the last holder lets go. Lookups never block on another key's build.
+    def __init__(self):
+        self._entries = {}       # key -> [resource, refcount]
+        self._build_locks = {}   # key -> lock held while that key is being built
+        self._lock = threading.Lock()
+
+    def acquire(self, key, factory):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] += 1
+                return entry[0]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:  # Built by another thread while we waited
+                    entry[1] += 1
+                    return entry[0]
+            resource = factory()
+            with self._lock:
+                self._entries[key] = [resource, 1]
+            return resource
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._entries[key]
+        close = getattr(entry[0], "close", None)
+        if callable(close):
+            close()
+
+    def close(self):
+        # Closes everything still held, whatever the refcounts; for process exit
+        with self._lock:
+            entries, self._entries = list(self._entries.values()), {}
+        for resource, _ in entries:
+            close = getattr(resource, "close", None)
+            if callable(close):
+                close()
+
+    def stats(self):
+        with self._lock:
+            return {"/".join(str(part) for part in key): refs for key, (_, refs) in self._entries.items()}
+
+
+REGISTRY = ResourceRegistry()
+
+
+class ResourceLease:
+    # Everything one tenant acquired, so unloading the tenant releases exactly its references
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+        self.keys = []
+        self._lock = threading.Lock()
+
+    def acquire(self, key, factory):
+        resource = self.registry.acquire(key, factory)
+        with self._lock:
+            self.keys.append(key)
+        return resource
+
+    def release(self, key):
+        with self._lock:
+            self.keys.remove(key)
+        self.registry.release(key)
+
+    def close(self):
+        with self._lock:
+            keys, self.keys = self.keys, []
+        for key in keys:
+            self.registry.release(key)
+
+
+# --- Shared builders used by the bots ---
+def _check_settings(resources, key, resource, settings):
+    # A shared resource is built by whoever asks first; a later caller asking for other settings is an error
+    mismatched = {name: value for name, value in settings.items() if getattr(resource, name, value) != value}
+    if mismatched:
+        resources.release(key)
+        raise ValueError(f"{'/'.join(str(part) for part in key)} is already loaded without {mismatched}")
+    return resource
+
+
+def embeddings_key(model_name, device=DEFAULT_DEVICE, cache_path=None):
+    from rag_core.embeddings import DEFAULT_CACHE_PATH
+    return ("embeddings", model_name, device, os.path.abspath(cache_path or DEFAULT_CACHE_PATH))
+
+
+# `resources` is the registry itself or a ResourceLease on it
+def acquire_embeddings(model_name, device=DEFAULT_DEVICE, resources=REGISTRY, pipeline="default", cache_path=None,
+                       **kwargs):
+    # One copy of the sentence-transformers weights per (model, device, cache file), whichever tenant asks first.
+    # Each caller gets its own handle, so the "embed" metrics keep the caller's pipeline label.
+    from rag_core.embeddings import DEFAULT_CACHE_PATH, CachedEmbeddings, PipelineEmbeddings
+    cache_path = cache_path or DEFAULT_CACHE_PATH
+    key = embeddings_key(model_name, device, cache_path)
+    engine = resources.acquire(key, lambda: CachedEmbeddings(model_name=model_name, cache_path=cache_path,
+                                                             device=device, **kwargs))
+    return PipelineEmbeddings(_check_settings(resources, key, engine, kwargs), pipeline)
+
+
+def acquire_reranker(model_name=None, resources=REGISTRY, pipeline="default", **kwargs):
+    from rag_core.rerank import DEFAULT_RERANK_MODEL, CrossEncoderReranker, PipelineReranker
+    model_name = model_name or DEFAULT_RERANK_MODEL
+    key = ("reranker", model_name, DEFAULT_DEVICE)
+    reranker = resources.acquire(key, lambda: CrossEncoderReranker(model_name, **kwargs).load())
+    return PipelineReranker(_check_settings(resources, key, reranker, kwargs), pipeline)
+
+
+def chroma_client_key(persist_dir):
+    return ("chroma", os.path.abspath(persist_dir))
+
+
+def acquire_chroma_client(persist_dir, resources=REGISTRY):
+    # One client per directory; tenants open their own collections on it when they first need them
+    import chromadb
+    return resources.acquire(chroma_client_key(persist_dir), lambda: chromadb.PersistentClient(path=persist_dir))
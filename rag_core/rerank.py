@@ -0,0 +1,157 @@
+from typing import Optional
+
+from rag_core.metrics import count_tokens, span, truncate_tokens
+
+try:
+    from langchain_core.documents import Document
+    from langchain_core.retrievers import BaseRetriever
+except ImportError:
+    from langchain.schema import BaseRetriever, Document
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"  # ~22M params, fast enough on CPU
+MIN_OVERLAP_CHARS = 50  # Shorter shared edges are coincidence, not splitter overlap
+MIN_PASSAGE_TOKENS = 32  # A lower-ranked passage is not cut shorter than this; a shorter one may fit whole
+
+
+# --- Cross-encoder scoring of (query, passage) pairs ---
+class CrossEncoderReranker:
+    def __init__(self, model_name=DEFAULT_RERANK_MODEL, batch_size=32, max_length=512, pipeline="default"):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.pipeline = pipeline
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self._model
+
+    def load(self):
+        # Lets a warm-up thread pay the model load instead of the first question
+        self._get_model()
+        return self
+
+    def score(self, query, texts, pipeline=None):
+        return self.score_pairs([(query, text) for text in texts], pipeline)
+
+    def score_pairs(self, pairs, pipeline=None):
+        # (query, passage) pairs from any number of queries, scored in model-sized batches
+        if not pairs:
+            return []
+        with span("rerank", pipeline or self.pipeline):
+            scores = self._get_model().predict(pairs, batch_size=self.batch_size)
+        return [float(score) for score in scores]
+
+
+class PipelineReranker:
+    # One bot's handle on a shared reranker, scoring under the bot's own metrics label
+    def __init__(self, reranker, pipeline):
+        self.reranker = reranker
+        self.pipeline = pipeline
+
+    def score(self, query, texts):
+        return self.reranker.score(query, texts, pipeline=self.pipeline)
+
+    def score_pairs(self, pairs):
+        return self.reranker.score_pairs(pairs, pipeline=self.pipeline)
+
+
+# --- Overlap removal and budgeted packing ---
+def overlap_length(first, second, min_overlap=MIN_OVERLAP_CHARS):
+    # Length of the longest suffix of `first` that is a prefix of `second` (the splitter's chunk_overlap)
+    if len(first) < min_overlap or len(second) < min_overlap:
+        return 0
+    probe = second[:min_overlap]
+    start = first.find(probe)
+    while start != -1:
+        tail = first[start:]
+        if second.startswith(tail):
+            return len(tail)
+        start = first.find(probe, start + 1)
+    return 0
+
+
+def dedupe_passages(docs, min_overlap=MIN_OVERLAP_CHARS):
+    # Keeps rank order; drops passages contained in a better one and trims text shared with a neighbouring chunk
+    kept = []
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text or any(text in other.page_content for other in kept):
+            continue
+        for other in kept:
+            # Chunk after a kept one: drop the repeated head. Chunk before it: drop the repeated tail.
+            head = overlap_length(other.page_content, text, min_overlap)
+            if head:
+                text = text[head:].lstrip()
+            tail = overlap_length(text, other.page_content, min_overlap)
+            if tail:
+                text = text[:-tail].rstrip()
+        if text:
+            kept.append(Document(page_content=text, metadata=doc.metadata))
+    return kept
+
+
+def pack_passages(docs, token_budget, max_docs=None, min_tokens=MIN_PASSAGE_TOKENS):
+    # Greedy in rank order. A passage larger than the remaining budget is cut to fit rather than dropped, so the
+    # top passage always makes it in; a lower-ranked one is only cut if at least min_tokens of room are left,
+    # otherwise it is skipped so a shorter one can still go in.
+    packed = []
+    used = 0
+    for doc in docs:
+        if max_docs is not None and len(packed) >= max_docs:
+            break
+        remaining = token_budget - used
+        if remaining <= 0:
+            break
+        tokens = count_tokens(doc.page_content)
+        if tokens > remaining:
+            if packed and remaining < min_tokens:
+                continue
+            text = truncate_tokens(doc.page_content, remaining)
+            if not text:
+                continue
+            doc = Document(page_content=text, metadata=dict(doc.metadata, truncated=True))
+            tokens = count_tokens(text)
+        packed.append(doc)
+        used += tokens
+    return packed
+
+
+# --- Retriever wrapper: over-fetch, rerank, dedupe, pack ---
+class RerankingRetriever(BaseRetriever):
+    base_retriever: object   # Should over-fetch, e.g. HybridRetriever(k=20)
+    reranker: object
+    token_budget: int = 512  # Context tokens handed to the "stuff" prompt
+    max_docs: Optional[int] = None
+    min_score: Optional[float] = None  # Optional cut-off on the cross-encoder score
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        candidates = self.base_retriever.get_relevant_documents(query)
+        return self._select(candidates, self.reranker.score(query, [doc.page_content for doc in candidates]))
+
+    def retrieve_batch(self, queries):
+        # Candidates for every query come from one batched search; all pairs share the cross-encoder batches
+        candidate_lists = self.base_retriever.retrieve_batch(queries)
+        scores = self.reranker.score_pairs(
+            [(query, doc.page_content) for query, candidates in zip(queries, candidate_lists) for doc in candidates]
+        )
+        selected = []
+        offset = 0
+        for candidates in candidate_lists:
+            selected.append(self._select(candidates, scores[offset:offset + len(candidates)]))
+            offset += len(candidates)
+        return selected
+
+    def _select(self, candidates, scores):
+        ranked = sorted(zip(scores, range(len(candidates)), candidates), key=lambda item: (-item[0], item[1]))
+        docs = [
+            Document(page_content=doc.page_content, metadata=dict(doc.metadata, rerank_score=score))
+            for score, _, doc in ranked
+            if self.min_score is None or score >= self.min_score
+        ]
+        return pack_passages(dedupe_passages(docs), self.token_budget, self.max_docs)
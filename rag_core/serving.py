@@ -0,0 +1,149 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rag_core.metrics import maybe_profile, observe_stage, record_tokens, span
+from rag_core.qa_cache import cache_args, retrieval_query
+
+# Defaults for the async serving mode; each bot can override them
+DEFAULT_MAX_WORKERS = 8          # Threads available for blocking retrieval / cache lookups
+DEFAULT_QUEUE_CONCURRENCY = 16   # Gradio events processed at once
+
+
+# --- Latency marks for one request ---
+class StreamTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, name):
+        # Only the first occurrence counts, e.g. time to *first* token
+        self.marks.setdefault(name, (time.perf_counter() - self.start) * 1000)
+
+    def as_dict(self):
+        return {f"{name}_ms": round(ms, 1) for name, ms in self.marks.items()}
+
+
+# --- Async front for a RetrievalQA chain ---
+class AsyncQAService:
+    def __init__(self, chain, cache=None, max_workers=DEFAULT_MAX_WORKERS, pipeline="default"):
+        self.chain = chain
+        self.cache = cache
+        self.pipeline = pipeline  # Label for the cache_lookup / retrieve / llm / query latency metrics
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rag-retrieval")
+
+    async def _run_blocking(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    async def ainvoke(self, inputs):
+        with maybe_profile(f"{self.pipeline}-ainvoke"), span("query", self.pipeline):
+            return await self._ainvoke(inputs)
+
+    async def _ainvoke(self, inputs):
+        query = inputs[self.chain.input_key]
+        cache_key, scope, cacheable = cache_args(inputs, query)
+        cache = self.cache if cacheable else None
+        vector = None
+        if cache is not None:
+            with span("cache_lookup", self.pipeline):
+                cached, vector = await self._run_blocking(cache.lookup, cache_key, scope)
+            if cached is not None:
+                return cached
+
+        # Retrieval (embedding + vector search) is blocking, so keep it off the event loop
+        with span("retrieve", self.pipeline):
+            docs = await self._run_blocking(self.chain.retriever.get_relevant_documents, retrieval_query(inputs, query))
+        # The LLM call goes through the chain's native async path
+        with span("llm", self.pipeline):
+            answer = await self.chain.combine_documents_chain.arun(input_documents=docs, question=query)
+        record_tokens("completion", answer, self.pipeline)
+
+        outputs = {self.chain.output_key: answer}
+        if self.chain.return_source_documents:
+            outputs["source_documents"] = docs
+        # Same post-processing as the sync chain, including saving to memory
+        result = self.chain.prep_outputs({self.chain.input_key: query}, outputs)
+        if cache is not None:
+            cache.store(cache_key, result, vector, scope)
+        return result
+
+    async def astream(self, inputs):
+        # Yields ("sources", docs) once retrieval is done, then ("token", text) as the LLM produces it,
+        # then ("done", {"result": ..., "timings": {...}}) with retrieval / first-token / total latency.
+        # A sampled profile covers the whole event loop thread while the request is in flight.
+        with maybe_profile(f"{self.pipeline}-astream"):
+            async for event in self._astream(inputs):
+                yield event
+
+    async def _astream(self, inputs):
+        query = inputs[self.chain.input_key]
+        cache_key, scope, cacheable = cache_args(inputs, query)
+        cache = self.cache if cacheable else None
+        timer = StreamTimer()
+        vector = None
+        if cache is not None:
+            with span("cache_lookup", self.pipeline):
+                cached, vector = await self._run_blocking(cache.lookup, cache_key, scope)
+            if cached is not None:
+                timer.mark("first_token")
+                yield ("sources", cached.get("source_documents", []))
+                yield ("token", cached[self.chain.output_key])
+                timer.mark("total")
+                self._observe_timings(timer)
+                yield ("done", {"result": cached, "timings": timer.as_dict()})
+                return
+
+        with span("retrieve", self.pipeline):
+            docs = await self._run_blocking(self.chain.retriever.get_relevant_documents, retrieval_query(inputs, query))
+        timer.mark("retrieval")
+        yield ("sources", docs)
+
+        # Build the same prompt the "stuff" chain would, then stream the LLM directly
+        combine_chain = self.chain.combine_documents_chain
+        llm_chain = combine_chain.llm_chain
+        with span("prompt", self.pipeline):
+            prompt = llm_chain.prompt.format_prompt(**combine_chain._get_inputs(docs, question=query))
+        record_tokens("prompt", prompt.to_string() if hasattr(prompt, "to_string") else str(prompt), self.pipeline)
+        pieces = []
+        llm_start = time.perf_counter()
+        async for chunk in llm_chain.llm.astream(prompt):
+            text = getattr(chunk, "content", chunk)  # Chat models yield message chunks, LLMs yield str
+            if not text:
+                continue
+            timer.mark("first_token")
+            pieces.append(text)
+            yield ("token", text)
+        observe_stage("llm", time.perf_counter() - llm_start, self.pipeline)
+        timer.mark("total")
+        self._observe_timings(timer)
+        record_tokens("completion", "".join(pieces), self.pipeline)
+
+        outputs = {self.chain.output_key: "".join(pieces)}
+        if self.chain.return_source_documents:
+            outputs["source_documents"] = docs
+        result = self.chain.prep_outputs({self.chain.input_key: query}, outputs)
+        if cache is not None:
+            cache.store(cache_key, result, vector, scope)
+        yield ("done", {"result": result, "timings": timer.as_dict()})
+
+    def _observe_timings(self, timer):
+        # Time to first token and end-to-end latency as seen by the client
+        for name in ("first_token", "total"):
+            if name in timer.marks:
+                observe_stage("query" if name == "total" else name, timer.marks[name] / 1000, self.pipeline)
+
+    async def arun(self, query):
+        result = await self.ainvoke({self.chain.input_key: query})
+        return result[self.chain.output_key]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def format_sources(docs, max_chars=150):
+    lines = []
+    for i, doc in enumerate(docs, 1):
+        snippet = " ".join(doc.page_content.split())[:max_chars]
+        lines.append(f"[{i}] {snippet}...")
+    return "Sources:\n" + "\n".join(lines) if lines else "Sources: none found"
@@ -0,0 +1,460 @@
+import json
+import os
+
+import numpy as np
+
+INDEX_META_FILE = "index_meta.json"
+SEARCH_PARAMS = ("ef", "rescore")  # Applied to a loaded index as-is; every other persisted param needs a rebuild
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def blocked_top_k(n_rows, queries, k, score_block, query_batch=256, row_block=65536):
+    # Running top-k over row blocks, so scratch memory stays bounded for any matrix size.
+    # score_block(row_start, row_end, query_block) -> float32 scores shaped (queries, rows).
+    # Returns [(row indices, scores)] per query, best first.
+    k = min(k, n_rows)
+    if k == 0:
+        return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+    results = []
+    for start in range(0, len(queries), query_batch):
+        block = queries[start:start + query_batch]
+        best_rows = np.empty((len(block), 0), dtype=np.int64)
+        best_scores = np.empty((len(block), 0), dtype=np.float32)
+        for row_start in range(0, n_rows, row_block):
+            row_end = min(row_start + row_block, n_rows)
+            scores = score_block(row_start, row_end, block)
+            rows = np.broadcast_to(np.arange(row_start, row_end), scores.shape)
+            # Keep a running top-k: previous winners plus this block's scores
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best_scores.shape[1] > k:
+                top = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        results.extend(zip(np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)))
+    return results
+
+
+def _save_array(path, name, array):
+    # Via a temp file: the old file may still be memory-mapped by this very index
+    tmp_path = os.path.join(path, name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, os.path.join(path, name))
+
+
+def _kept_rows(ids, removed):
+    removed = set(removed)
+    return np.array([i for i, doc_id in enumerate(ids) if doc_id not in removed], dtype=np.int64)
+
+
+def _save_meta(path, backend, params, ids):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, INDEX_META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"backend": backend, "params": params}, f)
+    with open(os.path.join(path, "ids.json"), "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+
+
+# --- Exact brute-force backend ---
+class NumpyIndex:
+    backend = "numpy"
+
+    def __init__(self, dim, dtype="float32", query_batch=256, row_block=65536):
+        self.dim = dim
+        self.dtype = dtype              # float16 halves memory; blocks are upcast to float32 for the matmul
+        self.query_batch = query_batch
+        self.row_block = row_block      # Rows scored per matmul, bounds scratch memory on huge matrices
+        self.ids = []
+        self._matrix = np.empty((0, dim), dtype=dtype)
+        self._pending = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def matrix(self):
+        if self._pending:
+            self._matrix = np.concatenate([np.asarray(self._matrix)] + self._pending)
+            self._pending = []
+        return self._matrix
+
+    def add(self, ids, vectors):
+        # Vectors are L2-normalized so inner product == cosine similarity
+        self._pending.append(normalize_rows(vectors).astype(self.dtype))
+        self.ids.extend(ids)
+
+    def search(self, queries, k):
+        # Returns (ids, scores) per query, best first
+        queries = normalize_rows(np.atleast_2d(queries))
+        matrix = self.matrix
+
+        def score_block(row_start, row_end, block):
+            return (np.asarray(matrix[row_start:row_end], dtype=np.float32) @ block.T).T
+
+        top = blocked_top_k(len(matrix), queries, k, score_block, self.query_batch, self.row_block)
+        return [([self.ids[i] for i in rows], scores.tolist()) for rows, scores in top]
+
+    def remove(self, ids):
+        keep = _kept_rows(self.ids, ids)
+        self._matrix = np.asarray(self.matrix[keep])
+        self.ids = [self.ids[i] for i in keep]
+
+    def resident_bytes(self):
+        return 0 if isinstance(self.matrix, np.memmap) else self.matrix.nbytes
+
+    def params(self):
+        return {"dim": self.dim, "dtype": self.dtype}
+
+    def save(self, path):
+        _save_meta(path, self.backend, self.params(), self.ids)
+        _save_array(path, "vectors.npy", np.asarray(self.matrix))
+
+    @classmethod
+    def load(cls, path, params, ids):
+        index = cls(params["dim"], params["dtype"])
+        index.ids = ids
+        # Memory-mapped: pages are read on demand, so loading is instant even for millions of rows
+        index._matrix = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        return index
+
+
+# --- Compressed first pass + exact rescoring backend ---
+QUANTIZATIONS = ("float16", "int8", "binary", "pq")
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _kmeans(data, clusters, iterations=10, seed=0):
+    # Plain Lloyd iterations; only used to train the small per-subspace PQ codebooks
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), clusters, replace=len(data) < clusters)].copy()
+    for _ in range(iterations):
+        assign = _nearest(data, centroids)
+        for c in range(clusters):
+            members = data[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+    return centroids
+
+
+def _nearest(data, centroids):
+    # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+    return np.argmax(data @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
+
+
+class QuantizedIndex:
+    backend = "quantized"
+
+    def __init__(self, dim, quantization="int8", rescore=100, pq_subspaces=None, pq_train_size=20000,
+                 query_batch=256, row_block=65536):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {QUANTIZATIONS}, got {quantization!r}")
+        self.dim = dim
+        self.quantization = quantization
+        self.rescore = rescore              # Candidates rescored at full precision; 0 returns the compressed scores
+        self.pq_subspaces = pq_subspaces or dim // 8   # PQ: one byte per subspace, 8 dims each by default
+        if quantization == "pq" and dim % self.pq_subspaces:
+            raise ValueError(f"dim {dim} is not divisible by pq_subspaces {self.pq_subspaces}")
+        self.pq_train_size = pq_train_size
+        self.query_batch = query_batch
+        self.row_block = row_block
+        self.ids = []
+        self.codes = None
+        self.scales = None                  # int8: per-row scale back to float
+        self.centroids = None               # pq: (subspaces, 256, dim / subspaces) codebooks
+        self._full = np.empty((0, dim), dtype=np.float32)  # Full precision; memory-mapped once saved or loaded
+        self._pending = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def full(self):
+        if self._pending:
+            self._full = np.concatenate([np.asarray(self._full)] + self._pending)
+            self._pending = []
+        return self._full
+
+    def add(self, ids, vectors):
+        self._pending.append(normalize_rows(vectors))
+        self.ids.extend(ids)
+
+    # Encoding
+    def _encode(self):
+        # Encodes only rows added since the last call; PQ codebooks are trained once, on the first rows seen
+        full = self.full
+        done = 0 if self.codes is None else len(self.codes)
+        if done == len(full) and self.codes is not None:
+            return
+        rows = full[done:]
+        if self.quantization == "float16":
+            codes = np.asarray(rows).astype(np.float16)
+        elif self.quantization == "int8":
+            scales = np.abs(rows).max(axis=1).astype(np.float32) / 127
+            scales[scales == 0] = 1
+            codes = np.empty(rows.shape, dtype=np.int8)
+            for start in range(0, len(rows), self.row_block):
+                block = np.asarray(rows[start:start + self.row_block])
+                codes[start:start + len(block)] = np.rint(block / scales[start:start + len(block), None])
+            self.scales = scales if self.scales is None else np.concatenate([self.scales, scales])
+        elif self.quantization == "binary":
+            codes = np.packbits(np.asarray(rows) > 0, axis=1)
+        else:
+            if self.centroids is None:
+                self._train_pq(full)
+            codes = np.empty((len(rows), self.pq_subspaces), dtype=np.uint8)
+            for start in range(0, len(rows), self.row_block):
+                block = np.asarray(rows[start:start + self.row_block])
+                for j, sub in enumerate(np.split(block, self.pq_subspaces, axis=1)):
+                    codes[start:start + len(block), j] = _nearest(sub, self.centroids[j])
+        self.codes = codes if self.codes is None else np.concatenate([self.codes, codes])
+
+    def _train_pq(self, full):
+        rng = np.random.default_rng(0)
+        sample = np.asarray(full[np.sort(rng.choice(len(full), min(len(full), self.pq_train_size), replace=False))])
+        self.centroids = np.stack([_kmeans(sub, 256) for sub in np.split(sample, self.pq_subspaces, axis=1)])
+
+    # Search
+    def _score_block(self, row_start, row_end, block):
+        codes = self.codes[row_start:row_end]
+        if self.quantization == "float16":
+            return (codes.astype(np.float32) @ block.T).T
+        if self.quantization == "int8":
+            return (codes.astype(np.float32) @ block.T).T * self.scales[row_start:row_end]
+        if self.quantization == "binary":
+            # Fewer differing sign bits == closer; one query at a time keeps the XOR scratch small
+            bits = np.packbits(block > 0, axis=1)
+            return np.stack([-_POPCOUNT[np.bitwise_xor(codes, q)].sum(axis=1, dtype=np.int32) for q in bits]).astype(np.float32)
+        # PQ asymmetric distance: per-query lookup table of sub-vector . centroid, summed over subspaces
+        tables = np.einsum("qjd,jcd->qjc", block.reshape(len(block), self.pq_subspaces, -1), self.centroids)
+        columns = np.arange(self.pq_subspaces)
+        return np.stack([table[columns, codes].sum(axis=1) for table in tables]).astype(np.float32)
+
+    def search(self, queries, k):
+        queries = normalize_rows(np.atleast_2d(queries))
+        self._encode()
+        candidates = max(k, self.rescore)
+        top = blocked_top_k(len(self.codes), queries, candidates, self._score_block, self.query_batch, self.row_block)
+        results = []
+        for query, (rows, scores) in zip(queries, top):
+            if self.rescore:
+                # Exact scores for the shortlist; sorted row order keeps memory-mapped reads sequential
+                rows = np.sort(rows)
+                scores = np.asarray(self._full[rows]) @ query
+                order = np.argsort(-scores)[:k]
+                rows, scores = rows[order], scores[order]
+            else:
+                rows, scores = rows[:k], scores[:k]
+            results.append(([self.ids[i] for i in rows], scores.tolist()))
+        return results
+
+    def remove(self, ids):
+        self._encode()  # Keeps codes row-aligned with the full-precision vectors
+        keep = _kept_rows(self.ids, ids)
+        self._full = np.asarray(self._full[keep])
+        self.codes = self.codes[keep]
+        if self.scales is not None:
+            self.scales = self.scales[keep]
+        self.ids = [self.ids[i] for i in keep]
+
+    def resident_bytes(self):
+        # What the first pass keeps in RAM; the full-precision file is paged in only for shortlisted rows
+        self._encode()
+        extra = sum(a.nbytes for a in (self.scales, self.centroids) if a is not None)
+        full = 0 if isinstance(self._full, np.memmap) else self._full.nbytes
+        return self.codes.nbytes + extra + full
+
+    def params(self):
+        return {"dim": self.dim, "quantization": self.quantization, "rescore": self.rescore,
+                "pq_subspaces": self.pq_subspaces}
+
+    def save(self, path):
+        self._encode()
+        _save_meta(path, self.backend, self.params(), self.ids)
+        _save_array(path, "vectors.npy", np.asarray(self._full))
+        _save_array(path, "codes.npy", self.codes)
+        for name in ("scales", "centroids"):
+            if getattr(self, name) is not None:
+                _save_array(path, f"{name}.npy", getattr(self, name))
+        # Drop the in-RAM copy now that it is on disk
+        self._full = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+
+    @classmethod
+    def load(cls, path, params, ids):
+        index = cls(params["dim"], params["quantization"], params["rescore"], params["pq_subspaces"])
+        index.ids = ids
+        index._full = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        index.codes = np.load(os.path.join(path, "codes.npy"))
+        for name in ("scales", "centroids"):
+            if os.path.exists(os.path.join(path, f"{name}.npy")):
+                setattr(index, name, np.load(os.path.join(path, f"{name}.npy")))
+        return index
+
+
+# --- Approximate HNSW backend ---
+class HNSWIndex:
+    backend = "hnsw"
+
+    def __init__(self, dim, M=16, ef_construction=200, ef=64, max_elements=100000, num_threads=-1, index_file=None):
+        import hnswlib
+        self.dim = dim
+        self.M = M                          # Graph degree: higher = better recall, more memory
+        self.ef_construction = ef_construction
+        self.ef = ef                        # Search breadth: higher = better recall, slower queries
+        self.num_threads = num_threads
+        self.ids = []                       # By graph label; None once removed
+        self.index = hnswlib.Index(space="cosine", dim=dim)
+        if index_file:
+            self.index.load_index(index_file, max_elements=max_elements)
+        else:
+            self.index.init_index(max_elements=max_elements, M=M, ef_construction=ef_construction)
+        self.index.set_ef(ef)
+
+    def __len__(self):
+        return len(self.ids) - self.ids.count(None)
+
+    def set_ef(self, ef):
+        self.ef = ef
+        self.index.set_ef(ef)
+
+    def add(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        needed = len(self.ids) + len(ids)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+        labels = np.arange(len(self.ids), needed)
+        self.index.add_items(vectors, labels, num_threads=self.num_threads)
+        self.ids.extend(ids)
+
+    def search(self, queries, k):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, len(self))
+        if k == 0:
+            return [([], []) for _ in queries]
+        labels, distances = self.index.knn_query(queries, k=k, num_threads=self.num_threads)
+        return [([self.ids[i] for i in row_labels], (1 - row_distances).tolist())
+                for row_labels, row_distances in zip(labels, distances)]
+
+    def remove(self, ids):
+        # Marked deleted in the graph (skipped by searches, kept in the saved file); labels are never reused
+        removed = set(ids)
+        for label, doc_id in enumerate(self.ids):
+            if doc_id in removed:
+                self.index.mark_deleted(label)
+                self.ids[label] = None
+
+    def params(self):
+        return {"dim": self.dim, "M": self.M, "ef_construction": self.ef_construction, "ef": self.ef}
+
+    def save(self, path):
+        _save_meta(path, self.backend, self.params(), self.ids)
+        self.index.save_index(os.path.join(path, "hnsw.bin"))
+
+    @classmethod
+    def load(cls, path, params, ids):
+        index = cls(params["dim"], params["M"], params["ef_construction"], params["ef"],
+                    max_elements=len(ids), index_file=os.path.join(path, "hnsw.bin"))
+        index.ids = ids
+        return index
+
+
+INDEX_BACKENDS = {"numpy": NumpyIndex, "hnsw": HNSWIndex, "quantized": QuantizedIndex}
+
+
+def create_index(backend, dim, **params):
+    return INDEX_BACKENDS[backend](dim, **params)
+
+
+def _load_meta(path):
+    with open(os.path.join(path, INDEX_META_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_index(path):
+    meta = _load_meta(path)
+    with open(os.path.join(path, "ids.json"), "r", encoding="utf-8") as f:
+        ids = json.load(f)
+    return INDEX_BACKENDS[meta["backend"]].load(path, meta["params"], ids)
+
+
+def build_params_match(meta, backend, params):
+    # Compared against what the saved index records; runtime-only knobs (query_batch, num_threads...) are not
+    # persisted, and None means "the backend's default"
+    if meta["backend"] != backend:
+        return False
+    return all(meta["params"].get(key) == value for key, value in params.items()
+               if key not in SEARCH_PARAMS and key in meta["params"] and value is not None)
+
+
+def apply_search_params(index, params):
+    # Search-time knobs; one a backend does not have (e.g. ef on numpy) is ignored
+    if "ef" in params and hasattr(index, "set_ef"):
+        index.set_ef(params["ef"])
+    if "rescore" in params and hasattr(index, "rescore"):
+        index.rescore = params["rescore"]
+    return index
+
+
+def build_from_chroma(vectordb, backend, page_size=5000, **params):
+    # Copies the collection's stored embeddings into a standalone index; nothing is re-embedded
+    build_params = {key: value for key, value in params.items() if key not in SEARCH_PARAMS}
+    index = None
+    offset = 0
+    while True:
+        page = vectordb._collection.get(limit=page_size, offset=offset, include=["embeddings"])
+        if not len(page["ids"]):
+            break
+        vectors = np.asarray(page["embeddings"], dtype=np.float32)
+        if index is None:
+            index = create_index(backend, vectors.shape[1], **build_params)
+        index.add(page["ids"], vectors)
+        offset += len(page["ids"])
+    return apply_search_params(index, params) if index is not None else None
+
+
+def sync_from_chroma(index, vectordb, page_size=5000):
+    # Applies collection changes to a loaded index: only new ids are fetched and added, vanished ids removed.
+    # Chunk ids hash the chunk text, so an edited row shows up as one id removed and another added.
+    current = []
+    offset = 0
+    while True:
+        page = vectordb._collection.get(limit=page_size, offset=offset, include=[])
+        if not len(page["ids"]):
+            break
+        current.extend(page["ids"])
+        offset += len(page["ids"])
+    known = {doc_id for doc_id in index.ids if doc_id is not None}
+    current_set = set(current)
+    removed = [doc_id for doc_id in known if doc_id not in current_set]
+    added = [doc_id for doc_id in current if doc_id not in known]
+    if removed:
+        index.remove(removed)
+    for start in range(0, len(added), page_size):
+        page = vectordb._collection.get(ids=added[start:start + page_size], include=["embeddings"])
+        index.add(page["ids"], np.asarray(page["embeddings"], dtype=np.float32))
+    return {"added": len(added), "removed": len(removed)}
+
+
+def load_or_build_index(vectordb, backend, path, rebuild=False, **params):
+    # A loaded index is always reconciled with the collection, like the BM25 index: it may have been saved
+    # before a crash mid-sync, or not updated while the collection was ingested under another backend.
+    # Listing ids is cheap; only the difference is fetched and applied.
+    if (not rebuild and os.path.exists(os.path.join(path, INDEX_META_FILE))
+            and build_params_match(_load_meta(path), backend, params)):
+        index = apply_search_params(load_index(path), params)
+        changes = sync_from_chroma(index, vectordb)
+        if changes["added"] or changes["removed"]:
+            print(f"Vector index reconciled with the collection: {changes}")
+            index.save(path)
+        return index
+    index = build_from_chroma(vectordb, backend, **params)
+    if index is not None:
+        index.save(path)
+    return index
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rag_core.metrics import render_prometheus
+
+
+# --- Build a model/index pipeline in the background ---
+class BackgroundWarmup:
+    def __init__(self, name, build_fn):
+        self.name = name
+        self.build_fn = build_fn
+        self.state = "pending"   # pending -> warming -> ready | failed
+        self.result = None
+        self.error = None
+        self.ready_after_s = None
+        self._done = threading.Event()
+        self._started_at = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        # Idempotent, so a lazily loaded pipeline can be started by whichever request needs it first
+        with self._start_lock:
+            if self.state == "pending":
+                self.state = "warming"
+                self._started_at = time.perf_counter()
+                threading.Thread(target=self._run, name=f"{self.name}-warmup", daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self.build_fn()
+            self.state = "ready"
+        except Exception as e:
+            self.error = e
+            self.state = "failed"
+            print(f"An error occurred while warming up {self.name}: {e}")
+        finally:
+            self.ready_after_s = time.perf_counter() - self._started_at
+            print(f"{self.name} warm-up {self.state} after {self.ready_after_s:.1f}s")
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def wait(self, timeout=None):
+        # Starts the build if nobody has yet, blocks until it is done; re-raises a warm-up failure
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} is still warming up")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    async def wait_async(self, timeout=None):
+        return await asyncio.get_running_loop().run_in_executor(None, self.wait, timeout)
+
+    def status(self):
+        return {"state": self.state, "ready_after_s": self.ready_after_s}
+
+
+# --- Health and metrics endpoint, up before any model is loaded ---
+def start_health_server(port, warmups, host="0.0.0.0"):
+    # GET /health: 200 while the process is alive; GET /ready: 200 once every started warm-up is done;
+    # GET /metrics: per-stage latency, token and cache histograms in Prometheus text format
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            statuses = {w.name: w.status() for w in warmups}
+            content_type = "application/json"
+            if self.path == "/health":
+                code = 200
+            elif self.path == "/ready":
+                # Lazily loaded pipelines that nobody has asked for yet do not hold readiness back
+                code = 200 if all(w.ready for w in warmups if w.state != "pending") else 503
+            elif self.path == "/metrics":
+                code = 200
+                content_type = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            if self.path == "/metrics":
+                body = render_prometheus().encode("utf-8")
+            else:
+                body = json.dumps(statuses).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # Probes are frequent; keep the console for the bot's own output
+
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    return server
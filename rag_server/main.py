@@ -0,0 +1,95 @@
+# One process serving every bot. Each bot is mounted at its own path with its own queue limits, and
+# embedding models, the cross-encoder and Chroma clients come from a shared reference-counted registry,
+# so weights shared by several bots are loaded once. Bots are built on their first request unless prewarmed.
+# Run from the directory holding the bots' data files, as each bot expects.
+# Usage: python rag_server/main.py [--tenants news medical assistant] [--prewarm] [--port 7860]
+import argparse
+import importlib.util
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_core.registry import REGISTRY, ResourceLease
+from rag_core.warmup import BackgroundWarmup, start_health_server
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_PORT = int(os.environ.get("RAG_SERVER_PORT", 7860))
+HEALTH_PORT = int(os.environ.get("RAG_SERVER_HEALTH_PORT", 8080))   # /health, /ready and /metrics for all tenants
+PREWARM = os.environ.get("RAG_SERVER_PREWARM", "0") == "1"          # Build every tenant at start-up
+TENANTS = {
+    # route -> (bot directory, pipeline builder, requests served at once, requests allowed to wait)
+    "news": ("news_chatbot", "build_pipeline", 8, 64),
+    "medical": ("medical_chatbot", "build_service", 4, 32),
+    "assistant": ("personal_assistant", "build_assistant", 4, 32),
+}
+
+
+def load_bot(bot_dir):
+    # The bots are scripts, not packages; load each main.py under its own module name
+    spec = importlib.util.spec_from_file_location(f"{bot_dir}_main", os.path.join(REPO_ROOT, bot_dir, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- One mounted bot ---
+class Tenant:
+    def __init__(self, name, bot_dir, builder, concurrency, max_queue):
+        self.name = name
+        self.module = load_bot(bot_dir)
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.lease = ResourceLease(REGISTRY)  # Released on shutdown; shared models close with their last holder
+        build = getattr(self.module, builder)
+        # Not started here: the first request (or --prewarm) opens the collections and loads the models
+        self.warmup = BackgroundWarmup(name, lambda: build(resources=self.lease))
+
+    def interface(self):
+        ui = self.module.build_interface(self.warmup)
+        # Separate queue per tenant: a flood of requests to one bot waits in its own line
+        ui.queue(default_concurrency_limit=self.concurrency, max_size=self.max_queue)
+        return ui
+
+    def close(self):
+        self.lease.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve all bots from one process")
+    parser.add_argument("--tenants", nargs="+", choices=sorted(TENANTS), default=list(TENANTS))
+    parser.add_argument("--prewarm", action="store_true", default=PREWARM)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+
+    tenants = [Tenant(name, *TENANTS[name]) for name in args.tenants]
+    start_health_server(HEALTH_PORT, [tenant.warmup for tenant in tenants])
+    if args.prewarm:
+        for tenant in tenants:
+            tenant.warmup.start()
+
+    import gradio as gr
+    import uvicorn
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.get("/tenants")
+    def tenant_status():
+        return {
+            "tenants": {tenant.name: tenant.warmup.status() for tenant in tenants},
+            "shared_resources": REGISTRY.stats(),
+        }
+
+    for tenant in tenants:
+        app = gr.mount_gradio_app(app, tenant.interface(), path=f"/{tenant.name}")
+        print(f"Mounted {tenant.name} at /{tenant.name} "
+              f"(concurrency {tenant.concurrency}, queue {tenant.max_queue})")
+    try:
+        uvicorn.run(app, host=args.host, port=args.port)
+    finally:
+        for tenant in tenants:
+            tenant.close()
+
+
+if __name__ == "__main__":
+    main()